@@ -0,0 +1,5 @@
+#benchmarks
+#performance benchmarks of the N-way Set-associative cache
+#
+#run a benchmark from the root of the repository, e.g.
+#	python -m benchmarks.tag_index
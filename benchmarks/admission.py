@@ -0,0 +1,60 @@
+#admission.py
+#benchmark the hit ratio of the TinyLFU admission filter on skewed traces:
+#Zipfian keys with different skews, with and without a share of keys which
+#are used only once (one-hit wonders), for a few replacement policies.
+#
+#usage: python -m benchmarks.admission
+
+import random
+
+import cache
+from benchmarks.workloads import zipf
+
+
+CACHE_SIZE = 8192
+N_WAY = 8
+B = 1
+OPS = 50000
+SKEWS = [0.8, 1.0, 1.2]
+ONE_HIT_RATIOS = [0.0, 0.3]
+POLICIES = ['LRU', 'CLOCK', 'SLRU']
+
+
+def trace(s, one_hit_ratio):
+	"""trace is to build a Zipfian read trace where `one_hit_ratio` of the \
+	reads go to keys which are never read again.
+	"""
+	rng = random.Random(1)
+	result = []
+	for i, (_, key) in enumerate(zipf(OPS, CACHE_SIZE * 4, seed = 0, s = s)):
+		if rng.random() < one_hit_ratio:
+			key = CACHE_SIZE * 4 + i * 2
+		result.append(key)
+	return result
+
+
+def hit_ratio(keys, **kwargs):
+	test_cache = cache.Cache(CACHE_SIZE, N_WAY, B, int, int, **kwargs)
+	get_value = test_cache.get_value
+	set_value = test_cache.set_value
+	for key in keys:
+		if get_value(key) == None:
+			set_value(key, key)
+	stats = test_cache.stats()
+	return stats['hits'] / (stats['hits'] + stats['misses'])
+
+
+def main():
+	print("%5s %8s %8s %10s %10s %8s" % ("skew", "one-hit", "policy", "no filter", "TinyLFU", "gain"))
+	for s in SKEWS:
+		for one_hit_ratio in ONE_HIT_RATIOS:
+			keys = trace(s, one_hit_ratio)
+			for policy in POLICIES:
+				without = hit_ratio(keys, replacement = policy)
+				with_filter = hit_ratio(keys, replacement = policy, admission = 'TINYLFU')
+				print("%5.1f %8.1f %8s %10.3f %10.3f %+8.3f" % (s, one_hit_ratio, policy, 
+					without, with_filter, with_filter - without))
+
+
+if __name__ == '__main__':
+	main()
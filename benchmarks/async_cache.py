@@ -0,0 +1,76 @@
+#async_cache.py
+#benchmark the asyncio front-end with 10k concurrent coroutines, each of
+#them reading Zipfian keys with get_or_load from a backend which takes 1 ms
+#per load. Reports the throughput, the number of backend loads (concurrent
+#misses of a key are coalesced) and the throughput of plain get/set, for a
+#cache without locks (the default) and a thread safe one driven through an
+#executor.
+#
+#usage: python -m benchmarks.async_cache
+
+import asyncio
+import time
+
+import cache
+from benchmarks.workloads import zipf
+
+
+COROUTINES = 10000
+READS = 10
+KEYS = 50000
+CONFIG = dict(cache_size = 8192, n_way = 8, b = 1)
+
+
+async def load_all(async_cache, keys):
+	"""load_all is to run `COROUTINES` coroutines which read `READS` keys \
+	each with get_or_load.
+
+	Returns:
+		the number of backend loads.
+	"""
+	loads = [0]
+
+	async def loader(key):
+		loads[0] += 1
+		await asyncio.sleep(0.001)
+		return key
+
+	async def reader(start):
+		for key in keys[start:start + READS]:
+			await async_cache.get_or_load(key, loader)
+
+	await asyncio.gather(*[reader(i * READS) for i in range(COROUTINES)])
+	return loads[0]
+
+
+async def get_set_all(async_cache, keys):
+	"""get_set_all is to run `COROUTINES` coroutines which read `READS` keys \
+	each with get, and set the keys they miss.
+	"""
+	async def reader(start):
+		for key in keys[start:start + READS]:
+			if await async_cache.get(key) == None:
+				await async_cache.set(key, key)
+
+	await asyncio.gather(*[reader(i * READS) for i in range(COROUTINES)])
+
+
+def main():
+	keys = [key for _, key in zipf(COROUTINES * READS, KEYS)]
+	print("%d coroutines, %d reads each" % (COROUTINES, READS))
+	print("%12s %14s %10s %14s" % ("cache", "get_or_load/s", "loads", "get+set/s"))
+	for name, kwargs in [("no locks", dict()), ("executor", dict(thread_safe_mode = True))]:
+		async_cache = cache.AsyncCache(CONFIG['cache_size'], CONFIG['n_way'], CONFIG['b'], int, int, **kwargs)
+		start = time.perf_counter()
+		loads = asyncio.run(load_all(async_cache, keys))
+		load_rate = len(keys) / (time.perf_counter() - start)
+
+		async_cache = cache.AsyncCache(CONFIG['cache_size'], CONFIG['n_way'], CONFIG['b'], int, int, **kwargs)
+		start = time.perf_counter()
+		asyncio.run(get_set_all(async_cache, keys))
+		get_set_rate = len(keys) / (time.perf_counter() - start)
+		print("%12s %14.0f %10d %14.0f" % (name, load_rate, loads, get_set_rate))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,85 @@
+#batch.py
+#benchmark the per-key cost of get_many/set_many against calling
+#get_value/set_value once per key, for different batch sizes. Batches are
+#either random keys, which spread over many sets, or ranges of consecutive
+#keys (e.g. a page of ids), which share sets.
+#
+#usage: python -m benchmarks.batch
+
+import random
+import timeit
+
+import cache
+
+
+BATCH_SIZES = [1, 10, 50, 100, 500]
+KEYS_PER_RUN = 20000
+MODES = [
+	("nested", dict(thread_safe_mode = True)),
+	("stripes", dict(thread_safe_mode = True, lock_stripes = 64)),
+]
+
+
+def per_key(kwargs, batch_size, op, pattern):
+	"""per_key is to measure the average cost of one key when getting or \
+	setting keys in batches of `batch_size`.
+
+	Returns:
+		a tuple of the nanoseconds per key of the single key and of the \
+		batch operation.
+	"""
+	test_cache = cache.Cache(2**16, 8, 3, int, int, **kwargs)
+	rng = random.Random(batch_size)
+	batches = []
+	for i in range(KEYS_PER_RUN // batch_size):
+		if pattern == 'random':
+			batches.append([rng.randrange(2**16) for j in range(batch_size)])
+		else:
+			start = rng.randrange(2**16 - batch_size)
+			batches.append(list(range(start, start + batch_size)))
+	for batch in batches:
+		test_cache.set_many([(key, key) for key in batch])
+
+	if op == 'get':
+		def single():
+			get_value = test_cache.get_value
+			for batch in batches:
+				for key in batch:
+					get_value(key)
+
+		def many():
+			for batch in batches:
+				test_cache.get_many(batch)
+	else:
+		pairs = [[(key, key) for key in batch] for batch in batches]
+
+		def single():
+			set_value = test_cache.set_value
+			for batch in pairs:
+				for key, value in batch:
+					set_value(key, value)
+
+		def many():
+			for batch in pairs:
+				test_cache.set_many(batch)
+
+	keys = len(batches) * batch_size
+	single_ns = min(timeit.repeat(single, number = 1, repeat = 3)) / keys * 1e9
+	many_ns = min(timeit.repeat(many, number = 1, repeat = 3)) / keys * 1e9
+	return single_ns, many_ns
+
+
+def main():
+	print("%8s %4s %7s %6s %12s %12s %8s" % ("mode", "op", "keys", "batch", 
+		"single ns", "many ns", "saving"))
+	for name, kwargs in MODES:
+		for op in ['get', 'set']:
+			for pattern in ['random', 'range']:
+				for batch_size in BATCH_SIZES:
+					single_ns, many_ns = per_key(kwargs, batch_size, op, pattern)
+					print("%8s %4s %7s %6d %12.1f %12.1f %7.0f%%" % (name, op, pattern, 
+						batch_size, single_ns, many_ns, 100 * (1 - many_ns / single_ns)))
+
+
+if __name__ == '__main__':
+	main()
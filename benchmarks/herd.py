@@ -0,0 +1,79 @@
+#herd.py
+#thundering herd benchmark: many threads miss the same hot key at once and
+#load it from a slow backend (a sleep). With get_value followed by
+#set_value every thread calls the backend, with get_or_load only one
+#thread does and the others wait for its result.
+#
+#usage: python -m benchmarks.herd
+
+import threading
+import time
+
+import cache
+
+
+THREADS = 32
+ROUNDS = 20
+LOAD_SECONDS = 0.005
+
+
+def run(read):
+	"""run is to let `THREADS` threads read a key which was just evicted, \
+	`ROUNDS` times.
+
+	Returns:
+		a tuple of the number of backend calls and the milliseconds of a \
+		round.
+	"""
+	test_cache = cache.Cache(1024, 4, 1, int, int)
+	calls = [0]
+	calls_lock = threading.Lock()
+
+	def loader(key):
+		with calls_lock:
+			calls[0] += 1
+		time.sleep(LOAD_SECONDS)
+		return key
+
+	elapsed = 0.0
+	for round_num in range(ROUNDS):
+		barrier = threading.Barrier(THREADS + 1)
+
+		def worker():
+			barrier.wait()
+			read(test_cache, 7, loader)
+
+		threads = [threading.Thread(target = worker) for i in range(THREADS)]
+		for thread in threads:
+			thread.start()
+		test_cache.delete(7, 7)
+		start = time.perf_counter()
+		barrier.wait()
+		for thread in threads:
+			thread.join()
+		elapsed += time.perf_counter() - start
+	return calls[0], elapsed / ROUNDS * 1e3
+
+
+def read_through(test_cache, key, loader):
+	value = test_cache.get_value(key)
+	if value == None:
+		value = loader(key)
+		test_cache.set_value(key, value)
+	return value
+
+
+def main():
+	rows = [
+		("get+set", read_through),
+		("get_or_load", lambda test_cache, key, loader: test_cache.get_or_load(key, loader)),
+	]
+	print("%d threads, %d rounds, %.0f ms per load" % (THREADS, ROUNDS, LOAD_SECONDS * 1e3))
+	print("%12s %14s %10s" % ("read", "backend calls", "round ms"))
+	for name, read in rows:
+		calls, round_ms = run(read)
+		print("%12s %14d %10.2f" % (name, calls, round_ms))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,58 @@
+#lazy.py
+#benchmark the construction of a large cache (4M slots) with every set and
+#line built up front against lazy mode, where they are built on first use:
+#the seconds to create the cache, the memory it takes (tracemalloc) right
+#after and after 100k sets of random keys, and the cost of those sets.
+#
+#usage: python -m benchmarks.lazy
+
+import random
+import time
+import tracemalloc
+
+import cache
+
+
+OPS = 100000
+CONFIG = dict(cache_size = 2**22, n_way = 8, b = 2)
+
+
+def run(storage, lazy):
+	"""run is to create a cache and put `OPS` random keys into it.
+
+	Returns:
+		a tuple of the seconds to create the cache, the nanoseconds of a \
+		set, and the MB taken after creating and after the sets.
+	"""
+	rng = random.Random(0)
+	keys = [rng.getrandbits(40) for i in range(OPS)]
+	start = time.perf_counter()
+	test_cache = cache.Cache(CONFIG['cache_size'], CONFIG['n_way'], CONFIG['b'], int, int, storage = storage, lazy = lazy)
+	create_s = time.perf_counter() - start
+	start = time.perf_counter()
+	for key in keys:
+		test_cache.set_value(key, key)
+	set_ns = (time.perf_counter() - start) / OPS * 1e9
+	del test_cache
+
+	#memory is measured on a second run, tracemalloc slows down allocations
+	tracemalloc.start()
+	test_cache = cache.Cache(CONFIG['cache_size'], CONFIG['n_way'], CONFIG['b'], int, int, storage = storage, lazy = lazy)
+	created_mb = tracemalloc.get_traced_memory()[0] / 2.0**20
+	for key in keys:
+		test_cache.set_value(key, key)
+	used_mb = tracemalloc.get_traced_memory()[0] / 2.0**20
+	tracemalloc.stop()
+	return create_s, set_ns, created_mb, used_mb
+
+
+def main():
+	print("%d slots, %d sets of random keys" % (CONFIG['cache_size'], OPS))
+	print("%8s %6s %10s %10s %12s %12s" % ("storage", "lazy", "create s", "set ns", "created MB", "used MB"))
+	for storage in ['object', 'compact']:
+		for lazy in [False, True]:
+			print("%8s %6s %10.3f %10.1f %12.1f %12.1f" % ((storage, lazy) + run(storage, lazy)))
+
+
+if __name__ == '__main__':
+	main()
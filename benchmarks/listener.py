@@ -0,0 +1,51 @@
+#listener.py
+#benchmark removal listeners: the cost of a set on a churning cache (most
+#sets evict a line) without a listener and with one, and how many batches
+#the dispatcher thread sent for how many notifications.
+#
+#usage: python -m benchmarks.listener
+
+import random
+import time
+
+import cache
+
+
+OPS = 100000
+KEYS = 1 << 20
+CONFIG = dict(cache_size = 4096, n_way = 8, b = 2)
+
+
+def run(listen):
+	"""run is to set random keys of a key space much larger than the cache.
+
+	Returns:
+		a tuple of the nanoseconds of a set, the number of batches and the \
+		number of notifications.
+	"""
+	batches = [0, 0]
+
+	def listener(notifications):
+		batches[0] += 1
+		batches[1] += len(notifications)
+
+	kwargs = dict(listener = listener) if listen else dict()
+	test_cache = cache.Cache(CONFIG['cache_size'], CONFIG['n_way'], CONFIG['b'], int, int, **kwargs)
+	rng = random.Random(0)
+	keys = [rng.randrange(KEYS) for i in range(OPS)]
+	start = time.perf_counter()
+	for key in keys:
+		test_cache.set_value(key, key)
+	set_ns = (time.perf_counter() - start) / OPS * 1e9
+	test_cache.stop_dispatcher()
+	return set_ns, batches[0], batches[1]
+
+
+def main():
+	print("%10s %10s %10s %14s" % ("listener", "set ns", "batches", "notifications"))
+	for listen in [False, True]:
+		print("%10s %10.1f %10d %14d" % ((listen,) + run(listen)))
+
+
+if __name__ == '__main__':
+	main()
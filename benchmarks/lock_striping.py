@@ -0,0 +1,73 @@
+#lock_striping.py
+#benchmark the multi-threaded throughput of the nested locks of
+#thread_safe_mode=True against the lock striping mode (lock_stripes).
+#
+#usage: python -m benchmarks.lock_striping
+
+import random
+import threading
+import time
+
+import cache
+
+
+CACHE_SIZE = 2**14
+N_WAY = 4
+B = 2
+THREADS = [1, 2, 4, 8]
+OPS_PER_THREAD = 5000
+KEY_SPACE = 2**15
+
+MODES = [
+	#(name, keyword arguments of Cache)
+	("nested", dict(thread_safe_mode = True)),
+	("stripes=1", dict(thread_safe_mode = True, lock_stripes = 1)),
+	("stripes=64", dict(thread_safe_mode = True, lock_stripes = 64)),
+	("stripes=sets", dict(thread_safe_mode = True, lock_stripes = CACHE_SIZE)),
+]
+
+
+def throughput(kwargs, n_threads, ops = OPS_PER_THREAD):
+	"""throughput is to run `n_threads` threads doing 80% get_value and \
+	20% set_value on a shared cache.
+
+	Returns:
+		the operations per second of all of the threads.
+	"""
+	test_cache = cache.Cache(CACHE_SIZE, N_WAY, B, int, int, **kwargs)
+	workloads = []
+	for t in range(n_threads):
+		rng = random.Random(t)
+		workloads.append([(rng.random() < 0.2, rng.randrange(KEY_SPACE)) for i in range(ops)])
+	start_barrier = threading.Barrier(n_threads + 1)
+
+	def worker(workload):
+		get_value = test_cache.get_value
+		set_value = test_cache.set_value
+		start_barrier.wait()
+		for is_set, key in workload:
+			if is_set:
+				set_value(key, key)
+			else:
+				get_value(key)
+
+	threads = [threading.Thread(target = worker, args = (w,)) for w in workloads]
+	for thread in threads:
+		thread.start()
+	start_barrier.wait()
+	start = time.perf_counter()
+	for thread in threads:
+		thread.join()
+	elapsed = time.perf_counter() - start
+	return n_threads * ops / elapsed
+
+
+def main():
+	print("%14s" % "ops/sec" + "".join("%12s" % ("%d threads" % n) for n in THREADS))
+	for name, kwargs in MODES:
+		row = [throughput(kwargs, n) for n in THREADS]
+		print("%14s" % name + "".join("%12.0f" % r for r in row))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,74 @@
+#plru.py
+#benchmark the pseudo-LRU policies (TREE_PLRU and BIT_PLRU) against LRU:
+#the cost of the policy bookkeeping alone (insert on a hit and on a miss),
+#and the throughput and hit ratio of a cache on the workloads of the
+#benchmark suite.
+#
+#usage: python -m benchmarks.plru
+
+import timeit
+
+import cache
+from benchmarks import suite
+from benchmarks.workloads import WORKLOADS
+
+
+N_WAY = 8
+OPS = 20000
+POLICIES = ['LRU', 'TREE_PLRU', 'BIT_PLRU']
+CONFIG = dict(cache_size = 8192, n_way = N_WAY, b = 1, thread_safe_mode = True)
+
+
+def new_policy(name):
+	if name == 'LRU':
+		return cache.LRU_MRU('LRU')
+	return cache.REPLACEMENT_POLICIES[name](N_WAY)
+
+
+def bookkeeping(name):
+	"""bookkeeping is to measure the cost of the policy calls of a hit \
+	(insert of a known line) and of a miss (victim and insert of a new line).
+
+	Returns:
+		a tuple of the nanoseconds of a hit and of a miss.
+	"""
+	policy = new_policy(name)
+	for i in range(N_WAY):
+		policy.insert(i, i)
+	ways = [(i * 5) % N_WAY for i in range(1000)]
+
+	def hit():
+		insert = policy.insert
+		for i in ways:
+			insert(i, i)
+
+	def miss():
+		insert = policy.insert
+		victim = policy.victim
+		for tag in range(1000):
+			_, i = victim()
+			insert(tag, i)
+
+	hit_ns = min(timeit.repeat(hit, number = 1, repeat = 5)) / len(ways) * 1e9
+	miss_ns = min(timeit.repeat(miss, number = 1, repeat = 5)) / 1000 * 1e9
+	return hit_ns, miss_ns
+
+
+def main():
+	print("policy bookkeeping, %d ways" % N_WAY)
+	print("%10s %10s %10s" % ("policy", "hit ns", "miss ns"))
+	for name in POLICIES:
+		print("%10s %10.1f %10.1f" % ((name,) + bookkeeping(name)))
+
+	print("\ncache of %d items, %d ways, b = %d" % (CONFIG['cache_size'], N_WAY, CONFIG['b']))
+	print("%8s %10s %12s %7s" % ("workload", "policy", "ops/sec", "hit"))
+	for workload_name in sorted(WORKLOADS):
+		workload = WORKLOADS[workload_name](OPS, CONFIG['cache_size'] * 4)
+		for name in POLICIES:
+			config = dict(CONFIG, replacement = name, workload = workload_name)
+			result = suite.run(config, workload)
+			print("%8s %10s %12.0f %7.3f" % (workload_name, name, result['ops_per_sec'], result['hit_ratio']))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,32 @@
+#policies.py
+#compare the hit ratio and the throughput of every replacement policy on
+#the workloads of the benchmark suite.
+#
+#usage: python -m benchmarks.policies
+
+import cache
+from benchmarks import suite
+from benchmarks.workloads import WORKLOADS
+
+
+OPS = 20000
+POLICIES = ['LRU', 'MRU'] + sorted(cache.REPLACEMENT_POLICIES)
+CONFIG = dict(cache_size = 8192, n_way = 8, b = 1, thread_safe_mode = True)
+
+
+def main():
+	names = sorted(WORKLOADS)
+	print("hit ratio (ops/sec), cache of %d items, %d ways, b = %d" % (CONFIG['cache_size'], 
+		CONFIG['n_way'], CONFIG['b']))
+	print("%10s" % "policy" + "".join("%18s" % name for name in names))
+	workloads = dict((name, WORKLOADS[name](OPS, CONFIG['cache_size'] * 4)) for name in names)
+	for policy in POLICIES:
+		row = []
+		for name in names:
+			result = suite.run(dict(CONFIG, replacement = policy, workload = name), workloads[name], repeat = 1)
+			row.append("%7.3f (%7.0f)" % (result['hit_ratio'], result['ops_per_sec']))
+		print("%10s" % policy + "".join("%18s" % cell for cell in row))
+
+
+if __name__ == '__main__':
+	main()
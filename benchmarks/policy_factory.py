@@ -0,0 +1,40 @@
+#policy_factory.py
+#benchmark the multi-threaded throughput of one ReplacementPolicy instance
+#shared by all of the sets against a policy class, which builds a policy
+#for each set. The shared instance serializes every set on its lock; with
+#a class the sets only contend on their own (striped) locks.
+#
+#usage: python -m benchmarks.policy_factory
+
+import cache
+from benchmarks.lock_striping import THREADS, throughput
+
+
+class LRU(cache.LRU_MRU):
+	'''LRU is the LRU policy built from n_way, so it could be passed as a \
+	class to Cache.'''
+
+	def __init__(self, n_way, thread_safe_mode = True):
+		super(LRU, self).__init__('LRU', thread_safe_mode = thread_safe_mode)
+
+
+def main():
+	modes = [
+		#(name, function returning the keyword arguments of Cache)
+		("shared", lambda: dict(replacement = cache.LRU_MRU(), lock_stripes = 64)),
+		("per set", lambda: dict(replacement = LRU, lock_stripes = 64)),
+	]
+	print("%14s" % "ops/sec" + "".join("%12s" % ("%d threads" % n) for n in THREADS))
+	for name, kwargs in modes:
+		row = []
+		for n in THREADS:
+			try:
+				row.append("%12.0f" % throughput(kwargs(), n))
+			except Exception as e:
+				#a shared policy could return the line of another set
+				row.append("%12s" % type(e).__name__)
+		print("%14s" % name + "".join(row))
+
+
+if __name__ == '__main__':
+	main()
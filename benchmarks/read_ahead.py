@@ -0,0 +1,78 @@
+#read_ahead.py
+#benchmark block read-ahead on sequential id workloads: reads of random
+#ranges of 32 consecutive ids and a scan, through get_or_load (one backend
+#call per missing key) and get_or_load_block (one backend call per missing
+#line, which fills the 2**b keys of the line). Reports the hit ratio, the
+#backend round trips and the microseconds of a read.
+#
+#usage: python -m benchmarks.read_ahead
+
+import random
+import time
+
+import cache
+from benchmarks.workloads import scan
+
+
+OPS = 100000
+KEYS = 1 << 20
+RANGE = 32
+
+
+def ranges(ops, key_space, seed = 0):
+	"""ranges is to read ranges of `RANGE` consecutive ids which start at \
+	random ids.
+	"""
+	rng = random.Random(seed)
+	keys = []
+	while len(keys) < ops:
+		start = rng.randrange(key_space - RANGE)
+		keys.extend(range(start, start + RANGE))
+	return keys[:ops]
+
+
+def run(keys, b, block):
+	"""run is to read `keys` through a cache with lines of 2**b keys.
+
+	Returns:
+		a tuple of the hit ratio, the backend round trips and the \
+		microseconds of a read.
+	"""
+	test_cache = cache.Cache(2**16, 8, b, int, int)
+	calls = [0]
+
+	def loader(key):
+		calls[0] += 1
+		return key
+
+	def block_loader(keys):
+		calls[0] += 1
+		return {key: key for key in keys}
+
+	start = time.perf_counter()
+	if block:
+		for key in keys:
+			test_cache.get_or_load_block(key, block_loader)
+	else:
+		for key in keys:
+			test_cache.get_or_load(key, loader)
+	read_us = (time.perf_counter() - start) / len(keys) * 1e6
+	#every read which didn't call the backend was a hit
+	return 1.0 - float(calls[0]) / len(keys), calls[0], read_us
+
+
+def main():
+	workloads = [
+		("ranges", ranges(OPS, KEYS)),
+		("scan", [key for _, key in scan(OPS, KEYS)]),
+	]
+	print("%8s %3s %12s %8s %10s %8s" % ("workload", "b", "read", "hit", "backend", "read us"))
+	for name, keys in workloads:
+		for b in [2, 4]:
+			for read, block in [("get_or_load", False), ("block", True)]:
+				hit_ratio, calls, read_us = run(keys, b, block)
+				print("%8s %3d %12s %8.3f %10d %8.2f" % (name, b, read, hit_ratio, calls, read_us))
+
+
+if __name__ == '__main__':
+	main()
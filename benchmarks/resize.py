@@ -0,0 +1,80 @@
+#resize.py
+#benchmark growing a full cache to twice its size: rebuilding it (a new
+#cache filled with every item of the old one, which stops the traffic for
+#the whole copy) against resize, which switches to the new sets at once
+#and moves the lines a set at a time in the gets which follow. Reports the
+#time of the call, the slowest and the median get while lines move, and
+#the gets it took to move all of them.
+#
+#usage: python -m benchmarks.resize
+
+import random
+import time
+
+import cache
+
+
+CONFIG = dict(cache_size = 1 << 17, n_way = 8, b = 2)
+GETS = 200000
+
+
+def full_cache(**kwargs):
+	"""full_cache is to build a cache and fill each of its slots.
+
+	Returns:
+		the cache.
+	"""
+	test_cache = cache.Cache(CONFIG['cache_size'], CONFIG['n_way'], CONFIG['b'], int, int, **kwargs)
+	test_cache.set_many([(key, key) for key in range(CONFIG['cache_size'])])
+	return test_cache
+
+
+def rebuild():
+	"""rebuild is to copy a full cache into a new cache twice its size.
+
+	Returns:
+		the milliseconds of the copy.
+	"""
+	old_cache = full_cache()
+	start = time.perf_counter()
+	new_cache = cache.Cache(2 * CONFIG['cache_size'], CONFIG['n_way'], CONFIG['b'], int, int)
+	new_cache.set_many(old_cache.get_many(range(CONFIG['cache_size'])))
+	return (time.perf_counter() - start) * 1e3
+
+
+def resize(**kwargs):
+	"""resize is to resize a full cache to twice its size and read random \
+	keys until every line moved.
+
+	Returns:
+		a tuple of the milliseconds of the call, the microseconds of the \
+		slowest and of the median get, and the number of gets it took.
+	"""
+	test_cache = full_cache(**kwargs)
+	rng = random.Random(0)
+	keys = [rng.randrange(CONFIG['cache_size']) for i in range(GETS)]
+	start = time.perf_counter()
+	test_cache.resize(2 * CONFIG['cache_size'])
+	call_ms = (time.perf_counter() - start) * 1e3
+	latencies = []
+	for key in keys:
+		if test_cache.rehash == None:
+			break
+		start = time.perf_counter()
+		test_cache.get_value(key)
+		latencies.append(time.perf_counter() - start)
+	latencies.sort()
+	return call_ms, latencies[-1] * 1e6, latencies[len(latencies) // 2] * 1e6, len(latencies)
+
+
+def main():
+	total_sets = (CONFIG['cache_size'] >> CONFIG['b']) // CONFIG['n_way']
+	print("%d items, %d sets to %d" % (CONFIG['cache_size'], total_sets, 2 * total_sets))
+	print("%14s %10s %12s %12s %10s" % ("", "call ms", "max get us", "median us", "gets"))
+	print("%14s %10.1f %12s %12s %10s" % ("rebuild", rebuild(), "-", "-", "-"))
+	for name, kwargs in [("resize", dict()), ("resize lazy", dict(lazy = True))]:
+		print("%14s %10.1f %12.1f %12.1f %10d" % ((name,) + resize(**kwargs)))
+
+
+if __name__ == '__main__':
+	main()
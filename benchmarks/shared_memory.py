@@ -0,0 +1,101 @@
+#shared_memory.py
+#benchmark the shared memory cache against the in-process cache: the cost of
+#a set and a get in one process, and the throughput of forked workers which
+#read through one shared cache, compared to workers which each fill their
+#own private cache (and so each load every key once).
+#
+#usage: python -m benchmarks.shared_memory
+
+import multiprocessing
+import os
+import random
+import time
+
+import cache
+
+
+OPS = 50000
+KEYS = 4096
+WORKERS = 4
+VALUE_SIZE = 64
+CONFIG = dict(cache_size = 8192, n_way = 8, b = 1)
+NAME = 'n_way_cache_bench_%d' % os.getpid()
+
+
+def single(test_cache):
+	"""single is to put and get random keys in one process.
+
+	Returns:
+		a tuple of the nanoseconds of a set and of a get.
+	"""
+	rng = random.Random(0)
+	keys = [rng.randrange(KEYS) for i in range(OPS)]
+	start = time.perf_counter()
+	for key in keys:
+		test_cache.set_value(key, key)
+	set_ns = (time.perf_counter() - start) / OPS * 1e9
+	start = time.perf_counter()
+	for key in keys:
+		test_cache.get_value(key)
+	get_ns = (time.perf_counter() - start) / OPS * 1e9
+	return set_ns, get_ns
+
+
+def worker(seed, shared, loads):
+	"""worker is to read random keys through a cache, setting the keys it \
+	misses, and to count its misses in `loads`.
+	"""
+	if shared:
+		test_cache = cache.SharedMemoryCache(NAME, CONFIG['cache_size'], CONFIG['n_way'], CONFIG['b'], int, int, value_size = VALUE_SIZE)
+	else:
+		test_cache = cache.Cache(CONFIG['cache_size'], CONFIG['n_way'], CONFIG['b'], int, int)
+	rng = random.Random(seed)
+	misses = 0
+	for i in range(OPS // WORKERS):
+		key = rng.randrange(KEYS)
+		if test_cache.get_value(key) == None:
+			misses += 1
+			test_cache.set_value(key, key)
+	with loads.get_lock():
+		loads.value += misses
+	if shared:
+		test_cache.close()
+
+
+def workers(shared):
+	"""workers is to run `WORKERS` forked workers.
+
+	Returns:
+		a tuple of the operations per second and the number of misses.
+	"""
+	context = multiprocessing.get_context('fork')
+	loads = context.Value('q', 0)
+	processes = [context.Process(target = worker, args = (seed, shared, loads)) for seed in range(WORKERS)]
+	start = time.perf_counter()
+	for process in processes:
+		process.start()
+	for process in processes:
+		process.join()
+	return OPS / (time.perf_counter() - start), loads.value
+
+
+def main():
+	shared_cache = cache.SharedMemoryCache(NAME, CONFIG['cache_size'], CONFIG['n_way'], CONFIG['b'], int, int, value_size = VALUE_SIZE)
+	try:
+		print("%10s %10s %10s" % ("cache", "set ns", "get ns"))
+		for name, test_cache in [("process", cache.Cache(CONFIG['cache_size'], CONFIG['n_way'], CONFIG['b'], int, int)),
+				("shared", shared_cache)]:
+			print("%10s %10.1f %10.1f" % ((name,) + single(test_cache)))
+		for key in range(KEYS):
+			shared_cache.delete(key, key)
+
+		print("%d workers, %d keys" % (WORKERS, KEYS))
+		print("%10s %10s %10s" % ("cache", "ops/s", "misses"))
+		for name, shared in [("process", False), ("shared", True)]:
+			print("%10s %10.0f %10d" % ((name,) + workers(shared)))
+	finally:
+		shared_cache.unlink()
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,83 @@
+#snapshot.py
+#benchmark snapshots of a cache of 256k items: the time to save one, the
+#time until a restored cache serves its first get (sets are restored when
+#they are first used), the time to restore every set, and the worst latency
+#of gets which run in another thread while a snapshot is saved.
+#
+#usage: python -m benchmarks.snapshot
+
+import os
+import tempfile
+import threading
+import time
+
+import cache
+
+
+KEYS = 2**18
+CONFIG = dict(cache_size = 2**18, n_way = 8, b = 2)
+
+
+def fill():
+	"""fill is to build a cache and put `KEYS` items into it.
+	"""
+	test_cache = cache.Cache(CONFIG['cache_size'], CONFIG['n_way'], CONFIG['b'], int, str)
+	test_cache.set_many([(key, 'value-%d' % key) for key in range(KEYS)])
+	return test_cache
+
+
+def save_under_load(test_cache, path):
+	"""save_under_load is to save a snapshot while another thread gets \
+	items.
+
+	Returns:
+		a tuple of the seconds of the save and the largest latency of a \
+		get in microseconds.
+	"""
+	stopped = threading.Event()
+	latencies = []
+
+	def reader():
+		key = 0
+		while not stopped.is_set():
+			start = time.perf_counter()
+			test_cache.get_value(key)
+			latencies.append(time.perf_counter() - start)
+			key = (key + 7919) % KEYS
+
+	thread = threading.Thread(target = reader)
+	thread.start()
+	start = time.perf_counter()
+	test_cache.save_snapshot(path)
+	elapsed = time.perf_counter() - start
+	stopped.set()
+	thread.join()
+	return elapsed, max(latencies) * 1e6
+
+
+def main():
+	test_cache = fill()
+	with tempfile.TemporaryDirectory() as directory:
+		path = os.path.join(directory, 'cache.snapshot')
+		save_s, worst_us = save_under_load(test_cache, path)
+		print("%d items, snapshot of %.1f MB" % (KEYS, os.path.getsize(path) / 2.0**20))
+		print("%-28s %10.3f" % ("save s", save_s))
+		print("%-28s %10.0f" % ("worst get us during save", worst_us))
+
+		restored = cache.Cache(CONFIG['cache_size'], CONFIG['n_way'], CONFIG['b'], int, str)
+		start = time.perf_counter()
+		restored.load_snapshot(path)
+		restored.get_value(12345)
+		print("%-28s %10.3f" % ("load + first get s", time.perf_counter() - start))
+		start = time.perf_counter()
+		stats = restored.stats()
+		print("%-28s %10.3f" % ("restore all sets s", time.perf_counter() - start))
+
+		start = time.perf_counter()
+		fill()
+		print("%-28s %10.3f" % ("refill with set_many s", time.perf_counter() - start))
+		print("%-28s %10d" % ("lines restored", stats['lines_used']))
+
+
+if __name__ == '__main__':
+	main()
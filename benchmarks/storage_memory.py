@@ -0,0 +1,82 @@
+#storage_memory.py
+#benchmark the memory used by a cache with the `object` and the `compact`
+#storage, empty and with an item in every slot, reported as bytes per item
+#slot (the items share one value, so only the cache is counted), and the
+#latency of a
+#set which evicts a line from a full compact set. The eviction latency
+#should stay flat as n_way grows.
+#
+#usage: python -m benchmarks.storage_memory
+
+import timeit
+import tracemalloc
+
+import cache
+
+
+CONFIGS = [
+	#(cache_size, n_way, b)
+	(2**14, 4, 2),
+	(2**16, 16, 3),
+	(2**18, 64, 3),
+	(2**18, 256, 3),
+]
+MISSES = 5000
+
+
+def bytes_per_slot(cache_size, n_way, b, storage, filled = False):
+	"""bytes_per_slot is to measure the memory allocated by building a cache, \
+	and with `filled` == True by putting an item into each of its slots.
+
+	Returns:
+		the allocated bytes divided by the number of item slots.
+	"""
+	items = [(key, 0) for key in range(cache_size)] if filled else None
+	tracemalloc.start()
+	test_cache = cache.Cache(cache_size, n_way, b, int, int, storage = storage)
+	if filled:
+		test_cache.set_many(items)
+	allocated = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	slots = test_cache.total_sets * n_way * test_cache.offset_size
+	return float(allocated) / slots
+
+
+def eviction_latency(n_way, b, misses = MISSES):
+	"""eviction_latency is to measure the average latency of a set into a \
+	full `CompactCacheSet`, every set evicts a line.
+
+	Returns:
+		the average latency of one set in nanoseconds.
+	"""
+	offset_size = 1 << b
+	storage = cache.CompactStorage(1, n_way, offset_size)
+	cache_set = cache.CompactCacheSet(storage, 0)
+	for tag in range(n_way):
+		cache_set.set(tag, tag, 0)
+	tags = iter(range(n_way, n_way + 3 * misses))
+	set_value = cache_set.set
+
+	def run():
+		for i in range(misses):
+			tag = next(tags)
+			set_value(tag, tag, 0)
+
+	best = min(timeit.repeat(run, number = 1, repeat = 3))
+	return best / misses * 1e9
+
+
+def main():
+	print("%10s %6s %3s %8s %14s %14s %8s %14s" % ("cache_size", "n_way", "b", 
+		"cache", "object B/slot", "compact B/slot", "ratio", "ns/eviction"))
+	for cache_size, n_way, b in CONFIGS:
+		latency = eviction_latency(n_way, b)
+		for filled in [False, True]:
+			obj = bytes_per_slot(cache_size, n_way, b, 'object', filled)
+			compact = bytes_per_slot(cache_size, n_way, b, 'compact', filled)
+			print("%10d %6d %3d %8s %14.1f %14.1f %7.1fx %14.1f" % (cache_size, n_way, 
+				b, 'filled' if filled else 'empty', obj, compact, obj / compact, latency))
+
+
+if __name__ == '__main__':
+	main()
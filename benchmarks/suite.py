@@ -0,0 +1,195 @@
+#suite.py
+#benchmark suite which replays the workloads of benchmarks.workloads against
+#a sweep of cache configurations (cache_size, n_way, b, replacement and
+#thread_safe_mode) and reports the throughput (ops/sec), the p50/p99
+#latency of one operation and the hit ratio. A get which misses puts the
+#key into the cache, like a read-through cache would.
+#
+#The results could be saved as JSON and a later run could be compared with
+#them, which exits with status 1 when a result regressed by more than the
+#threshold.
+#
+#usage: python -m benchmarks.suite [--output results.json]
+#	[--compare baseline.json] [--threshold 10] [--ops 20000] ...
+#see python -m benchmarks.suite --help for the sweep options.
+
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+
+import cache
+from benchmarks.workloads import WORKLOADS
+
+
+#the fields of a result which identify its configuration
+CONFIG_FIELDS = ('workload', 'cache_size', 'n_way', 'b', 'replacement', 'thread_safe_mode')
+
+
+def replay(test_cache, workload):
+	"""replay is to run a workload against a cache.
+	"""
+	get_value = test_cache.get_value
+	set_value = test_cache.set_value
+	for is_set, key in workload:
+		if is_set:
+			set_value(key, key)
+		elif get_value(key) == None:
+			set_value(key, key)
+
+
+def latencies(test_cache, workload):
+	"""latencies is to run a workload against a cache and time every \
+	operation.
+
+	Returns:
+		a sorted list of the nanoseconds of each operation.
+	"""
+	get_value = test_cache.get_value
+	set_value = test_cache.set_value
+	clock = time.perf_counter_ns
+	result = []
+	for is_set, key in workload:
+		start = clock()
+		if is_set:
+			set_value(key, key)
+		elif get_value(key) == None:
+			set_value(key, key)
+		result.append(clock() - start)
+	result.sort()
+	return result
+
+
+def run(config, workload, repeat = 3):
+	"""run is to benchmark one configuration with one workload. The \
+	throughput is the best of `repeat` runs, and the latencies are measured \
+	on a run of their own, so the timing of every operation doesn't slow \
+	down the throughput runs. Every run uses a fresh cache.
+
+	Returns:
+		a dict of the configuration and its ops_per_sec, p50_ns, p99_ns and \
+		hit_ratio.
+	"""
+	def new_cache():
+		return cache.Cache(config['cache_size'], config['n_way'], config['b'], int, int,
+			replacement = config['replacement'], thread_safe_mode = config['thread_safe_mode'])
+
+	elapsed = None
+	for i in range(repeat):
+		test_cache = new_cache()
+		start = time.perf_counter()
+		replay(test_cache, workload)
+		run_time = time.perf_counter() - start
+		if elapsed == None or run_time < elapsed:
+			elapsed = run_time
+	stats = test_cache.stats()
+	gets = stats['hits'] + stats['misses']
+
+	timings = latencies(new_cache(), workload)
+	result = dict(config)
+	result['ops_per_sec'] = len(workload) / elapsed
+	result['p50_ns'] = timings[len(timings) // 2]
+	result['p99_ns'] = timings[min(len(timings) - 1, len(timings) * 99 // 100)]
+	result['hit_ratio'] = stats['hits'] / gets if gets else 0.0
+	return result
+
+
+def sweep(args):
+	"""sweep is to benchmark every combination of the configurations and \
+	workloads chosen by `args`.
+
+	Returns:
+		a list of the results of `run`.
+	"""
+	results = []
+	for cache_size, n_way, b, replacement, thread_safe_mode in itertools.product(args.cache_sizes,
+			args.n_ways, args.bs, args.replacements, args.thread_safe_modes):
+		config = dict(cache_size = cache_size, n_way = n_way, b = b,
+			replacement = replacement, thread_safe_mode = thread_safe_mode)
+		for name in args.workloads:
+			workload = WORKLOADS[name](args.ops, cache_size * args.key_factor, seed = args.seed)
+			config['workload'] = name
+			result = run(config, workload, args.repeat)
+			results.append(result)
+			print("%8s %6d %3d %2d %4s %5s %12.0f %8d %8d %7.3f" % tuple(
+				[result[field] for field in CONFIG_FIELDS] + [result['ops_per_sec'],
+				result['p50_ns'], result['p99_ns'], result['hit_ratio']]))
+	return results
+
+
+def compare(results, baseline, threshold):
+	"""compare is to compare the results with a baseline. A result regressed \
+	when its ops/sec dropped or its p99 latency grew by more than \
+	`threshold` percent, or its hit ratio dropped by more than 0.01.
+
+	Returns:
+		the number of regressed results.
+	"""
+	def config_key(result):
+		return tuple(result[field] for field in CONFIG_FIELDS)
+
+	old_results = dict((config_key(result), result) for result in baseline['results'])
+	regressions = 0
+	print("\n%-40s %10s %10s %10s" % ("configuration", "ops/sec", "p99", "hit ratio"))
+	for result in results:
+		old = old_results.get(config_key(result))
+		if old == None:
+			continue
+		ops_change = 100.0 * (result['ops_per_sec'] / old['ops_per_sec'] - 1)
+		p99_change = 100.0 * (result['p99_ns'] / max(old['p99_ns'], 1) - 1)
+		hit_change = result['hit_ratio'] - old['hit_ratio']
+		regressed = ops_change < -threshold or p99_change > threshold or hit_change < -0.01
+		regressions += regressed
+		print("%-40s %+9.1f%% %+9.1f%% %+10.3f%s" % ("/".join(str(field) for field in config_key(result)),
+			ops_change, p99_change, hit_change, "  REGRESSED" if regressed else ""))
+	return regressions
+
+
+def parse_bool(text):
+	return text.lower() in ('1', 'true', 'yes')
+
+
+def main(argv = None):
+	parser = argparse.ArgumentParser(description = "benchmark suite of the N-way Set-associative cache")
+	parser.add_argument('--workloads', nargs = '+', default = sorted(WORKLOADS), choices = sorted(WORKLOADS))
+	parser.add_argument('--cache-sizes', nargs = '+', type = int, default = [1024, 8192])
+	parser.add_argument('--n-ways', nargs = '+', type = int, default = [2, 8])
+	parser.add_argument('--bs', nargs = '+', type = int, default = [1, 3])
+	parser.add_argument('--replacements', nargs = '+', default = ['LRU', 'MRU'])
+	parser.add_argument('--thread-safe-modes', nargs = '+', type = parse_bool, default = [True, False])
+	parser.add_argument('--ops', type = int, default = 20000, help = "operations per workload")
+	parser.add_argument('--key-factor', type = int, default = 4, help = "key space = cache_size * key factor")
+	parser.add_argument('--seed', type = int, default = 0)
+	parser.add_argument('--repeat', type = int, default = 3, help = "throughput runs, the best one is kept")
+	parser.add_argument('--output', help = "save the results into this JSON file")
+	parser.add_argument('--compare', help = "compare the results with this JSON file")
+	parser.add_argument('--threshold', type = float, default = 10.0, help = "regression threshold in percent")
+	args = parser.parse_args(argv)
+
+	print("%8s %6s %3s %2s %4s %5s %12s %8s %8s %7s" % ('workload', 'size', 'way', 'b',
+		'repl', 'safe', 'ops/sec', 'p50 ns', 'p99 ns', 'hit'))
+	results = sweep(args)
+
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump({
+				'python': platform.python_version(),
+				'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+				'ops': args.ops,
+				'key_factor': args.key_factor,
+				'seed': args.seed,
+				'repeat': args.repeat,
+				'results': results,
+			}, f, indent = 1)
+	if args.compare:
+		with open(args.compare) as f:
+			baseline = json.load(f)
+		if compare(results, baseline, args.threshold):
+			return 1
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,49 @@
+#tag_index.py
+#benchmark the hit latency of CacheSet.get_value as n_way grows.
+#with the per-set tag index the latency should stay flat instead of
+#growing with the number of ways.
+#
+#usage: python -m benchmarks.tag_index
+
+import random
+import timeit
+
+import cache
+
+
+N_WAYS = [1, 4, 16, 64, 128, 256, 512]
+OFFSET_SIZE = 8
+LOOKUPS = 5000
+
+
+def hit_latency(n_way, lookups = LOOKUPS):
+	"""hit_latency is to measure the average latency of a cache hit in a \
+	full cache set with `n_way` lines.
+
+	Returns:
+		the average latency of one hit in nanoseconds.
+	"""
+	cache_set = cache.CacheSet(n_way, OFFSET_SIZE)
+	tags = list(range(n_way))
+	for tag in tags:
+		cache_set.set(tag, tag, 0)
+	rng = random.Random(n_way)
+	probes = [rng.choice(tags) for i in range(lookups)]
+	get_value = cache_set.get_value
+
+	def run():
+		for tag in probes:
+			get_value(tag, 0)
+
+	best = min(timeit.repeat(run, number = 1, repeat = 3))
+	return best / lookups * 1e9
+
+
+def main():
+	print("%8s %14s" % ("n_way", "ns/hit"))
+	for n_way in N_WAYS:
+		print("%8d %14.1f" % (n_way, hit_latency(n_way)))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,47 @@
+#tracing.py
+#benchmark the cost of the tracing hooks: the latency of Cache.get_value
+#and Cache.set_value with tracing disabled and with a list sink.
+#
+#usage: python -m benchmarks.tracing
+
+import random
+import timeit
+
+import cache
+
+
+OPS = 20000
+
+
+def latency(tracer, op, ops = OPS):
+	"""latency is to measure the average latency of an operation.
+
+	Returns:
+		the average latency of one operation in nanoseconds.
+	"""
+	test_cache = cache.Cache(2**14, 4, 2, int, int, lock_stripes = 64, tracer = tracer)
+	rng = random.Random(0)
+	keys = [rng.randrange(2**14) for i in range(ops)]
+	for key in keys:
+		test_cache.set_value(key, key)
+	if op == 'get':
+		def run():
+			for key in keys:
+				test_cache.get_value(key)
+	else:
+		def run():
+			for key in keys:
+				test_cache.set_value(key, key)
+	best = min(timeit.repeat(run, number = 1, repeat = 5))
+	return best / ops * 1e9
+
+
+def main():
+	print("%10s %14s %14s" % ("op", "disabled ns", "list sink ns"))
+	for op in ['get', 'set']:
+		events = []
+		print("%10s %14.1f %14.1f" % (op, latency(None, op), latency(events.append, op)))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,62 @@
+#ttl.py
+#benchmark the time to live of items: the cost of a set and a get without a
+#ttl, with a ttl which doesn't pass, and with short ttls on a clock which
+#moves on, where expired items are freed by lookups, by sets into full sets
+#and by the timer wheel. The last rows show how many live lines were
+#evicted compared to how many expired items were freed.
+#
+#usage: python -m benchmarks.ttl
+
+import random
+import time
+
+import cache
+
+
+OPS = 100000
+KEYS = 16384
+CONFIG = dict(cache_size = 8192, n_way = 8, b = 1)
+
+
+def run(ttl, step):
+	"""run is to put and get random keys on a clock which moves `step` \
+	seconds per operation.
+
+	Returns:
+		a tuple of the nanoseconds of a set and of a get, and the stats of \
+		the cache.
+	"""
+	now = [0.0]
+	test_cache = cache.Cache(CONFIG['cache_size'], CONFIG['n_way'], CONFIG['b'], int, int,
+		ttl = ttl, clock = lambda: now[0])
+	rng = random.Random(0)
+	keys = [rng.randrange(KEYS) for i in range(OPS)]
+
+	start = time.perf_counter()
+	for key in keys:
+		now[0] += step
+		test_cache.set_value(key, key)
+	set_ns = (time.perf_counter() - start) / OPS * 1e9
+
+	start = time.perf_counter()
+	for key in keys:
+		now[0] += step
+		test_cache.get_value(key)
+	get_ns = (time.perf_counter() - start) / OPS * 1e9
+	return set_ns, get_ns, test_cache.stats()
+
+
+def main():
+	rows = [
+		("no ttl", None, 0.0),
+		("ttl live", 3600, 0.0),
+		("ttl churn", 30, 0.001),
+	]
+	print("%10s %10s %10s %10s %12s" % ("mode", "set ns", "get ns", "evictions", "expirations"))
+	for name, ttl, step in rows:
+		set_ns, get_ns, stats = run(ttl, step)
+		print("%10s %10.1f %10.1f %10d %12d" % (name, set_ns, get_ns, stats['evictions'], stats['expirations']))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,70 @@
+#vectorized.py
+#benchmark warming and probing a cache with a large batch of int keys:
+#one set_value/get_value per key, set_many_hashed/get_many_hashed with a
+#list of keys, and with a numpy array of keys (int keys are their own hash
+#results). The numpy rows are skipped when numpy is not installed.
+#
+#usage: python -m benchmarks.vectorized
+
+import random
+import timeit
+
+import cache
+
+
+KEYS = 200000
+
+
+def run(keys, warm, probe):
+	"""run is to measure the cost of one key when warming a new cache with \
+	`warm` and then probing it with `probe`.
+
+	Returns:
+		a tuple of the nanoseconds per key of warming and of probing.
+	"""
+	test_caches = []
+
+	def setup():
+		test_caches.append(cache.Cache(2**20, 8, 3, int, int, lock_stripes = 64))
+
+	def do_warm():
+		warm(test_caches[-1])
+
+	def do_probe():
+		probe(test_caches[-1])
+
+	warm_ns = min(timeit.repeat(do_warm, setup = setup, number = 1, repeat = 3)) / KEYS * 1e9
+	probe_ns = min(timeit.repeat(do_probe, number = 1, repeat = 3)) / KEYS * 1e9
+	return warm_ns, probe_ns
+
+
+def main():
+	rng = random.Random(0)
+	keys = [rng.randrange(2**24) for i in range(KEYS)]
+
+	def warm_single(test_cache):
+		for key in keys:
+			test_cache.set_value(key, key)
+
+	def probe_single(test_cache):
+		for key in keys:
+			test_cache.get_value(key)
+
+	rows = [
+		("single", warm_single, probe_single),
+		("list", lambda test_cache: test_cache.set_many_hashed(keys, keys),
+			lambda test_cache: test_cache.get_many_hashed(keys)),
+	]
+	if cache.numpy != None:
+		array = cache.numpy.array(keys, dtype = cache.numpy.int64)
+		rows.append(("numpy", lambda test_cache: test_cache.set_many_hashed(array, array),
+			lambda test_cache: test_cache.get_many_hashed(array)))
+
+	print("%8s %12s %12s" % ("input", "warm ns", "probe ns"))
+	for name, warm, probe in rows:
+		warm_ns, probe_ns = run(keys, warm, probe)
+		print("%8s %12.1f %12.1f" % (name, warm_ns, probe_ns))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,62 @@
+#victim_buffer.py
+#benchmark the victim buffer on conflict-heavy traces: a direct-mapped and
+#a 2-way cache read a loop of lines which map to a few sets, one line more
+#per set than it has ways, so LRU evicts every line before it is read
+#again while most of the cache is empty. A Zipfian trace over a key space
+#larger than the cache shows the buffer on capacity misses. Reports the hit
+#ratio, the hits served by the buffer and the cost of a read.
+#
+#usage: python -m benchmarks.victim_buffer
+
+import time
+
+import cache
+from benchmarks.workloads import zipf
+
+
+CACHE_SIZE = 8192
+B = 1
+OPS = 100000
+HOT_SETS = 32
+VICTIM_LINES = [None, 16, 64, 256]
+
+
+def conflict(n_way):
+	"""conflict is to build a trace which loops over `n_way` + 1 lines in \
+	each of `HOT_SETS` sets.
+	"""
+	total_sets = CACHE_SIZE // (2**B) // n_way
+	keys = [(way * total_sets + set_num) << B for way in range(n_way + 1) for set_num in range(HOT_SETS)]
+	return [keys[i % len(keys)] for i in range(OPS)]
+
+
+def run(keys, n_way, victim_lines):
+	"""run is to read `keys`, setting the keys which miss.
+
+	Returns:
+		a tuple of the hit ratio, the victim hits and the microseconds of \
+		a read.
+	"""
+	test_cache = cache.Cache(CACHE_SIZE, n_way, B, int, int, victim_lines = victim_lines)
+	get_value = test_cache.get_value
+	set_value = test_cache.set_value
+	start = time.perf_counter()
+	for key in keys:
+		if get_value(key) == None:
+			set_value(key, key)
+	elapsed = time.perf_counter() - start
+	stats = test_cache.stats()
+	return stats['hits'] / (stats['hits'] + stats['misses']), stats['victim_hits'], elapsed / len(keys) * 1e6
+
+
+def main():
+	print("%8s %6s %8s %10s %12s %8s" % ("trace", "n_way", "victims", "hit ratio", "victim hits", "us/op"))
+	for n_way in [1, 2]:
+		traces = [("conflict", conflict(n_way)), ("zipf", [key for _, key in zipf(OPS, CACHE_SIZE * 4)])]
+		for name, keys in traces:
+			for victim_lines in VICTIM_LINES:
+				print("%8s %6d %8s %10.3f %12d %8.2f" % ((name, n_way, victim_lines) + run(keys, n_way, victim_lines)))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,83 @@
+#weight.py
+#benchmark a cache with a weight budget against one which only counts
+#items, on values from 40 bytes to 2 MB (the values are their own sizes, so
+#no memory is allocated). The resident size of the item counting cache
+#depends on which values happen to be in it, the budgeted cache stays
+#within its budget. Also shows the cost of weighing on a set and a get.
+#
+#usage: python -m benchmarks.weight
+
+import random
+import time
+
+import cache
+
+
+OPS = 50000
+KEYS = 20000
+#64 sets, each of them gets 4 MB of the budget, so the largest values fit
+CONFIG = dict(cache_size = 8192, n_way = 16, b = 3)
+MAX_WEIGHT = 256 * 2**20
+
+
+def value_size(rng):
+	"""value_size is to draw the size of a value: 90% of the values are \
+	small rows, 10% are large blobs.
+	"""
+	if rng.random() < 0.9:
+		return rng.randint(40, 4096)
+	return rng.randint(4096, 2 * 2**20)
+
+
+def resident(test_cache):
+	"""resident is to sum up the sizes of the values in a cache of \
+	`CacheSet`s.
+	"""
+	total = 0
+	for cache_set in test_cache.sets:
+		for line in cache_set.lines:
+			total += sum(value for value, valid in zip(line.offset, line.valid) if valid)
+	return total
+
+
+def run(**kwargs):
+	"""run is to replay a read-through workload of Zipfian keys.
+
+	Returns:
+		a tuple of the nanoseconds of an operation, the hit ratio, and the \
+		largest and the final resident size in bytes.
+	"""
+	rng = random.Random(0)
+	sizes = [value_size(rng) for i in range(KEYS)]
+	weights = [1.0 / (k + 1) for k in range(KEYS)]
+	keys = rng.choices(range(KEYS), weights = weights, k = OPS)
+	test_cache = cache.Cache(CONFIG['cache_size'], CONFIG['n_way'], CONFIG['b'], int, int, **kwargs)
+	largest = 0
+	start = time.perf_counter()
+	for n, key in enumerate(keys):
+		if test_cache.get_value(key) == None:
+			test_cache.set_value(key, sizes[key])
+		if n % 5000 == 0:
+			pause = time.perf_counter()
+			largest = max(largest, resident(test_cache))
+			start += time.perf_counter() - pause
+	op_ns = (time.perf_counter() - start) / OPS * 1e9
+	stats = test_cache.stats()
+	final = resident(test_cache)
+	return op_ns, stats['hits'] / (stats['hits'] + stats['misses']), max(largest, final), final
+
+
+def main():
+	rows = [
+		("items", dict()),
+		("weight", dict(max_weight = MAX_WEIGHT, weigher = lambda key, value: value)),
+	]
+	print("budget %d MB" % (MAX_WEIGHT // 2**20))
+	print("%8s %10s %7s %12s %12s" % ("mode", "op ns", "hit", "largest MB", "final MB"))
+	for name, kwargs in rows:
+		op_ns, hit_ratio, largest, final = run(**kwargs)
+		print("%8s %10.1f %7.3f %12.1f %12.1f" % (name, op_ns, hit_ratio, largest / 2.0**20, final / 2.0**20))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,67 @@
+#workloads.py
+#workload generators of the benchmark suite. A workload is a list of
+#(is_set, key) pairs with int keys, replayed against a cache by
+#benchmarks.suite. Every generator takes the number of operations, the key
+#space and a seed, so the same arguments always give the same workload.
+
+import itertools
+import random
+
+
+def uniform(ops, key_space, seed = 0):
+	"""uniform is to read keys drawn uniformly from the key space.
+	"""
+	rng = random.Random(seed)
+	return [(False, rng.randrange(key_space)) for i in range(ops)]
+
+
+def zipf(ops, key_space, seed = 0, s = 1.0):
+	"""zipf is to read keys drawn from a Zipfian distribution, key k is \
+	read with a probability proportional to 1 / (k + 1) ** s. The ranks are \
+	shuffled over the key space so the hot keys don't share sets.
+	"""
+	rng = random.Random(seed)
+	cum_weights = list(itertools.accumulate(1.0 / (k + 1) ** s for k in range(key_space)))
+	ranks = list(range(key_space))
+	rng.shuffle(ranks)
+	return [(False, ranks[k]) for k in rng.choices(range(key_space), cum_weights = cum_weights, k = ops)]
+
+
+def scan(ops, key_space, seed = 0):
+	"""scan is to read the whole key space in order, again and again. A \
+	key space larger than the cache defeats LRU.
+	"""
+	return [(False, i % key_space) for i in range(ops)]
+
+
+def loop(ops, key_space, seed = 0, loop_size = None):
+	"""loop is to read a small working set (a tenth of the key space by \
+	default) in order, again and again, with 10% of the reads going to \
+	random keys of the whole key space.
+	"""
+	rng = random.Random(seed)
+	loop_size = loop_size or max(1, key_space // 10)
+	workload = []
+	for i in range(ops):
+		if rng.random() < 0.1:
+			workload.append((False, rng.randrange(key_space)))
+		else:
+			workload.append((False, i % loop_size))
+	return workload
+
+
+def mixed(ops, key_space, seed = 0, write_ratio = 0.2):
+	"""mixed is a Zipfian workload where `write_ratio` of the operations \
+	are sets instead of gets.
+	"""
+	rng = random.Random(seed + 1)
+	return [(rng.random() < write_ratio, key) for _, key in zipf(ops, key_space, seed)]
+
+
+WORKLOADS = {
+	'uniform': uniform,
+	'zipf': zipf,
+	'scan': scan,
+	'loop': loop,
+	'mixed': mixed,
+}
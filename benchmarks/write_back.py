@@ -0,0 +1,55 @@
+#write_back.py
+#benchmark write-back against write-through on a burst of Zipfian writes:
+#every backend write costs 100 us of round trip plus 1 us per item (a
+#sleep). Write-through sends every set to the backend, write-back only
+#sends the dirty items of evicted lines, in one batch per set operation,
+#and the rest with one flush, so repeated writes of hot keys are absorbed.
+#
+#usage: python -m benchmarks.write_back
+
+import time
+
+import cache
+from benchmarks.workloads import zipf
+
+
+OPS = 50000
+KEYS = 20000
+ROUND_TRIP = 100e-6
+PER_ITEM = 1e-6
+CONFIG = dict(cache_size = 4096, n_way = 8, b = 2)
+
+
+def run(write_through):
+	"""run is to set the keys of a Zipfian workload and flush the cache.
+
+	Returns:
+		a tuple of the backend calls, the written items and the seconds \
+		of the burst and the flush.
+	"""
+	calls = [0, 0]
+
+	def writer(items):
+		calls[0] += 1
+		calls[1] += len(items)
+		time.sleep(ROUND_TRIP + PER_ITEM * len(items))
+
+	test_cache = cache.Cache(CONFIG['cache_size'], CONFIG['n_way'], CONFIG['b'], int, int, 
+		writer = writer, write_through = write_through)
+	keys = [key for _, key in zipf(OPS, KEYS)]
+	start = time.perf_counter()
+	for n, key in enumerate(keys):
+		test_cache.set_value(key, n)
+	test_cache.flush()
+	return calls[0], calls[1], time.perf_counter() - start
+
+
+def main():
+	print("%d Zipfian writes of %d keys, %d slots" % (OPS, KEYS, CONFIG['cache_size']))
+	print("%14s %10s %10s %8s" % ("mode", "calls", "items", "s"))
+	for name, write_through in [("write-through", True), ("write-back", False)]:
+		print("%14s %10d %10d %8.2f" % ((name,) + run(write_through)))
+
+
+if __name__ == '__main__':
+	main()
@@ -39,7 +39,11 @@ Following values are optional. Users are free to use.
 
 replacement(:obj:`ReplacementPolicy`, optional): `replacement` is to set the cache \
 	replacement policy. User could either to pass a subclass of \
-	`ReplacementPolicy` or pass a string to specify the `LRU` or `MRU` policy. \
+	`ReplacementPolicy` (or a factory), which is called as \
+	replacement(n_way, thread_safe_mode = thread_safe_mode) to build the \
+	policy of each set, or pass a string to specify the `LRU` or `MRU` policy, \
+	the `TREE_PLRU` or `BIT_PLRU` pseudo-LRU policy, or one of `FIFO`, `CLOCK`, \
+	`RANDOM`, `LFU` (with aging) and the scan resistant `SLRU`, `2Q` and `ARC`. \
 	Default setting is `LRU`.
 
 	For details about LRU, see here: 
@@ -50,6 +54,10 @@ replacement(:obj:`ReplacementPolicy`, optional): `replacement` is to set the cac
 
 	https://en.wikipedia.org/wiki/Cache_replacement_policies#Most_recently_used_(MRU)
 
+	For details about pseudo-LRU, see here:
+
+	https://en.wikipedia.org/wiki/Pseudo-LRU
+
 hash(:func:, optional): `hash` is to provide the hash function that used to hash keys \
 	of the items. Default setting is to use python's built-in hash function. 
 
@@ -58,6 +66,51 @@ thread_safe_mode(bool, optional): when `thread_safe_mode` == True, means the \
         have worse performance regrading of time since lock is costly. Default \
         setting is True (enable thread safe mode).
 
+storage(string, optional): `storage` is to choose how cache lines are stored. \
+	`object` keeps one `CacheLine` object per line, `compact` keeps the lines \
+	of the whole cache in flat arrays, which takes much less memory but only \
+	supports the `LRU` and `MRU` policies. Default setting is `object`.
+
+lock_stripes(int, optional): when `lock_stripes` is set in thread safe mode, \
+	the cache keeps `lock_stripes` locks and each set is guarded by one of them \
+	only, instead of a lock in every cache, set, line and replacement policy \
+	object. Operations on sets guarded by different locks don't contend. \
+	Default setting is None.
+
+admission(string, optional): `admission` is to put an admission filter in \
+	front of the eviction of each set. With `TINYLFU`, a new line which would \
+	evict a victim is only admitted if its tag was accessed more often than \
+	the victim's lately, so keys used once don't flush lines of hot items. \
+	Default setting is None.
+
+verify_keys(bool, optional): when `verify_keys` == True, every slot keeps the \
+	key and a fingerprint of its item, and a lookup only finds the item of an \
+	equal key (the fingerprints are compared first). Keys whose hash results \
+	collide then can't return each other's values, which makes fast custom \
+	`hash` functions safe. Default setting is False.
+
+ttl(float, optional): `ttl` is the default time to live of the items in \
+	seconds, set_value(key, value, ttl) could give an item its own. An \
+	expired item is a miss. Its slot is freed lazily when it is looked up, \
+	before a line of its full set is evicted, or by the hierarchical timer \
+	wheel of the cache (see `TimerWheel`), which `expire` advances on every \
+	set or a background thread advances with `start_sweeper`. `clock` is \
+	the function of the current time, `time.monotonic` by default. Default \
+	setting is None (items don't expire).
+
+max_weight(int, optional): `max_weight` is a weight budget of the cache, \
+	e.g. in bytes, with `weigher(key, value)` giving the weight of an item. \
+	Each set gets an equal share of the budget and evicts lines until a new \
+	item fits, and items heavier than `max_item_weight` (the share of a set \
+	by default) are rejected. Default setting is None (items are not \
+	weighed).
+
+tracer(:func:, optional): `tracer` is a callable which receives a `TraceEvent` \
+	(operation, set number, tag, hit or miss, evicted tag, lock wait and \
+	timing) for every operation on a set. `ChromeTraceWriter` writes the \
+	events into a Chrome trace JSON file. Default setting is None, tracing \
+	is disabled and costs only a check per operation.
+
 Operations:
 The cache module provide three operations. 
 
@@ -94,6 +147,65 @@ The cache module provide three operations.
                 policy object. 	 
 	Replacement policy object should be updated under all of the situations. 
 
+4. get_many(keys), set_many(items), delete_many(items): batch versions of \
+	the three operations above. All keys are hashed once and grouped by set, \
+	and the lock of each set is taken once per group. get_many returns a dict \
+	of the items found, or a list in the order of `keys` with `ordered=True`.
+
+5. get_many_hashed(hash_results), set_many_hashed(hash_results, values): \
+	batch operations on the hash results of the keys. When numpy is \
+	installed (optional), a numpy array of hash results is split into set \
+	numbers, offset indexes and tags and grouped by set at array speed.
+
+6. stats(reset=False), reset_stats(): the counters of hits, misses, \
+	updates, fills, evictions, conflict evictions, deletes, rejections and \
+	expirations, and the occupancy of each set. The counters are kept per \
+	set and summed up on read, see `CacheStats`.
+
+7. get_or_load(key, loader): get an item, or load it with loader(key) and \
+	put it into the cache on a miss. Concurrent misses of a key wait for a \
+	single load (single flight), and an exception of `loader` is raised in \
+	every caller which waited for it and nothing is cached.
+
+8. `AsyncCache`: an asyncio front-end with `await get`, `set`, `delete`, \
+	the batch operations and get_or_load(key, async_loader), which \
+	coalesces concurrent misses on asyncio futures. Its cache has no locks \
+	by default, so the operations never block the event loop.
+
+9. `SharedMemoryCache`: a cache kept in a named shared memory segment, so \
+	worker processes which open it by name share one cache. Values are \
+	pickled into fixed size slots, keys are hashed with `stable_hash` and \
+	the sets are locked with file record locks.
+
+10. save_snapshot(path), load_snapshot(path): write the items of the cache \
+	into a file, set by set, and restore them after a restart. The file is \
+	mapped into memory and each set is restored when it is first used.
+
+11. get_or_load_block(key, block_loader): like get_or_load, but a miss \
+	loads every key of the line of `key` with one call of block_loader(keys) \
+	and fills the line at once. With int keys and an identity hash a line \
+	holds 2**b consecutive keys, so a range of ids misses once per line.
+
+12. flush(): with a `writer`, the cache is write-back: sets only mark \
+	items dirty, and the dirty items of a line are written in one batch \
+	when the line is evicted, and all of them by flush. `write_through` \
+	writes on every set instead.
+
+13. listener: a function called with a list of RemovalNotification(key, \
+	value, cause), cause being 'evicted', 'expired', 'replaced' or \
+	'deleted'. Removals are queued under the set lock and dispatched in \
+	batches by a background thread, stop_dispatcher stops it.
+
+14. resize(cache_size, n_way, max_weight): change the number of sets \
+	(and ways, and the weight budget) of the cache, keeping its items. \
+	The lines move to their new sets incrementally, a few sets per \
+	operation, as in a progressive rehash.
+
+15. victim_lines: a small fully associative buffer, shared by the sets, \
+	keeps the lines they evict, and a set which misses a line takes it \
+	back from there (a victim cache), which absorbs conflict misses of \
+	sets with few ways.
+
 Test: Please see cache_test.py to see the unit test code. 
 
 Usage:
@@ -120,1053 +232,6357 @@ import sys
 import math
 import unittest
 import threading
-import logging
+import time
+import json
+import os
+import collections
+import random
+import asyncio
+import functools
+import hashlib
+import pickle
+import tempfile
+import mmap
+import struct
+from array import array
+from itertools import repeat
 
+try:
+	import numpy
+except ImportError:
+	numpy = None
 
-logging.basicConfig(filename='cache_debug_log.log',level=logging.DEBUG)
+#the shared memory backend needs shared memory segments and POSIX record 
+#locks, which are not available on every platform 
+try:
+	import fcntl
+	from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+	fcntl = None
+	shared_memory = None
 
-class CacheLine(object):
-	'''CacheLine class serves as a cache line in the cache.'''
-	def __init__(self, offset_size, tag = None, thread_safe_mode = True):
-		"""The __init__ method of a cache is used to initialize a cache line.
 
-		Args:
-			offset_size(int): `offset_size` is used to set the offset size in \
-				a cache line. 
+#MISSING is returned by lookups when an item is not in the cache, since None 
+#could be a value put into the cache by users. 
+MISSING = object()
 
-			tag(int, optional): `tag` is the tag of a line. When the line is \
-				empty, it is set to be None. Default value is None. 
+#the bits of the hash of a key which are kept as its fingerprint 
+FINGERPRINT_MASK = 0xFFFFFFFF
 
-			thread_safe_mode(bool, optional): when `thread_safe_mode` == True, \
-				means the class is thread safe, One thing must be noted is that \
-				thread safe mode will have worse performance regrading of time \
-				since lock is costly. Default setting is True (enable thread \
-				safe mode).
 
-		"""
-		super(CacheLine, self).__init__()
+def check_entry(entry, check):
+	"""check_entry is to match an entry (fingerprint, key, value) of a cache \
+	which verifies keys with the (fingerprint, key) of the key looked up. \
+	The fingerprints are compared first, so most mismatches cost one int \
+	compare instead of comparing the keys.
 
-		if thread_safe_mode:
-			self.lock = threading.Lock()
-		else:
-			self.lock = None
-		self.tag = tag
-		self.offset = [ None ] * offset_size
-		#valid list is to mark if user put in items (it is possible that user 
-		#put None into cache too, 
-		#so we need to keep track if it's valid. 1 means user put in something
-		# into cache, otherwise 0. 
-		self.valid = [0] * offset_size 
-		#valid_count is to keep track of the number of valid items in the 
-		#cache line. 
-		self.valid_count = 0
-		self.offset_size = offset_size
+	Args:
+		entry(tuple): `entry` is the (fingerprint, key, value) in the slot.
 
-	def get_tag(self):
-		"""get_tag is a function to get the tag of the current cache line. 
+		check(tuple): `check` is the (fingerprint, key) of the key.
 
-		Returns:
-			return the tag of the current cache line .
+	Returns:
+		the value if the keys are equal, `MISSING` otherwise.
+	"""
+	if entry[0] == check[0] and entry[1] == check[1]:
+		return entry[2]
+	return MISSING
 
-		"""
-		return self.tag
 
-	def match_tag(self, tag):
-		"""match_tag is a function to see if a tag is the same as the tag of the \
-		current cache line. 
+TraceEvent = collections.namedtuple('TraceEvent', ['op', 'set_num', 'tag', 
+	'hit', 'evicted', 'lock_wait', 'start', 'duration', 'thread'])
+TraceEvent.__doc__ = '''TraceEvent is the record of one operation on a cache \
+set which is sent to the tracer of a cache.
 
-		Args:
-			tag(int): `tag` is the tag of a line.
+	op(string): the operation, `get`, `set` or `delete`.
 
-		Returns:
-			return True if a tag is the same as the tag of the current cache line. \
-			False Otherwise. 
+	set_num(int): the number of the set.
 
-		"""
-		return self.tag == tag
+	tag(int): the tag of the hashed item key.
+
+	hit(bool): True if the item (for `set`, the line) was in the set. None \
+		for a `set` rejected by the admission filter.
+
+	evicted(int): the tag of the line evicted by a `set`, None otherwise.
+
+	lock_wait(float): seconds spent on waiting for the lock of the set.
+
+	start(float): `time.perf_counter` when the operation started.
+
+	duration(float): seconds the operation took, lock wait included.
+
+	thread(int): the identifier of the thread which ran the operation.
+'''
+
+
+RemovalNotification = collections.namedtuple('RemovalNotification', ['key', 'value', 'cause'])
+RemovalNotification.__doc__ = '''RemovalNotification is the record of an item \
+which left a cache, which is sent to the removal listener of the cache.
+
+	key(key_type): the key of the item.
+
+	value(value_type): the value of the item.
 
-	def set_tag(self, tag):
-		"""set_tag is a function to set tag of the current cache line. 
+	cause(string): why the item left, `evicted` (its line was evicted), \
+		`replaced` (a set put another value into its slot), `deleted` or \
+		`expired`.
+'''
+
+
+def trace_operation(cache_set, op, tag, body, args):
+	"""trace_operation is to run the body of an operation of a cache set under \
+	the lock of the set and send a `TraceEvent` of it to the tracer of the \
+	set. It is only used when tracing is enabled, so the untraced operations \
+	don't pay for the timing.
+
+	Args:
+		cache_set(:obj:`CacheSet`): `cache_set` is the set which runs the \
+			operation.
 
-		Args:
-			tag(int): `tag` is the tag of a line.
+		op(string): `op` is the name of the operation.
 
-		"""
-		self.tag = tag
+		tag(int): `tag` is the tag of the hashed item key.
 
-	def set(self, offset_index, value):
+		body(:func:): `body` is the body of the operation, `store`, `lookup` \
+			or `remove` of the set.
 
-		"""set is to put an item(a key and value pair) into the cache line.
+		args(tuple): `args` is the arguments of `body`.
 
-		Args:
-			offset_index(int): `offset_index` is the index of the cache line offset \
-				where the item will be put into.
+	Returns:
+		the result of `body`.
+	"""
+	lock = cache_set.lock
+	start = time.perf_counter()
+	if lock != None:
+		lock.acquire()
+	acquired = time.perf_counter()
+	try:
+		result = body(*args)
+	finally:
+		if lock != None:
+			lock.release()
+	end = time.perf_counter()
+	evicted = None
+	if op == 'set':
+		hit, evicted = result
+	elif op == 'get':
+		hit = result is not MISSING
+	else:
+		hit = result is True
+	tracer = cache_set.tracer
+	if tracer != None:
+		tracer(TraceEvent(op, cache_set.set_num, tag, hit, evicted, 
+			acquired - start, start, end - start, threading.get_ident()))
+	return result
 
-			value(value_type): `value` is the value of the item
 
-		"""
+def run_batch(cache_set, op, body, *columns):
+	"""run_batch is to run the body of an operation of a cache set for a \
+	batch of requests, taking the lock of the set only once. When tracing is \
+	enabled, every request is traced as an operation of its own.
 
-		logging.debug("cacheline set acquire a lock")
-		out_of_bound = False 
-		if self.lock != None:
-			self.lock.acquire()
-		try:
-			self.valid[offset_index] = 1
-			self.offset[offset_index] = value
-			self.valid_count += 1 
-		except: #could be out of bound 
-			out_of_bound = True
-		logging.debug("cacheline set release a lock") 
-		if self.lock != None:
-			self.lock.release()
-		if out_of_bound:
-			raise IndexError("Out of bound", sys.exc_info()[0]) 
+	Args:
+		cache_set(:obj:`CacheSet`): `cache_set` is the set which runs the \
+			operations.
 
+		op(string): `op` is the name of the operation.
 
-	def get(self, offset_index):
-		"""get is to get an item(a key and value pair) from the cache line.
+		body(:func:): `body` is the body of the operation, `store`, `lookup` \
+			or `remove` of the set.
 
-		Args:
-			offset_index(int): `offset_index` is the index of the cache line \
-				offset where the item will be get from.
+		columns(list): each of `columns` is a list of one argument of \
+			`body`, the i-th request is body(columns[0][i], columns[1][i], ...)
 
-		Returns:
-			if the value exist, return the value of the key. Otherwise raise \
-			 an error.
-		"""
-		logging.debug("cacheline get acquire a lock") 
-		if self.lock != None:
-			self.lock.acquire()
-		try:
-			if self.valid[offset_index] == 1:
-				logging.debug("cacheline get release a lock")
-				self.lock.release() 
-				return self.offset[offset_index]
-			else: 
-				raise ValueError("Access unintialized offset")
-		except:
-			logging.debug("Unexpected error:", sys.exc_info()[0])
-		logging.debug("cacheline get release a lock") 
-		if self.lock != None:
-			self.lock.release() 
+	Returns:
+		a list of the results of `body`, in the order of the requests.
+	"""
+	if cache_set.tracer != None:
+		#the tag is the second argument of store and the first one of the others
+		tag_index = 1 if op == 'set' else 0
+		return [trace_operation(cache_set, op, args[tag_index], body, args) for args in zip(*columns)]
+	lock = cache_set.lock
+	if lock != None:
+		lock.acquire()
+	try:
+		return list(map(body, *columns))
+	finally:
+		if lock != None:
+			lock.release()
 
 
+def is_expired(cache_set, tag, offset):
+	"""is_expired is to check if the time to live of an item in a cache set \
+	passed, and drop the item if it did (lazy expiry). The caller should \
+	hold the lock of the set.
 
-	def delete(self, offset_index, value):
+	Args:
+		cache_set(:obj:`CacheSet`): `cache_set` is the set of the item.
 
-		"""delete is to delete the item which in the offset index and match the \
-		 value.
+		tag(int): `tag` is the tag of the hashed item key.
 
-		Args:
-			offset_index(int): `offset_index` is the index of the cache line \
-				offset where the item shoule be located at.
+		offset(int): `offset` is the offset of the hashed item.
 
-			value(value_type): `value` is the value of the item which is going to be \
-				deleted.
+	Returns:
+		True if the item expired and was dropped, False otherwise.
+	"""
+	deadline = cache_set.deadlines.get((tag, offset))
+	if deadline == None or deadline > cache_set.clock():
+		return False
+	cache_set.drop(tag, offset)
+	return True
 
-		Returns:
-			if the value exist and be successfully deleted, and if the line \
-			become an empty line, then it also will needed remove from the LRU \
-			replacer, so return the tag of it; if the line isn't empty, then \
-			return None. if not successfully deleted, return False.
-		"""
 
-		logging.debug("cacheline delete acquire a lock") 
-		if self.lock != None:
-			self.lock.acquire() 
-		if self.valid[offset_index] == 1 and self.offset[offset_index] == value:
-			self.offset[offset_index] = None
-			self.valid[offset_index] = 0
-			self.valid_count -= 1
+def set_deadline(cache_set, tag, offset, deadline):
+	"""set_deadline is to keep the deadline of an item which was just put \
+	into a cache set, or forget the deadline of the previous item when the \
+	new one doesn't expire. The caller should hold the lock of the set.
 
-			if self.valid_count == 0:
-				#need to also deal with LRU replacer & clear the tag
-				tag_to_delete = self.tag
-				self.tag = None
-				if self.lock != None:
-					self.lock.release()
-				logging.debug("cacheline delete release a lock") 
-				return tag_to_delete
-			else:
-				logging.debug("cacheline delete release a lock") 
-				if self.lock != None:
-					self.lock.release() 
+	Args:
+		cache_set(:obj:`CacheSet`): `cache_set` is the set of the item.
 
-		else:
-			logging.debug("cacheline delete release a lock") 
-			if self.lock != None:
-				self.lock.release() 
-			return False # fails to delete
+		tag(int): `tag` is the tag of the hashed item key.
 
-	def clearline(self):
-		"""clearline is a function to clear the whole line. \
-		It is handy when the whole line is needed to be evicted. 
-		"""
+		offset(int): `offset` is the offset of the hashed item.
+
+		deadline(float): `deadline` is the time when the item expires, or \
+			None.
 
-		self.set_tag(None)
-		logging.debug("cacheline clearline acquire a lock") 
-		if self.lock != None:
-			self.lock.acquire() 
+	"""
+	if deadline != None:
+		cache_set.deadlines[(tag, offset)] = deadline
+		if deadline < cache_set.next_deadline:
+			cache_set.next_deadline = deadline
+	elif cache_set.deadlines:
+		cache_set.deadlines.pop((tag, offset), None)
 
-		for i in range(self.offset_size):
-			self.valid[i] = 0
-			self.offset[i] = None
-		self.valid_count = 0
-		logging.debug("cacheline clearline release a lock") 
-		if self.lock != None:
-			self.lock.release() 
 
-class Node(object):
-	'''Node class is a node used in implementation of doubly linked list.'''
-	def __init__(self, tag, index):
-		'''The __init__ method of a Node is used to initialize a Node. \
-			Here, a node represent a cache line and used to decide the evict \
-			order of cache lines. 
+def forget_deadlines(cache_set, tag):
+	"""forget_deadlines is to forget the deadlines of the items of a line \
+	which was evicted. The caller should hold the lock of the set.
 
-			tag(int): the tag of the cache line the node represents.
+	Args:
+		cache_set(:obj:`CacheSet`): `cache_set` is the set of the line.
 
-			index(int): the index of the cache line in the cache set.
+		tag(int): `tag` is the tag of the line.
 
-			prev(node): the previous node of the current node. 
+	"""
+	deadlines = cache_set.deadlines
+	for offset in range(cache_set.offset_size):
+		deadlines.pop((tag, offset), None)
 
-			next(node): the next node of the current node. '''
-		super(Node, self).__init__()
-		self.tag = tag
-		self.index = index
-		self.prev = None
-		self.next = None
-	def set_prev(self, prev):
-		"""set_prev is a function to set the previous node of the current node.
 
-		Args:
-			prev(:obj:`Node`): `prev` is the node that will be the previous node of \
-			the current node.
+def set_weight(cache_set, way, offset, weight):
+	"""set_weight is to keep the weight of the item in a slot of a cache \
+	set and update the weight of the set. The caller should hold the lock \
+	of the set.
 
-		"""
-		self.prev = prev
-	def get_prev(self):
-		"""get_prev is a function to get the previous node of the current node. 
+	Args:
+		cache_set(:obj:`CacheSet`): `cache_set` is the set of the item.
 
-		Returns:
-			return a node which is the previous node of the current node.
+		way(int): `way` is the index of the line of the item.
 
-		"""
-		return self.prev
-	def set_next(self, next):
-		"""set_next is a function to set the next node of the current node. 
+		offset(int): `offset` is the offset of the item in the line.
 
-		Args:
-			next(:obj:`Node`): `next` is the node that will be the next node of the \
-			current node.
+		weight(int): `weight` is the weight of the item, 0 for an empty slot.
 
-		"""
-		self.next = next
-	def get_next(self):
-		"""get_next is a function to get the next node of the current node. 
+	"""
+	weights = cache_set.weights[way]
+	cache_set.weight += weight - weights[offset]
+	weights[offset] = weight
 
-		Returns:
-			return a node which is the next node of the current node.
 
-		"""
-		return self.next
-	def get_index(self):
-		"""get_index is a function to get the cache line index of the current \
-		node. 
+def clear_weights(cache_set, way):
+	"""clear_weights is to forget the weights of the items of a line which \
+	was evicted. The caller should hold the lock of the set.
 
-		Returns:
-			return a cache line index of the current node.
+	Args:
+		cache_set(:obj:`CacheSet`): `cache_set` is the set of the line.
 
-		"""
-		return self.index 
-	def get_tag(self):
-		"""get_tag is a function to get the cache line tag of the current node.
+		way(int): `way` is the index of the line.
 
-		Returns:
-			return a cache line tag of the current node.
+	"""
+	cache_set.weight -= sum(cache_set.weights[way])
+	cache_set.weights[way] = [0] * cache_set.offset_size
 
-		"""
-		return self.tag
 
+def set_dirty(line, offset, dirty):
+	"""set_dirty is to mark the item which was just put into a slot of a \
+	line of a write-back cache set as dirty, or as clean when it came from \
+	the backend. The caller should hold the lock of the set.
 
+	Args:
+		line(:obj:`CacheLine`): `line` is the line of the item.
 
-class DoublyLinkedList(object):
-	'''DoublyLinkedList class is a doubly linkedlist used in implementation \
-	of LRU/MRU policy.'''
+		offset(int): `offset` is the offset of the item in the line.
 
-	def __init__(self, thread_safe_mode = True):
-		"""The __init__ method of a DoublyLinkedList is used to initialize a \
-		doubly linked list.
+		dirty(bool): `dirty` is whether the item should be written back.
 
-		Args:
-			thread_safe_mode(bool, optional): when `thread_safe_mode` == True, \
-				means the class is thread safe, One thing must be noted is that \
-				thread safe mode will have worse performance regrading of time \
-				since lock is costly. Default setting is True (enable thread \
-				safe mode).
+	"""
+	if dirty:
+		line.dirty |= 1 << offset
+	else:
+		line.dirty &= ~(1 << offset)
 
 
-		"""
-		super(DoublyLinkedList, self).__init__()
-		if thread_safe_mode:
-			self.lock = threading.Lock()
-		else:
-			self.lock = None
-		self.head = None 
-		self.tail = None
+def purge_expired(cache_set):
+	"""purge_expired is to drop every expired item of a cache set, so the \
+	lines they free could be filled instead of evicting live ones. The items \
+	are only scanned once the earliest deadline of the set passed. The \
+	caller should hold the lock of the set.
 
-	def insert(self, node):
-		"""insert is a function to insert a node into the tail of the \
-		doubly linked list. 
+	Args:
+		cache_set(:obj:`CacheSet`): `cache_set` is the set to purge.
 
-		Args:
-			node(:obj:`Node`): `node` is the node that will be inserted into the list.
+	Returns:
+		the number of the dropped items.
+	"""
+	now = cache_set.clock()
+	if now < cache_set.next_deadline:
+		return 0
+	deadlines = cache_set.deadlines
+	expired = [slot for slot, deadline in deadlines.items() if deadline <= now]
+	for tag, offset in expired:
+		cache_set.drop(tag, offset)
+	cache_set.next_deadline = min(deadlines.values()) if deadlines else float('inf')
+	return len(expired)
 
-		"""
-		logging.debug("DoublyLinkedList insert acquire a lock") 
-		if self.lock != None:
-			self.lock.acquire() 
-		if self.head == None: #if the list is empty
-			self.head = self.tail = node
-		else: #new node will be insert in the tail 
-			node.set_prev(self.tail) 
-			node.set_next(None)
-			self.tail.set_next(node)
-			self.tail = node
-		logging.debug("DoublyLinkedList insert release a lock") 
-		if self.lock != None:
-			self.lock.release() 
 
+def expire_slots(cache_set, slots):
+	"""expire_slots is to drop the items of a cache set which a `TimerWheel` \
+	found due, taking the lock of the set only once. An item is only \
+	dropped if it still has the deadline it was scheduled with, so items \
+	which were set again, deleted or evicted since are left alone.
 
-	def remove(self, node): #should i check if the node in the list? 
-		"""remove is a function to remove a node from the list. 
+	Args:
+		cache_set(:obj:`CacheSet`): `cache_set` is the set of the items.
+
+		slots(list): `slots` is a list of (tag, offset, deadline).
+
+	Returns:
+		the number of the dropped items.
+	"""
+	lock = cache_set.lock
+	if lock != None:
+		lock.acquire()
+	try:
+		now = cache_set.clock()
+		deadlines = cache_set.deadlines
+		expired = 0
+		for tag, offset, deadline in slots:
+			if deadline <= now and deadlines.get((tag, offset)) == deadline:
+				cache_set.drop(tag, offset)
+				expired += 1
+		return expired
+	finally:
+		if lock != None:
+			lock.release()
+
+
+class ChromeTraceWriter(object):
+	'''ChromeTraceWriter class is a tracer which collects trace events and \
+	writes them into a JSON file in the Chrome trace event format, which could \
+	be opened with chrome://tracing or https://ui.perfetto.dev.'''
+
+	def __init__(self, path):
+		"""The __init__ method of a ChromeTraceWriter is used to initialize \
+		a writer.
 
 		Args:
-			node(:obj:`Node`):`node` is the node that will be removed from the list.
+			path(string): `path` is the path of the JSON file. The file is \
+				written when the writer is closed.
 
-		Returns:
-			return True when operation is done as expected, False otherwise. 
+		"""
+		super(ChromeTraceWriter, self).__init__()
+		self.path = path
+		self.events = []
+		self.pid = os.getpid()
+
+	def __call__(self, event):
+		"""__call__ is to collect a trace event.
+
+		Args:
+			event(:obj:`TraceEvent`): `event` is the event to collect.
 
 		"""
-		logging.debug("DoublyLinkedList remove acquire a lock") 
-		if self.lock != None:
-			self.lock.acquire() 
+		self.events.append(event)
 
-		prev = node.get_prev()
-		next = node.get_next()
+	def close(self):
+		"""close is to write the collected events into the file."""
+		trace_events = []
+		for event in self.events:
+			trace_events.append({
+				'name': event.op,
+				'cat': 'cache',
+				'ph': 'X',
+				'ts': event.start * 1e6,
+				'dur': event.duration * 1e6,
+				'pid': self.pid,
+				'tid': event.thread,
+				'args': {
+					'set': event.set_num,
+					'tag': event.tag,
+					'hit': event.hit,
+					'evicted': event.evicted,
+					'lock_wait_us': event.lock_wait * 1e6,
+				},
+			})
+		with open(self.path, 'w') as trace_file:
+			json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ns'}, trace_file)
 
-		#if the node is the only node
-		if node == self.head == self.tail:
-			self.head = None
-			self.tail = None
-		#if the node is head
-		elif node == self.head:
-			self.head = node.next 
-		#if the node is tail 
-		elif node == self.tail:
-			new_tail = node.get_prev()
-			new_tail.set_next(None)
-			self.tail = new_tail
+	def __enter__(self):
+		return self
 
-		#if the node is not head/tail of the current list, 
-		#but it doesn't have prev or next value, there 
-		#should be something wrong such as the node isn't in 
-		#current list
-		elif prev == None or next == None:
-			if self.lock != None:
-				self.lock.release() 
-			return False
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
 
-		#if the node in the middle 
-		else:
-			prev.set_next(next)
-			next.set_prev(prev)
-		logging.debug("DoublyLinkedList remove release a lock") 
 
-		if self.lock != None:
-			self.lock.release() 
-		return True
+#the counters kept by `CacheStats`
+STATS_FIELDS = ('hits', 'misses', 'updates', 'fills', 'evictions', 
+	'conflict_evictions', 'deletes', 'rejections', 'expirations')
 
-	def get_head(self):
-		"""get_head is a function to get the head of the linked list.
 
-		Returns:
-			an node which is head of the linked list.
-		"""
-		return self.head
+class CacheStats(object):
+	'''CacheStats class keeps the counters of one cache set. The counters \
+	are only updated by the set while it holds its own lock, so they don't \
+	need a lock and don't add any contention. 
 
-	def get_tail(self):
-		"""get_tail is a function to get the tail of the linked list.
+	hits, misses: gets which found or didn't find the item.
 
-		Returns:
-			an node which is tail of the linked list.
-		"""
-		return self.tail
+	updates: sets into a line which was already in the set.
 
+	fills: sets into an empty line.
 
-class ReplacementPolicy(object):
-	'''ReplacementPolicy class is an interface to allow user to \
-	inherit and implement their own replacement policy.'''
-	''' the self-defined class need to have following functiions '''
+	evictions: sets which evicted a line.
 
-	def insert(self, tag, cache_line_index):
-		"""insert is a function to call when one item is accessed by user. \
-		When an item is accessed by users, we need to update the order of \
-		cahce lines (put it into the end of the linked list). If the \
-		item/cache line is not accessed before, we need to both update \
-		the list and the hash table. 
+	conflict_evictions: evictions while other sets of the cache still had \
+		empty lines.
 
-		Args:
-			tag(int): `tag` is the tag of the line.
+	deletes: successful deletes.
 
-			cache_line_index(int): `cache_line_index` is the index of the line. \
-				i.e. the index of the line in the cache set.\
-				It will be used to find the line faster when we need to \
-				evict/update the line.
+	rejections: sets which were rejected by the admission filter.
+
+	expirations: items dropped because their time to live passed.
+	'''
 
+	__slots__ = STATS_FIELDS
+
+	def __init__(self):
+		"""The __init__ method of a CacheStats is used to initialize all of \
+		the counters to 0.
 		"""
-		raise NotImplementedError
-	def victim(self):
-		"""victim is a function to choose the victim cache line to evict \
-		based on current replacement policy. 
+		super(CacheStats, self).__init__()
+		self.reset()
 
-		Returns:
-			Return a tag and index i of the victim cache line. \
-			If there is no item in the linked list/hash table, return None. 
+	def reset(self):
+		"""reset is a function to set all of the counters to 0.
 		"""
-		raise NotImplementedError
-	def get_size(self):
-		"""get_size is a function to get the number of the items/cache \
-		lines in this object.
+		for field in STATS_FIELDS:
+			setattr(self, field, 0)
+
+	def as_dict(self):
+		"""as_dict is a function to copy the counters.
 
 		Returns:
-			an int value of the size of the linked list and the hash table.
+			a dict which maps the name of each counter to its value.
 		"""
-		raise NotImplementedError
-	def delete(self, tag, delete_result):
-		"""delete is a function to update the replacement policy object \
-		after a value is ask to be deleted from a cache line. delete \
-		counts as an access, so the replacement policy needed to be \
-		updated too. If the line doesn't become empty, we update the \
-		order; if the line is empty then delete the whole line from \
-		replacement policy.
+		return {field: getattr(self, field) for field in STATS_FIELDS}
+
+
+class LineCounter(object):
+	'''LineCounter class counts the empty lines of a whole cache. The sets \
+	update it only when a line becomes filled or empty, not on every \
+	operation, and read it to tell conflict evictions from capacity ones. \
+	It takes no lock, so sets guarded by different locks don't contend on \
+	it. A thread switch in the middle of an update could lose the update, \
+	so under concurrent use the count is approximate, which is enough to \
+	classify evictions, and `Cache.stats` sets it from the sets again.'''
+
+	__slots__ = ('free',)
+
+	def __init__(self, total_lines):
+		"""The __init__ method of a LineCounter is used to initialize the \
+		counter.
 
 		Args:
-			tag(int): `tag` is the tag of the cache line.
+			total_lines(int): `total_lines` is the number of lines of the \
+				cache, all of them are empty at first.
 
-			delete_result(bool): `delete_result` is value we got after delete a \
-				value from the cache line. None means the line is non-empty \
-				after delete, True means the line became an empty line. 
+		"""
+		super(LineCounter, self).__init__()
+		self.free = total_lines
 
+	def take(self):
+		"""take is a function to call when an empty line is filled.
 		"""
-		raise NotImplementedError
+		self.free -= 1
 
+	def give(self):
+		"""give is a function to call when a line becomes empty.
+		"""
+		self.free += 1
 
 
-class LRU_MRU(ReplacementPolicy):
-	'''LRU_MRU class keep the accessed order and quick get the cache lines for \
-	the needs of LRU/MRU policy.'''
-	def __init__(self, policy = 'LRU', thread_safe_mode = True):
-		"""The __init__ method of a LRU/MRU replacement policy is used to \
-		initialize a LRU/MRU object. Default policy is LRU. 
+class VictimBuffer(object):
+	'''VictimBuffer class keeps the last lines evicted by the sets of a \
+	cache in a small fully associative buffer (a victim cache). A set which \
+	misses a line looks it up in the buffer and moves it back, so lines \
+	which conflict in a set with few ways don't evict each other for good \
+	while the buffer holds them. The oldest line leaves the buffer, and \
+	the cache, when a new one comes in.'''
+
+	def __init__(self, size, thread_safe_mode = True):
+		"""The __init__ method of a VictimBuffer is used to initialize an \
+		empty buffer.
 
 		Args:
-			policy(string, optional): `policy` is to set the replacement policy. \
-				User could pass a string to specify the `LRU` or `MRU` policy \
-				will be used. Default setting is `LRU`.
+			size(int): `size` is the number of lines of the buffer.
 
 			thread_safe_mode(bool, optional): when `thread_safe_mode` == True, \
-				means the class is thread safe, One thing must be noted is that \
-				thread safe mode will have worse performance regrading of time \
-				since lock is costly. Default setting is True (enable thread \
-				safe mode).
+				the buffer is used under a lock of its own. Default setting \
+				is True.
+
 		"""
-		super(LRU_MRU, self).__init__()
+		super(VictimBuffer, self).__init__()
 		if thread_safe_mode:
 			self.lock = threading.Lock()
 		else:
 			self.lock = None
-		self.size = 0
-		#need a hash table to quickly access the items
-		self.table = dict()
-		#need a linkedlist to keep the accessed order 
-		self.list = DoublyLinkedList(thread_safe_mode)
-		self.policy = policy
-
-	def insert(self, tag, i = 0): 
-		"""insert is a function to call when one item is accessed by user. \
-		When an item is accessed by users, we need to update the order of \
-		cahce lines (put it into the end of the linked list).\
-		If the item/cache line is not accessed before, we need to both update \
-		the list and the hash table. 
+		self.size = size
+		#lines maps the line number (tag << set bits | set_num) of each line
+		#to the (offset, value, deadline) of its items, from the oldest line
+		#to the newest one. Unlike a (set_num, tag), the line number doesn't
+		#change with the layout of the cache, see `Cache.resize`.
+		self.lines = collections.OrderedDict()
+		self.hits = 0
+		#removals is the queue of the removal listener of the cache, see
+		#`CacheSet`
+		self.removals = None
+
+	def put(self, line_num, items):
+		"""put is a function to keep a line which a set evicted, and drop \
+		the oldest line when the buffer is full.
 
 		Args:
-			tag(int): `tag` is the tag of the line.
+			line_num(int): `line_num` is the line number of the line.
 
-			i(int, optional): `i` the index of the line. i.e. the index of \
-				the line in the cache set. It will be used to find the line \
-				faster when we need to evict/update the line.
+			items(list): `items` is the (offset, value, deadline) of the \
+				items of the line.
 
 		"""
-		logging.debug("LRU_MRU insert acquire a lock")
-		if self.lock != None:
-			self.lock.acquire() 
-
-		if tag in self.table:
-			curr_node = self.table[tag] #get the node by tag
-			#update the order in the linked list 
-			self.list.remove(curr_node) 
-			self.list.insert(curr_node)
-		else:
-			self.table[tag] = Node(tag, i)
-			self.list.insert(self.table[tag])
-			self.size += 1
-		logging.debug("LRU_MRU insert release a lock") 
 		if self.lock != None:
-			self.lock.release() 
+			self.lock.acquire()
+		try:
+			self.lines[line_num] = items
+			if len(self.lines) > self.size:
+				_, dropped = self.lines.popitem(last = False)
+				if self.removals != None:
+					self.removals.extend([(value, 'evicted') for offset, value, deadline in dropped])
+		finally:
+			if self.lock != None:
+				self.lock.release()
 
+	def take(self, line_num):
+		"""take is a function to take a line out of the buffer.
 
-	def victim(self):
-		"""victim is a function to choose the victim cache line to evict \
-		based on current replacement policy. 
+		Args:
+			line_num(int): `line_num` is the line number of the line.
 
 		Returns:
-			Return a tag and index i of the victim cache line. \
-			If there is no item in the linked list/hash table, return None. 
+			the (offset, value, deadline) of the items of the line, or None \
+			if the line isn't in the buffer.
 		"""
-		if self.list.get_head() == None:
-			return
-		logging.debug("LRU_MRU victim acquire a lock") 
 		if self.lock != None:
-			self.lock.acquire() 
+			self.lock.acquire()
+		try:
+			items = self.lines.pop(line_num, None)
+			if items != None:
+				self.hits += 1
+			return items
+		finally:
+			if self.lock != None:
+				self.lock.release()
 
-		if self.policy == 'LRU': 
-			#LRU -> remove the oldest node, which is the head
-			tag = self.list.get_head().get_tag()
-			i = self.list.get_head().get_index()
-		else:
-			#MRU -> remove the most recent node, which is the tail 
-			tag = self.list.get_tail().get_tag()
-			i = self.list.get_tail().get_index()
+	def snapshot_stats(self, reset = False):
+		"""snapshot_stats is a function to copy the counters of the buffer \
+		under its lock.
 
-		victim_node = self.table.pop(tag)
-		self.list.remove(victim_node)
-		self.size -= 1
-		logging.debug("LRU_MRU victim release a lock") 
+		Args:
+			reset(bool, optional): when `reset` == True, `hits` is set to 0 \
+				right after it is copied. Default setting is False.
+
+		Returns:
+			a tuple (lines, hits) of the number of lines in the buffer and \
+			the number of lines which were taken back.
+		"""
 		if self.lock != None:
-			self.lock.release() 
+			self.lock.acquire()
+		try:
+			hits = self.hits
+			if reset:
+				self.hits = 0
+			return len(self.lines), hits
+		finally:
+			if self.lock != None:
+				self.lock.release()
 
-		return (tag, i)
 
-	def get_size(self):
-		"""get_size is a function to get the number of the items/cache lines \
-		in this object.
+class Flight(object):
+	'''Flight class is a load of a missing item by `Cache.get_or_load` \
+	which is in progress. The callers which miss the same item meanwhile \
+	wait for it instead of loading the item again.'''
 
-		Returns:
-			an int value of the size of the linked list and the hash table.
-		"""
-		return self.size
+	__slots__ = ('done', 'value', 'error')
 
-	def delete(self, tag, delete_result):
-		"""delete is a function to update the replacement policy object after \
-		a value is ask to be deleted from a cache line. delete counts as an \
-		access, so the replacement policy needed to be update too. If the \
-		line doesn't become empty, we update the order; if the line is \
-		empty then delete the whole line from replacement policy.
+	def __init__(self):
+		"""The __init__ method of a Flight is used to initialize a load \
+		in progress.
+		"""
+		super(Flight, self).__init__()
+		self.done = threading.Event()
+		self.value = None
+		self.error = None
 
-		Args:
-			tag(int): `tag` is the tag of the cache line.
+	def wait(self):
+		"""wait is a function to wait until the load is done.
 
-			delete_result(bool): `delete_result` is value we got after \
-				delete a value from the cache line. None means the line \
-				is non-empty after delete, True means the line became an \
-				empty line. 
+		Returns:
+			the loaded value.
 
+		Raises:
+			the exception raised by the loader.
 		"""
-		if delete_result == None:
-			#the line still exist, index in the set stays the same
-			#only need to update the order 
-			self.insert(tag)
-			return
-		logging.debug("LRU_MRU delete acquire a lock") 
-		if self.lock != None:
-			self.lock.acquire() 
+		self.done.wait()
+		if self.error != None:
+			raise self.error
+		return self.value
 
-		if tag in self.table:
-			#the whole line is invalid now
-			#need to remove the line from LRU/MRU
-			deleted_node = self.table.pop(tag)
-			self.list.remove(deleted_node)
-		logging.debug("LRU_MRU delete release a lock") 
-		if self.lock != None:
-			self.lock.release() 
-		return 
 
+class TimerWheel(object):
+	'''TimerWheel class is a hierarchical timer wheel which keeps items \
+	until their deadline. Time is cut into ticks of `resolution` seconds. \
+	Level 0 has a slot for each of the next `slots` ticks, and every level \
+	above covers `slots` times the span of the level below with slots as \
+	coarse. When the wheel reaches a slot of a level above 0, the items in \
+	it are moved down to the levels below, so scheduling costs O(1) and \
+	every item is moved at most `levels` times before it is due.
 
-class CacheSet(object):
-	'''CacheSet class serves as a cache set in a cache to store cache \
-	lines, and each cache line will store items (a key & value pair).\
-	A cache might have more than one cache sets.'''
+	For details about timer wheels, see here:
 
-	def __init__(self, n_way, offset_size, replacement = 'LRU', thread_safe_mode = True):
-		"""The __init__ method of a cache is used to initialize a 
-		cache set.
+	http://www.cs.columbia.edu/~nahum/w6998/papers/sosp87-timing-wheels.pdf
+	'''
+
+	def __init__(self, resolution = 1.0, slots = 64, levels = 4, now = 0.0, thread_safe_mode = True):
+		"""The __init__ method of a TimerWheel is used to initialize an \
+		empty wheel.
 
 		Args:
-			n_way(int): `n_way` is used to specified how many ways(lines) \
-				 in a cache set. 
+			resolution(float, optional): `resolution` is the length of a \
+				tick in seconds. An item is due at most `resolution` seconds \
+				after its deadline. Default setting is 1.0.
 
-			offset_size(int): `offset_size` is used to set offset size. 
+			slots(int, optional): `slots` is the number of slots of each \
+				level, which should be a power of 2. Default setting is 64.
 
-			replacement(:obj:`ReplacementPolicy`, optional): `replacement` \
-				is to set the cache replacement policy. User could either \
-				to pass a subclass of `ReplacementPolicy` or pass a string \
-				to specify the `LRU` or`MRU` policy. Default setting is `LRU`.
+			levels(int, optional): `levels` is the number of levels. Items \
+				further than slots ** levels ticks away wait in the top level \
+				until they get closer. Default setting is 4.
 
-			thread_safe_mode(bool, optional): when `thread_safe_mode` == True, \
-				means the class is thread safe, One thing must be noted is that \
-				thread safe mode will have worse performance regrading of time \
-				since lock is costly. Default setting is True (enable thread \
-				safe mode).
+			now(float, optional): `now` is the current time. Default setting \
+				is 0.0.
 
+			thread_safe_mode(bool, optional): when `thread_safe_mode` == True, \
+				the wheel is updated under a lock of its own. Default setting \
+				is True.
 
 		"""
-		super(CacheSet, self).__init__()
+		super(TimerWheel, self).__init__()
+		if slots <= 0 or slots & (slots - 1) or levels <= 0 or resolution <= 0:
+			raise ValueError("Invalid Input Values")
 		if thread_safe_mode:
 			self.lock = threading.Lock()
 		else:
 			self.lock = None
-		self.n_way = n_way
-		self.offset_size = offset_size
+		self.resolution = resolution
+		self.bits = slots.bit_length() - 1
+		self.mask = slots - 1
+		self.levels = levels
+		self.wheels = [[[] for i in range(slots)] for level in range(levels)]
+		#counts keeps the number of items of each level
+		self.counts = [0] * levels
+		#tick is the last tick the wheel reached
+		self.tick = int(now // resolution)
+		self.size = 0
 
-		#initalize cache lines
-		self.lines = [CacheLine(offset_size, thread_safe_mode = thread_safe_mode) for i in range(n_way)]
+	def place(self, tick, deadline, item):
+		"""place is a function to put an item into the slot of its tick, \
+		at the lowest level which reaches that tick. The caller should hold \
+		the lock of the wheel.
 
-		#replacement policy
-		if replacement == 'MRU' or replacement == 'LRU':
-			self.replacement = LRU_MRU(replacement, thread_safe_mode = thread_safe_mode)
-		elif isinstance(replacement, ReplacementPolicy):
-			self.replacement = replacement
-		else:
-			raise ValueError("Invalid Input Values")
+		Args:
+			tick(int): `tick` is the tick the item is due at.
 
-	def set(self, value, tag, offset):
+			deadline(float): `deadline` is the deadline of the item.
 
-		"""set is a function to put an item(a key and value pair) into the \
-		cache line in a cache set. items in replacement policy will be \
-		updated accordingly. The hashed key is transferred to tag and \
-		offset to be used to find the item in the cache line. set will \
-		first go to find if there is any tag matches the tag of the key of \
-		item we are going to put into, if so, we will directly find the \
-		offset and put the item (cache hit);if there is no matching tag, \
-		then we will either fill the value into an empty cache line or evict \
-		a cache line if there is no empty cache line(cache miss). Note, when\
-		 we evict a cache line, the whole line will be cleared and the tag \
-		 will be replace with the new tag of the item we are goint to put \
-		 into it. 
+			item: `item` is the item.
 
-		Args:
-			value(value_type): `key` is the key of the item.
+		"""
+		delta = tick - self.tick
+		bits = self.bits
+		level = 0
+		while level < self.levels - 1 and delta >> (bits * (level + 1)):
+			level += 1
+		if delta >> (bits * self.levels):
+			#too far away, wait in the top level slot reached last
+			slot_tick = self.tick + (1 << (bits * self.levels)) - 1
+		else:
+			slot_tick = tick
+		self.wheels[level][(slot_tick >> (bits * level)) & self.mask].append((tick, deadline, item))
+		self.counts[level] += 1
 
-			tag(int): `tag` is the tag of the hashed item key.
+	def schedule(self, deadline, item):
+		"""schedule is a function to put an item into the wheel until its \
+		deadline.
 
-			offset(int): `offset` is the offset of the hashed item.
+		Args:
+			deadline(float): `deadline` is the time the item is due at.
 
-		Returns:
-			True if successful, None otherwise.
-		"""
+			item: `item` is the item.
 
-		candiate_linenum = None
-		logging.debug("CacheSet set acquire a lock")
+		"""
+		tick = int(math.ceil(deadline / self.resolution))
 		if self.lock != None:
-			self.lock.acquire() 
+			self.lock.acquire()
+		try:
+			self.place(max(tick, self.tick + 1), deadline, item)
+			self.size += 1
+		finally:
+			if self.lock != None:
+				self.lock.release()
 
-		for i in range(self.n_way):
-			if self.lines[i].match_tag(tag):
-				#found the one matches the tag so be able to set the value
-				self.lines[i].set(offset, value)
-				#call LRU/MRU or other replacement policy to update 
-				#replacement order 
-				self.replacement.insert(tag, i)
-				logging.debug("CacheSet set release a lock")
+	def advance(self, now):
+		"""advance is a function to move the wheel to the current time and \
+		take out the items which are due.
 
-				if self.lock != None:
-					self.lock.release()
+		Args:
+			now(float): `now` is the current time.
+
+		Returns:
+			a list of (deadline, item) of the items which are due.
+		"""
+		target = int(now // self.resolution)
+		if target <= self.tick:
+			#the tick only grows, so it is safe to check without the lock
+			return []
+		due = []
+		if self.lock != None:
+			self.lock.acquire()
+		try:
+			bits = self.bits
+			mask = self.mask
+			while self.tick < target:
+				if self.size == 0:
+					self.tick = target
+					break
+				if self.counts[0] == 0:
+					#nothing is due before the next slot of level 1
+					self.tick = min(target, (self.tick | mask) + 1) - 1
+				self.tick += 1
+				tick = self.tick
+				for level in range(self.levels - 1, 0, -1):
+					if tick & ((1 << (bits * level)) - 1) == 0:
+						slot = self.wheels[level][(tick >> (bits * level)) & mask]
+						entries = list(slot)
+						del slot[:]
+						self.counts[level] -= len(entries)
+						for entry in entries:
+							self.place(*entry)
+				slot = self.wheels[0][tick & mask]
+				for _, deadline, item in slot:
+					due.append((deadline, item))
+				self.counts[0] -= len(slot)
+				self.size -= len(slot)
+				del slot[:]
+			return due
+		finally:
+			if self.lock != None:
+				self.lock.release()
+
+
+class TinyLFU(object):
+	'''TinyLFU class is an admission filter of a cache set. It estimates how \
+	often each tag was accessed lately, and when a new line would evict a \
+	victim, the new line is only admitted if its tag was accessed more \
+	often than the victim's. The first access of a tag only sets it in the \
+	doorkeeper, a small bloom filter, so tags used once don't fill the \
+	count-min sketch. Every `sample_size` accesses the counters are halved \
+	and the doorkeeper is cleared, so the estimates follow recent accesses.
+
+	For details about TinyLFU, see here:
+
+	https://arxiv.org/abs/1512.00727
+	'''
+
+	__slots__ = ('depth', 'width_bits', 'counters', 'doorkeeper', 
+		'doorkeeper_bits', 'sample_size', 'samples')
+
+	#odd 64 bits multipliers which give the hashes of the rows of the sketch
+	#and of the doorkeeper
+	SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 
+		0xD6E8FEB86659FD93, 0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53)
+
+	def __init__(self, n_way, sample_factor = 10, depth = 4):
+		"""The __init__ method of a TinyLFU is used to initialize the filter \
+		of a set.
+
+		Args:
+			n_way(int): `n_way` is how many ways/lines in the cache set.
+
+			sample_factor(int, optional): the counters are halved every \
+				`sample_factor` * `n_way` accesses. Default setting is 10.
+
+			depth(int, optional): `depth` is the number of rows of the \
+				count-min sketch, at most 4. Default setting is 4.
+		"""
+		super(TinyLFU, self).__init__()
+		self.sample_size = sample_factor * n_way
+		self.samples = 0
+		self.depth = depth
+		#a row has at least one counter per sample, rounded up to a power 
+		#of 2. Counters saturate at 15. 
+		self.width_bits = max(4, (self.sample_size - 1).bit_length())
+		self.counters = bytearray(depth << self.width_bits)
+		self.doorkeeper_bits = self.width_bits + 2
+		self.doorkeeper = 0
+
+	def slot(self, key, seed):
+		return ((key * seed) & 0xFFFFFFFFFFFFFFFF) >> (64 - self.width_bits)
+
+	def in_doorkeeper(self, key):
+		shift = 64 - self.doorkeeper_bits
+		first = ((key * self.SEEDS[4]) & 0xFFFFFFFFFFFFFFFF) >> shift
+		second = ((key * self.SEEDS[5]) & 0xFFFFFFFFFFFFFFFF) >> shift
+		return (self.doorkeeper >> first) & (self.doorkeeper >> second) & 1
+
+	def record(self, key):
+		"""record is a function to count one access of `key`.
+
+		Args:
+			key(int): `key` is the tag of the line.
+
+		"""
+		if self.in_doorkeeper(key):
+			counters = self.counters
+			width_bits = self.width_bits
+			for row in range(self.depth):
+				i = (row << width_bits) + self.slot(key, self.SEEDS[row])
+				if counters[i] < 15:
+					counters[i] += 1
+		else:
+			shift = 64 - self.doorkeeper_bits
+			self.doorkeeper |= (1 << (((key * self.SEEDS[4]) & 0xFFFFFFFFFFFFFFFF) >> shift)) | \
+				(1 << (((key * self.SEEDS[5]) & 0xFFFFFFFFFFFFFFFF) >> shift))
+		self.samples += 1
+		if self.samples >= self.sample_size:
+			self.reset()
+
+	def reset(self):
+		"""reset is a function to halve all of the counters and clear the \
+		doorkeeper.
+		"""
+		self.samples = 0
+		self.doorkeeper = 0
+		self.counters = bytearray(count >> 1 for count in self.counters)
+
+	def estimate(self, key):
+		"""estimate is a function to estimate how often `key` was accessed \
+		lately.
+
+		Args:
+			key(int): `key` is the tag of the line.
+
+		Returns:
+			an int of the estimated count.
+		"""
+		counters = self.counters
+		width_bits = self.width_bits
+		count = min(counters[(row << width_bits) + self.slot(key, self.SEEDS[row])] 
+			for row in range(self.depth))
+		return count + self.in_doorkeeper(key)
+
+	def admit(self, candidate, victim):
+		"""admit is a function to decide if a new line should evict a victim.
+
+		Args:
+			candidate(int): `candidate` is the tag of the new line.
+
+			victim(int): `victim` is the tag of the victim line.
+
+		Returns:
+			True if the new line should be admitted.
+		"""
+		return self.estimate(candidate) > self.estimate(victim)
+
+
+#the admission filters which could be chosen by name. Each set gets its own 
+#filter, built as admission(n_way). 
+ADMISSION_FILTERS = {
+	'TINYLFU': TinyLFU,
+}
+
+
+class CacheLine(object):
+	'''CacheLine class serves as a cache line in the cache.'''
+
+	__slots__ = ('lock', 'tag', 'offset', 'valid', 'valid_count', 'offset_size', 'dirty')
+
+	def __init__(self, offset_size, tag = None, thread_safe_mode = True):
+		"""The __init__ method of a cache is used to initialize a cache line.
+
+		Args:
+			offset_size(int): `offset_size` is used to set the offset size in \
+				a cache line. 
+
+			tag(int, optional): `tag` is the tag of a line. When the line is \
+				empty, it is set to be None. Default value is None. 
+
+			thread_safe_mode(bool, optional): when `thread_safe_mode` == True, \
+				means the class is thread safe, One thing must be noted is that \
+				thread safe mode will have worse performance regrading of time \
+				since lock is costly. Default setting is True (enable thread \
+				safe mode).
+
+		"""
+		super(CacheLine, self).__init__()
+
+		if thread_safe_mode:
+			self.lock = threading.Lock()
+		else:
+			self.lock = None
+		self.tag = tag
+		self.offset = [ None ] * offset_size
+		#valid list is to mark if user put in items (it is possible that user 
+		#put None into cache too, 
+		#so we need to keep track if it's valid. 1 means user put in something
+		# into cache, otherwise 0. 
+		self.valid = [0] * offset_size 
+		#valid_count is to keep track of the number of valid items in the 
+		#cache line. 
+		self.valid_count = 0
+		self.offset_size = offset_size
+		#dirty keeps a bit for each offset whose item wasn't written back 
+		#yet, in the write-back mode of a cache, see `CacheSet.queue_writes`. 
+		self.dirty = 0
+
+	def get_tag(self):
+		"""get_tag is a function to get the tag of the current cache line. 
+
+		Returns:
+			return the tag of the current cache line .
+
+		"""
+		return self.tag
+
+	def match_tag(self, tag):
+		"""match_tag is a function to see if a tag is the same as the tag of the \
+		current cache line. 
+
+		Args:
+			tag(int): `tag` is the tag of a line.
+
+		Returns:
+			return True if a tag is the same as the tag of the current cache line. \
+			False Otherwise. 
+
+		"""
+		return self.tag == tag
+
+	def set_tag(self, tag):
+		"""set_tag is a function to set tag of the current cache line. 
+
+		Args:
+			tag(int): `tag` is the tag of a line.
+
+		"""
+		self.tag = tag
+
+	def set(self, offset_index, value):
+
+		"""set is to put an item(a key and value pair) into the cache line.
+
+		Args:
+			offset_index(int): `offset_index` is the index of the cache line offset \
+				where the item will be put into.
+
+			value(value_type): `value` is the value of the item
+
+		"""
+
+		out_of_bound = False 
+		if self.lock != None:
+			self.lock.acquire()
+		try:
+			if self.valid[offset_index] == 0:
+				self.valid_count += 1
+			self.valid[offset_index] = 1
+			self.offset[offset_index] = value
+		except: #could be out of bound 
+			out_of_bound = True
+		if self.lock != None:
+			self.lock.release()
+		if out_of_bound:
+			raise IndexError("Out of bound", sys.exc_info()[0]) 
+
+
+	def get(self, offset_index, default = None):
+		"""get is to get an item(a key and value pair) from the cache line.
+
+		Args:
+			offset_index(int): `offset_index` is the index of the cache line \
+				offset where the item will be get from.
+
+			default(optional): `default` is returned when the offset doesn't \
+				hold an item. Default setting is None.
+
+		Returns:
+			if the value exist, return the value of the key. Otherwise return \
+			`default`.
+		"""
+		if self.lock != None:
+			self.lock.acquire()
+		value = default
+		if 0 <= offset_index < self.offset_size and self.valid[offset_index] == 1:
+			value = self.offset[offset_index]
+		if self.lock != None:
+			self.lock.release() 
+		return value
+
+
+
+	def delete(self, offset_index, value):
+
+		"""delete is to delete the item which in the offset index and match the \
+		 value.
+
+		Args:
+			offset_index(int): `offset_index` is the index of the cache line \
+				offset where the item shoule be located at.
+
+			value(value_type): `value` is the value of the item which is going to be \
+				deleted.
+
+		Returns:
+			if the value exist and be successfully deleted, and if the line \
+			become an empty line, then it also will needed remove from the LRU \
+			replacer, so return the tag of it; if the line isn't empty, then \
+			return None. if not successfully deleted, return False.
+		"""
+
+		if self.lock != None:
+			self.lock.acquire() 
+		if self.valid[offset_index] == 1 and self.offset[offset_index] == value:
+			self.offset[offset_index] = None
+			self.valid[offset_index] = 0
+			self.valid_count -= 1
+
+			if self.valid_count == 0:
+				#need to also deal with LRU replacer & clear the tag
+				tag_to_delete = self.tag
+				self.tag = None
+				if self.lock != None:
+					self.lock.release()
+				return tag_to_delete
+			else:
+				if self.lock != None:
+					self.lock.release() 
+
+		else:
+			if self.lock != None:
+				self.lock.release() 
+			return False # fails to delete
+
+	def discard(self, offset_index):
+
+		"""discard is to delete the item in the offset index whatever its \
+		value is.
+
+		Args:
+			offset_index(int): `offset_index` is the index of the cache line \
+				offset where the item is located at.
+
+		Returns:
+			the tag of the line if the line became empty, None otherwise, \
+			see `delete`.
+		"""
+
+		if self.lock != None:
+			self.lock.acquire()
+		tag_to_delete = None
+		if self.valid[offset_index] == 1:
+			self.offset[offset_index] = None
+			self.valid[offset_index] = 0
+			self.valid_count -= 1
+			if self.valid_count == 0:
+				tag_to_delete = self.tag
+				self.tag = None
+		if self.lock != None:
+			self.lock.release()
+		return tag_to_delete
+
+	def clearline(self):
+		"""clearline is a function to clear the whole line. \
+		It is handy when the whole line is needed to be evicted. 
+		"""
+
+		self.set_tag(None)
+		if self.lock != None:
+			self.lock.acquire() 
+
+		for i in range(self.offset_size):
+			self.valid[i] = 0
+			self.offset[i] = None
+		self.valid_count = 0
+		self.dirty = 0
+		if self.lock != None:
+			self.lock.release() 
+
+class Node(object):
+	'''Node class is a node used in implementation of doubly linked list.'''
+
+	__slots__ = ('tag', 'index', 'prev', 'next')
+
+	def __init__(self, tag, index):
+		'''The __init__ method of a Node is used to initialize a Node. \
+			Here, a node represent a cache line and used to decide the evict \
+			order of cache lines. 
+
+			tag(int): the tag of the cache line the node represents.
+
+			index(int): the index of the cache line in the cache set.
+
+			prev(node): the previous node of the current node. 
+
+			next(node): the next node of the current node. '''
+		super(Node, self).__init__()
+		self.tag = tag
+		self.index = index
+		self.prev = None
+		self.next = None
+	def set_prev(self, prev):
+		"""set_prev is a function to set the previous node of the current node.
+
+		Args:
+			prev(:obj:`Node`): `prev` is the node that will be the previous node of \
+			the current node.
+
+		"""
+		self.prev = prev
+	def get_prev(self):
+		"""get_prev is a function to get the previous node of the current node. 
+
+		Returns:
+			return a node which is the previous node of the current node.
+
+		"""
+		return self.prev
+	def set_next(self, next):
+		"""set_next is a function to set the next node of the current node. 
+
+		Args:
+			next(:obj:`Node`): `next` is the node that will be the next node of the \
+			current node.
+
+		"""
+		self.next = next
+	def get_next(self):
+		"""get_next is a function to get the next node of the current node. 
+
+		Returns:
+			return a node which is the next node of the current node.
+
+		"""
+		return self.next
+	def get_index(self):
+		"""get_index is a function to get the cache line index of the current \
+		node. 
+
+		Returns:
+			return a cache line index of the current node.
+
+		"""
+		return self.index 
+	def get_tag(self):
+		"""get_tag is a function to get the cache line tag of the current node.
+
+		Returns:
+			return a cache line tag of the current node.
+
+		"""
+		return self.tag
+
+
+
+class DoublyLinkedList(object):
+	'''DoublyLinkedList class is a doubly linkedlist used in implementation \
+	of LRU/MRU policy.'''
+
+	def __init__(self, thread_safe_mode = True):
+		"""The __init__ method of a DoublyLinkedList is used to initialize a \
+		doubly linked list.
+
+		Args:
+			thread_safe_mode(bool, optional): when `thread_safe_mode` == True, \
+				means the class is thread safe, One thing must be noted is that \
+				thread safe mode will have worse performance regrading of time \
+				since lock is costly. Default setting is True (enable thread \
+				safe mode).
+
+
+		"""
+		super(DoublyLinkedList, self).__init__()
+		if thread_safe_mode:
+			self.lock = threading.Lock()
+		else:
+			self.lock = None
+		self.head = None 
+		self.tail = None
+
+	def insert(self, node):
+		"""insert is a function to insert a node into the tail of the \
+		doubly linked list. 
+
+		Args:
+			node(:obj:`Node`): `node` is the node that will be inserted into the list.
+
+		"""
+		if self.lock != None:
+			self.lock.acquire() 
+		if self.head == None: #if the list is empty
+			self.head = self.tail = node
+		else: #new node will be insert in the tail 
+			node.set_prev(self.tail) 
+			node.set_next(None)
+			self.tail.set_next(node)
+			self.tail = node
+		if self.lock != None:
+			self.lock.release() 
+
+
+	def remove(self, node): #should i check if the node in the list? 
+		"""remove is a function to remove a node from the list. 
+
+		Args:
+			node(:obj:`Node`):`node` is the node that will be removed from the list.
+
+		Returns:
+			return True when operation is done as expected, False otherwise. 
+
+		"""
+		if self.lock != None:
+			self.lock.acquire() 
+
+		prev = node.get_prev()
+		next = node.get_next()
+
+		#if the node is the only node
+		if node == self.head == self.tail:
+			self.head = None
+			self.tail = None
+		#if the node is head
+		elif node == self.head:
+			self.head = node.next 
+		#if the node is tail 
+		elif node == self.tail:
+			new_tail = node.get_prev()
+			new_tail.set_next(None)
+			self.tail = new_tail
+
+		#if the node is not head/tail of the current list, 
+		#but it doesn't have prev or next value, there 
+		#should be something wrong such as the node isn't in 
+		#current list
+		elif prev == None or next == None:
+			if self.lock != None:
+				self.lock.release() 
+			return False
+
+		#if the node in the middle 
+		else:
+			prev.set_next(next)
+			next.set_prev(prev)
+
+		if self.lock != None:
+			self.lock.release() 
+		return True
+
+	def get_head(self):
+		"""get_head is a function to get the head of the linked list.
+
+		Returns:
+			an node which is head of the linked list.
+		"""
+		return self.head
+
+	def get_tail(self):
+		"""get_tail is a function to get the tail of the linked list.
+
+		Returns:
+			an node which is tail of the linked list.
+		"""
+		return self.tail
+
+
+class ReplacementPolicy(object):
+	'''ReplacementPolicy class is an interface to allow user to \
+	inherit and implement their own replacement policy.'''
+	''' the self-defined class need to have following functiions '''
+
+	def insert(self, tag, cache_line_index):
+		"""insert is a function to call when one item is accessed by user. \
+		When an item is accessed by users, we need to update the order of \
+		cahce lines (put it into the end of the linked list). If the \
+		item/cache line is not accessed before, we need to both update \
+		the list and the hash table. 
+
+		Args:
+			tag(int): `tag` is the tag of the line.
+
+			cache_line_index(int): `cache_line_index` is the index of the line. \
+				i.e. the index of the line in the cache set.\
+				It will be used to find the line faster when we need to \
+				evict/update the line.
+
+		"""
+		raise NotImplementedError
+	def victim(self):
+		"""victim is a function to choose the victim cache line to evict \
+		based on current replacement policy. 
+
+		Returns:
+			Return a tag and index i of the victim cache line. \
+			If there is no item in the linked list/hash table, return None. 
+		"""
+		raise NotImplementedError
+	def get_size(self):
+		"""get_size is a function to get the number of the items/cache \
+		lines in this object.
+
+		Returns:
+			an int value of the size of the linked list and the hash table.
+		"""
+		raise NotImplementedError
+	def delete(self, tag, delete_result):
+		"""delete is a function to update the replacement policy object \
+		after a value is ask to be deleted from a cache line. delete \
+		counts as an access, so the replacement policy needed to be \
+		updated too. If the line doesn't become empty, we update the \
+		order; if the line is empty then delete the whole line from \
+		replacement policy.
+
+		Args:
+			tag(int): `tag` is the tag of the cache line.
+
+			delete_result(bool): `delete_result` is value we got after delete a \
+				value from the cache line. None means the line is non-empty \
+				after delete, True means the line became an empty line. 
+
+		"""
+		raise NotImplementedError
+
+
+
+class LRU_MRU(ReplacementPolicy):
+	'''LRU_MRU class keep the accessed order and quick get the cache lines for \
+	the needs of LRU/MRU policy.'''
+	def __init__(self, policy = 'LRU', thread_safe_mode = True):
+		"""The __init__ method of a LRU/MRU replacement policy is used to \
+		initialize a LRU/MRU object. Default policy is LRU. 
+
+		Args:
+			policy(string, optional): `policy` is to set the replacement policy. \
+				User could pass a string to specify the `LRU` or `MRU` policy \
+				will be used. Default setting is `LRU`.
+
+			thread_safe_mode(bool, optional): when `thread_safe_mode` == True, \
+				means the class is thread safe, One thing must be noted is that \
+				thread safe mode will have worse performance regrading of time \
+				since lock is costly. Default setting is True (enable thread \
+				safe mode).
+		"""
+		super(LRU_MRU, self).__init__()
+		if thread_safe_mode:
+			self.lock = threading.Lock()
+		else:
+			self.lock = None
+		self.size = 0
+		#need a hash table to quickly access the items
+		self.table = dict()
+		#need a linkedlist to keep the accessed order 
+		self.list = DoublyLinkedList(thread_safe_mode)
+		self.policy = policy
+
+	def insert(self, tag, i = 0): 
+		"""insert is a function to call when one item is accessed by user. \
+		When an item is accessed by users, we need to update the order of \
+		cahce lines (put it into the end of the linked list).\
+		If the item/cache line is not accessed before, we need to both update \
+		the list and the hash table. 
+
+		Args:
+			tag(int): `tag` is the tag of the line.
+
+			i(int, optional): `i` the index of the line. i.e. the index of \
+				the line in the cache set. It will be used to find the line \
+				faster when we need to evict/update the line.
+
+		"""
+		if self.lock != None:
+			self.lock.acquire() 
+
+		if tag in self.table:
+			curr_node = self.table[tag] #get the node by tag
+			#update the order in the linked list 
+			self.list.remove(curr_node) 
+			self.list.insert(curr_node)
+		else:
+			self.table[tag] = Node(tag, i)
+			self.list.insert(self.table[tag])
+			self.size += 1
+		if self.lock != None:
+			self.lock.release() 
+
+
+	def victim(self):
+		"""victim is a function to choose the victim cache line to evict \
+		based on current replacement policy. 
+
+		Returns:
+			Return a tag and index i of the victim cache line. \
+			If there is no item in the linked list/hash table, return None. 
+		"""
+		if self.list.get_head() == None:
+			return
+		if self.lock != None:
+			self.lock.acquire() 
+
+		if self.policy == 'LRU': 
+			#LRU -> remove the oldest node, which is the head
+			tag = self.list.get_head().get_tag()
+			i = self.list.get_head().get_index()
+		else:
+			#MRU -> remove the most recent node, which is the tail 
+			tag = self.list.get_tail().get_tag()
+			i = self.list.get_tail().get_index()
+
+		victim_node = self.table.pop(tag)
+		self.list.remove(victim_node)
+		self.size -= 1
+		if self.lock != None:
+			self.lock.release() 
+
+		return (tag, i)
+
+	def get_size(self):
+		"""get_size is a function to get the number of the items/cache lines \
+		in this object.
+
+		Returns:
+			an int value of the size of the linked list and the hash table.
+		"""
+		return self.size
+
+	def delete(self, tag, delete_result):
+		"""delete is a function to update the replacement policy object after \
+		a value is ask to be deleted from a cache line. delete counts as an \
+		access, so the replacement policy needed to be update too. If the \
+		line doesn't become empty, we update the order; if the line is \
+		empty then delete the whole line from replacement policy.
+
+		Args:
+			tag(int): `tag` is the tag of the cache line.
+
+			delete_result(bool): `delete_result` is value we got after \
+				delete a value from the cache line. None means the line \
+				is non-empty after delete, True means the line became an \
+				empty line. 
+
+		"""
+		if delete_result == None:
+			#the line still exist, index in the set stays the same
+			#only need to update the order 
+			self.insert(tag)
+			return
+		if self.lock != None:
+			self.lock.acquire() 
+
+		if tag in self.table:
+			#the whole line is invalid now
+			#need to remove the line from LRU/MRU
+			deleted_node = self.table.pop(tag)
+			self.list.remove(deleted_node)
+			self.size -= 1
+		if self.lock != None:
+			self.lock.release() 
+		return 
+
+
+class PseudoLRU(ReplacementPolicy):
+	'''PseudoLRU class is the base of the pseudo-LRU policies used by \
+	hardware set-associative caches. Instead of a node per line, the \
+	recency of the ways of a set is kept in a small integer bit-vector, so \
+	accessing a line doesn't allocate anything. Subclasses implement \
+	`touch` and `choose`.'''
+
+	def __init__(self, n_way, thread_safe_mode = True):
+		"""The __init__ method of a pseudo-LRU policy is used to initialize \
+		the policy of a set.
+
+		Args:
+			n_way(int): `n_way` is how many ways/lines in the cache set.
+
+			thread_safe_mode(bool, optional): when `thread_safe_mode` == True, \
+				means the class is thread safe. Default setting is True \
+				(enable thread safe mode).
+		"""
+		super(PseudoLRU, self).__init__()
+		if thread_safe_mode:
+			self.lock = threading.Lock()
+		else:
+			self.lock = None
+		self.n_way = n_way
+		#tags keeps the tag of the line in each way, None for an empty way,
+		#and ways maps the tag of each line back to its way, so `delete`
+		#doesn't scan the ways.
+		self.tags = [None] * n_way
+		self.ways = dict()
+		#valid has bit i set when way i holds a line.
+		self.valid = 0
+		self.bits = 0
+
+	def touch(self, i):
+		"""touch is a function to mark way `i` as the most recently used one \
+		in the bit-vector.
+		"""
+		raise NotImplementedError
+
+	def choose(self):
+		"""choose is a function to pick the way to evict from the bit-vector. \
+		It is only called when at least one way holds a line.
+
+		Returns:
+			the index of the way.
+		"""
+		raise NotImplementedError
+
+	def insert(self, tag, i = 0):
+		"""insert is a function to call when one item is accessed by user, \
+		see `ReplacementPolicy.insert`.
+
+		Args:
+			tag(int): `tag` is the tag of the line.
+
+			i(int, optional): `i` the index of the line. i.e. the way of the \
+				line in the cache set.
+
+		"""
+		if self.lock != None:
+			self.lock.acquire() 
+		old = self.tags[i]
+		if old != tag:
+			if old != None:
+				self.ways.pop(old, None)
+			self.tags[i] = tag
+			self.ways[tag] = i
+		self.valid |= 1 << i
+		self.touch(i)
+		if self.lock != None:
+			self.lock.release() 
+
+	def victim(self):
+		"""victim is a function to choose the victim cache line to evict \
+		and remove it from the policy. 
+
+		Returns:
+			Return a tag and index i of the victim cache line. \
+			If there is no line, return None. 
+		"""
+		if self.lock != None:
+			self.lock.acquire() 
+		try:
+			if not self.valid:
+				return None
+			i = self.choose()
+			if not self.valid >> i & 1:
+				#the bit-vector points to an empty way, take the first line
+				i = (self.valid & -self.valid).bit_length() - 1
+			tag = self.tags[i]
+			self.remove(i)
+			return (tag, i)
+		finally:
+			if self.lock != None:
+				self.lock.release() 
+
+	def remove(self, i):
+		"""remove is a function to drop the line in way `i` from the policy.
+		"""
+		self.ways.pop(self.tags[i], None)
+		self.tags[i] = None
+		self.valid &= ~(1 << i)
+
+	def get_size(self):
+		"""get_size is a function to get the number of the cache lines in \
+		this object.
+
+		Returns:
+			an int value of the number of the ways which hold a line.
+		"""
+		return bin(self.valid).count('1')
+
+	def delete(self, tag, delete_result):
+		"""delete is a function to update the replacement policy object after \
+		a value is ask to be deleted from a cache line, see \
+		`ReplacementPolicy.delete`.
+
+		Args:
+			tag(int): `tag` is the tag of the cache line.
+
+			delete_result(bool): `delete_result` is value we got after \
+				delete a value from the cache line. None means the line \
+				is non-empty after delete. 
+
+		"""
+		if self.lock != None:
+			self.lock.acquire() 
+		i = self.ways.get(tag)
+		if i != None:
+			if delete_result == None:
+				self.touch(i)
+			else:
+				self.remove(i)
+		if self.lock != None:
+			self.lock.release() 
+
+
+class TreePLRU(PseudoLRU):
+	'''TreePLRU class is the tree pseudo-LRU policy. The ways are the \
+	leaves of a binary tree, each of the n_way - 1 inner nodes keeps one \
+	bit telling which half of its subtree is older. An access flips the \
+	bits on the path of the way to point away from it, and the victim is \
+	found by following the bits from the root. n_way must be a power of 2.'''
+
+	def __init__(self, n_way, thread_safe_mode = True):
+		"""The __init__ method of a TreePLRU is used to initialize the policy \
+		of a set, see `PseudoLRU`.
+		"""
+		super(TreePLRU, self).__init__(n_way, thread_safe_mode = thread_safe_mode)
+		if n_way <= 0 or n_way & (n_way - 1):
+			raise ValueError("Invalid Input Values")
+		#node k of the tree is bit k of `bits`, node 1 is the root and the 
+		#children of node k are 2k and 2k + 1. bit k set means the older 
+		#half is the right one. An access to way i clears the bits in 
+		#clear_masks[i] and sets the bits in set_masks[i]. 
+		self.clear_masks = []
+		self.set_masks = []
+		levels = n_way.bit_length() - 1
+		for i in range(n_way):
+			clear_mask = set_mask = 0
+			node = 1
+			for level in range(levels - 1, -1, -1):
+				right = (i >> level) & 1
+				if right:
+					clear_mask |= 1 << node
+				else:
+					set_mask |= 1 << node
+				node = 2 * node + right
+			self.clear_masks.append(clear_mask)
+			self.set_masks.append(set_mask)
+
+	def touch(self, i):
+		"""touch is a function to point the bits on the path of way `i` away \
+		from it.
+		"""
+		self.bits = (self.bits & ~self.clear_masks[i]) | self.set_masks[i]
+
+	def choose(self):
+		"""choose is a function to follow the bits from the root to the \
+		victim way.
+
+		Returns:
+			the index of the way.
+		"""
+		bits = self.bits
+		node = 1
+		while node < self.n_way:
+			node = 2 * node + ((bits >> node) & 1)
+		return node - self.n_way
+
+	def remove(self, i):
+		"""remove is a function to drop the line in way `i`. The path is \
+		pointed away from the empty way, so the next victim is another way.
+		"""
+		super(TreePLRU, self).remove(i)
+		self.touch(i)
+
+
+class BitPLRU(PseudoLRU):
+	'''BitPLRU class is the bit pseudo-LRU (MRU bits) policy. Each way has \
+	one bit which is set when the way is accessed. When all of the lines \
+	have their bit set, the bits of the other ways are cleared. The victim \
+	is the first way whose bit is clear.'''
+
+	def touch(self, i):
+		"""touch is a function to set the bit of way `i`.
+		"""
+		bits = self.bits | (1 << i)
+		if bits & self.valid == self.valid:
+			bits = 1 << i
+		self.bits = bits
+
+	def choose(self):
+		"""choose is a function to pick the first line whose bit is clear.
+
+		Returns:
+			the index of the way.
+		"""
+		candidates = self.valid & ~self.bits
+		if not candidates:
+			candidates = self.valid
+		return (candidates & -candidates).bit_length() - 1
+
+	def remove(self, i):
+		"""remove is a function to drop the line in way `i` and its bit.
+		"""
+		super(BitPLRU, self).remove(i)
+		self.bits &= ~(1 << i)
+
+
+class SetPolicy(ReplacementPolicy):
+	'''SetPolicy class is the base of the replacement policies which keep \
+	the lines of one set by tag. It keeps the way of each line and the lock, \
+	subclasses keep the order of the lines and implement `hit`, `add`, \
+	`evict` and `drop`.'''
+
+	def __init__(self, n_way, thread_safe_mode = True):
+		"""The __init__ method of a SetPolicy is used to initialize the \
+		policy of a set.
+
+		Args:
+			n_way(int): `n_way` is how many ways/lines in the cache set.
+
+			thread_safe_mode(bool, optional): when `thread_safe_mode` == True, \
+				means the class is thread safe. Default setting is True \
+				(enable thread safe mode).
+		"""
+		super(SetPolicy, self).__init__()
+		if thread_safe_mode:
+			self.lock = threading.Lock()
+		else:
+			self.lock = None
+		self.n_way = n_way
+		#ways maps the tag of each line to its way
+		self.ways = dict()
+
+	def hit(self, tag):
+		"""hit is a function to call when a line in the policy is accessed.
+		"""
+		raise NotImplementedError
+
+	def add(self, tag):
+		"""add is a function to call when a new line is put into the set. \
+		`ways` already has the line.
+		"""
+		raise NotImplementedError
+
+	def evict(self):
+		"""evict is a function to choose the line to evict and remove it \
+		from the order kept by the subclass. It is only called when there \
+		is at least one line.
+
+		Returns:
+			the tag of the line.
+		"""
+		raise NotImplementedError
+
+	def drop(self, tag):
+		"""drop is a function to remove a line which became empty from the \
+		order kept by the subclass.
+		"""
+		raise NotImplementedError
+
+	def insert(self, tag, i = 0):
+		"""insert is a function to call when one item is accessed by user, \
+		see `ReplacementPolicy.insert`.
+
+		Args:
+			tag(int): `tag` is the tag of the line.
+
+			i(int, optional): `i` the index of the line. i.e. the way of the \
+				line in the cache set.
+
+		"""
+		if self.lock != None:
+			self.lock.acquire() 
+		if tag in self.ways:
+			self.hit(tag)
+		else:
+			self.ways[tag] = i
+			self.add(tag)
+		if self.lock != None:
+			self.lock.release() 
+
+	def victim(self):
+		"""victim is a function to choose the victim cache line to evict \
+		and remove it from the policy. 
+
+		Returns:
+			Return a tag and index i of the victim cache line. \
+			If there is no line, return None. 
+		"""
+		if self.lock != None:
+			self.lock.acquire() 
+		try:
+			if not self.ways:
+				return None
+			tag = self.evict()
+			return (tag, self.ways.pop(tag))
+		finally:
+			if self.lock != None:
+				self.lock.release() 
+
+	def get_size(self):
+		"""get_size is a function to get the number of the cache lines in \
+		this object.
+
+		Returns:
+			an int value of the number of the lines.
+		"""
+		return len(self.ways)
+
+	def delete(self, tag, delete_result):
+		"""delete is a function to update the replacement policy object after \
+		a value is ask to be deleted from a cache line, see \
+		`ReplacementPolicy.delete`.
+
+		Args:
+			tag(int): `tag` is the tag of the cache line.
+
+			delete_result(bool): `delete_result` is value we got after \
+				delete a value from the cache line. None means the line \
+				is non-empty after delete. 
+
+		"""
+		if self.lock != None:
+			self.lock.acquire() 
+		if tag in self.ways:
+			if delete_result == None:
+				self.hit(tag)
+			else:
+				self.drop(tag)
+				del self.ways[tag]
+		if self.lock != None:
+			self.lock.release() 
+
+
+class FIFO(SetPolicy):
+	'''FIFO class is the first in first out policy, the oldest line is \
+	evicted no matter how often it is accessed.'''
+
+	def __init__(self, n_way, thread_safe_mode = True):
+		super(FIFO, self).__init__(n_way, thread_safe_mode = thread_safe_mode)
+		self.queue = collections.OrderedDict()
+
+	def hit(self, tag):
+		pass
+
+	def add(self, tag):
+		self.queue[tag] = None
+
+	def evict(self):
+		return self.queue.popitem(last = False)[0]
+
+	def drop(self, tag):
+		del self.queue[tag]
+
+
+class CLOCK(SetPolicy):
+	'''CLOCK class is the CLOCK (second chance) policy. The ways form a \
+	ring with a reference bit each, which is set when the line is accessed \
+	again. The hand skips and clears the set bits and evicts the first \
+	line whose bit is clear. A new line starts with a clear bit, so lines \
+	which are only used once are evicted first.'''
+
+	def __init__(self, n_way, thread_safe_mode = True):
+		super(CLOCK, self).__init__(n_way, thread_safe_mode = thread_safe_mode)
+		self.tags = [None] * n_way
+		self.referenced = [False] * n_way
+		self.hand = 0
+
+	def hit(self, tag):
+		self.referenced[self.ways[tag]] = True
+
+	def add(self, tag):
+		i = self.ways[tag]
+		self.tags[i] = tag
+		self.referenced[i] = False
+
+	def evict(self):
+		#every line is skipped at most once, since its bit is cleared
+		while True:
+			i = self.hand
+			self.hand = (i + 1) % self.n_way
+			if self.tags[i] == None:
+				continue
+			if self.referenced[i]:
+				self.referenced[i] = False
+				continue
+			tag = self.tags[i]
+			self.tags[i] = None
+			return tag
+
+	def drop(self, tag):
+		i = self.ways[tag]
+		self.tags[i] = None
+		self.referenced[i] = False
+
+
+class Random(SetPolicy):
+	'''Random class is the random policy, the victim is drawn uniformly \
+	from the lines of the set.'''
+
+	def __init__(self, n_way, thread_safe_mode = True, seed = None):
+		"""see `SetPolicy`. `seed` is the seed of the random generator of \
+		the policy, None to seed it from the system.
+		"""
+		super(Random, self).__init__(n_way, thread_safe_mode = thread_safe_mode)
+		self.random = random.Random(seed)
+
+	def hit(self, tag):
+		pass
+
+	def add(self, tag):
+		pass
+
+	def evict(self):
+		return self.random.choice(list(self.ways))
+
+	def drop(self, tag):
+		pass
+
+
+class LFU(SetPolicy):
+	'''LFU class is the O(1) least frequently used policy with aging. The \
+	lines are kept in buckets by access count, the victim is the least \
+	recently used line of the lowest count. Every `age_period` accesses all \
+	of the counts are halved, so lines which were hot long ago don't stay \
+	forever.'''
+
+	def __init__(self, n_way, thread_safe_mode = True, age_period = None):
+		"""see `SetPolicy`. `age_period` is the number of accesses between \
+		two halvings of the counts, 16 * n_way by default.
+		"""
+		super(LFU, self).__init__(n_way, thread_safe_mode = thread_safe_mode)
+		self.age_period = age_period or 16 * n_way
+		self.accesses = 0
+		self.counts = dict()
+		#buckets maps a count to the lines with that count, oldest first
+		self.buckets = dict()
+		self.min_count = 0
+
+	def bucket(self, count):
+		bucket = self.buckets.get(count)
+		if bucket == None:
+			bucket = self.buckets[count] = collections.OrderedDict()
+		return bucket
+
+	def unlink(self, tag):
+		count = self.counts.pop(tag)
+		bucket = self.buckets[count]
+		del bucket[tag]
+		if not bucket:
+			del self.buckets[count]
+		return count
+
+	def age(self):
+		self.accesses += 1
+		if self.accesses < self.age_period:
+			return
+		self.accesses = 0
+		lines = sorted(self.counts.items(), key = lambda item: item[1])
+		self.counts = dict()
+		self.buckets = dict()
+		for tag, count in lines:
+			count = max(1, count >> 1)
+			self.counts[tag] = count
+			self.bucket(count)[tag] = None
+		self.min_count = min(self.buckets) if self.buckets else 0
+
+	def hit(self, tag):
+		count = self.unlink(tag)
+		if self.min_count == count and count not in self.buckets:
+			self.min_count = count + 1
+		self.counts[tag] = count + 1
+		self.bucket(count + 1)[tag] = None
+		self.age()
+
+	def add(self, tag):
+		self.counts[tag] = 1
+		self.bucket(1)[tag] = None
+		self.min_count = 1
+		self.age()
+
+	def evict(self):
+		tag = next(iter(self.buckets[self.min_count]))
+		self.drop(tag)
+		return tag
+
+	def drop(self, tag):
+		count = self.unlink(tag)
+		if self.min_count == count and count not in self.buckets:
+			self.min_count = min(self.buckets) if self.buckets else 0
+
+
+class SLRU(SetPolicy):
+	'''SLRU class is the segmented LRU policy. A new line goes into the \
+	probationary segment, and a line accessed again is promoted to the \
+	protected segment, which takes at most `protected_ratio` of the ways. \
+	Lines demoted from the protected segment go back to probation, and \
+	victims are taken from probation first, so a scan of lines used only \
+	once doesn't flush the protected lines.'''
+
+	def __init__(self, n_way, thread_safe_mode = True, protected_ratio = 0.8):
+		super(SLRU, self).__init__(n_way, thread_safe_mode = thread_safe_mode)
+		self.protected_size = max(1, min(n_way - 1, int(n_way * protected_ratio)))
+		self.probation = collections.OrderedDict()
+		self.protected = collections.OrderedDict()
+
+	def hit(self, tag):
+		if tag in self.protected:
+			self.protected.move_to_end(tag)
+			return
+		del self.probation[tag]
+		self.protected[tag] = None
+		if len(self.protected) > self.protected_size:
+			demoted = self.protected.popitem(last = False)[0]
+			self.probation[demoted] = None
+
+	def add(self, tag):
+		self.probation[tag] = None
+
+	def evict(self):
+		if self.probation:
+			return self.probation.popitem(last = False)[0]
+		return self.protected.popitem(last = False)[0]
+
+	def drop(self, tag):
+		if tag in self.protected:
+			del self.protected[tag]
+		else:
+			del self.probation[tag]
+
+
+class TwoQ(SetPolicy):
+	'''TwoQ class is the 2Q policy. A new line goes into the FIFO queue \
+	`a1in`. When it is evicted from there its tag is remembered in the \
+	ghost queue `a1out`, and if the tag comes back the line goes into the \
+	LRU queue `am`. Lines used only once never reach `am`.'''
+
+	def __init__(self, n_way, thread_safe_mode = True):
+		super(TwoQ, self).__init__(n_way, thread_safe_mode = thread_safe_mode)
+		self.in_size = max(1, n_way // 4)
+		self.out_size = max(1, n_way // 2)
+		self.a1in = collections.OrderedDict()
+		self.a1out = collections.OrderedDict()
+		self.am = collections.OrderedDict()
+
+	def hit(self, tag):
+		if tag in self.am:
+			self.am.move_to_end(tag)
+
+	def add(self, tag):
+		if tag in self.a1out:
+			del self.a1out[tag]
+			self.am[tag] = None
+		else:
+			self.a1in[tag] = None
+
+	def evict(self):
+		if self.a1in and (len(self.a1in) > self.in_size or not self.am):
+			tag = self.a1in.popitem(last = False)[0]
+			self.a1out[tag] = None
+			if len(self.a1out) > self.out_size:
+				self.a1out.popitem(last = False)
+			return tag
+		return self.am.popitem(last = False)[0]
+
+	def drop(self, tag):
+		if tag in self.am:
+			del self.am[tag]
+		else:
+			del self.a1in[tag]
+
+
+class ARC(SetPolicy):
+	'''ARC class is the adaptive replacement cache policy. Lines seen \
+	once are kept in `t1` and lines seen again in `t2`, and the ghost lists \
+	`b1` and `b2` remember the tags evicted from them. A miss on a ghost \
+	tag moves the target size `p` of `t1` towards the list which would \
+	have kept it. Since the victim is chosen before the new tag is known, \
+	ties between `t1` and `t2` are not broken by the new tag.'''
+
+	def __init__(self, n_way, thread_safe_mode = True):
+		super(ARC, self).__init__(n_way, thread_safe_mode = thread_safe_mode)
+		self.p = 0
+		self.t1 = collections.OrderedDict()
+		self.t2 = collections.OrderedDict()
+		self.b1 = collections.OrderedDict()
+		self.b2 = collections.OrderedDict()
+
+	def hit(self, tag):
+		if tag in self.t1:
+			del self.t1[tag]
+			self.t2[tag] = None
+		else:
+			self.t2.move_to_end(tag)
+
+	def add(self, tag):
+		if tag in self.b1:
+			self.p = min(self.n_way, self.p + max(len(self.b2) // len(self.b1), 1))
+			del self.b1[tag]
+			self.t2[tag] = None
+		elif tag in self.b2:
+			self.p = max(0, self.p - max(len(self.b1) // len(self.b2), 1))
+			del self.b2[tag]
+			self.t2[tag] = None
+		else:
+			self.t1[tag] = None
+		#keep at most n_way tags in t1 + b1 and 2 * n_way in all of the lists
+		while self.b1 and len(self.t1) + len(self.b1) > self.n_way:
+			self.b1.popitem(last = False)
+		while self.b2 and len(self.t1) + len(self.t2) + len(self.b1) + len(self.b2) > 2 * self.n_way:
+			self.b2.popitem(last = False)
+
+	def evict(self):
+		if self.t1 and (len(self.t1) > self.p or not self.t2):
+			tag = self.t1.popitem(last = False)[0]
+			self.b1[tag] = None
+		else:
+			tag = self.t2.popitem(last = False)[0]
+			self.b2[tag] = None
+		return tag
+
+	def drop(self, tag):
+		if tag in self.t1:
+			del self.t1[tag]
+		else:
+			del self.t2[tag]
+
+
+#the replacement policies which could be chosen by name besides `LRU` and 
+#`MRU`. Each set gets its own policy object, built as policy(n_way, 
+#thread_safe_mode = thread_safe_mode). 
+REPLACEMENT_POLICIES = {
+	'TREE_PLRU': TreePLRU,
+	'BIT_PLRU': BitPLRU,
+	'FIFO': FIFO,
+	'CLOCK': CLOCK,
+	'RANDOM': Random,
+	'LFU': LFU,
+	'SLRU': SLRU,
+	'2Q': TwoQ,
+	'ARC': ARC,
+}
+
+
+class CacheSet(object):
+	'''CacheSet class serves as a cache set in a cache to store cache \
+	lines, and each cache line will store items (a key & value pair).\
+	A cache might have more than one cache sets.'''
+
+	def __init__(self, n_way, offset_size, replacement = 'LRU', thread_safe_mode = True, lock = None, set_num = None, admission = None, lazy = False):
+		"""The __init__ method of a cache is used to initialize a 
+		cache set.
+
+		Args:
+			n_way(int): `n_way` is used to specified how many ways(lines) \
+				 in a cache set. 
+
+			offset_size(int): `offset_size` is used to set offset size. 
+
+			replacement(:obj:`ReplacementPolicy`, optional): `replacement` \
+				is to set the cache replacement policy. User could either \
+				to pass an instance of a subclass of `ReplacementPolicy`, a \
+				subclass or a factory which is called as replacement(n_way, \
+				thread_safe_mode = thread_safe_mode) to build the policy of \
+				the set, or pass a string to specify the `LRU` or`MRU` \
+				policy or a policy of `REPLACEMENT_POLICIES`. Default \
+				setting is `LRU`.
+
+			thread_safe_mode(bool, optional): when `thread_safe_mode` == True, \
+				means the class is thread safe, One thing must be noted is that \
+				thread safe mode will have worse performance regrading of time \
+				since lock is costly. Default setting is True (enable thread \
+				safe mode).
+
+			lock(:obj:`threading.Lock`, optional): when `lock` is given, it is \
+				the only lock of the set. The lines and the replacement policy \
+				are built without their own locks, so `lock` guards all of the \
+				state of the set, and several sets could share one lock (lock \
+				striping). Default setting is None (each object of the set \
+				keeps its own lock in thread safe mode).
+
+			set_num(int, optional): `set_num` is the number of the set in the \
+				cache. It is only used to label trace events. Default setting \
+				is None.
+
+			admission(optional): `admission` is the admission filter of the \
+				set, e.g. a `TinyLFU`. When a new line would evict a victim, \
+				it is only put into the set if admission.admit(tag, \
+				victim tag) is True. Default setting is None (every new line \
+				is admitted).
+
+			lazy(bool, optional): when `lazy` == True, a line is only built \
+				when it is first filled. Default setting is False.
+
+		"""
+		super(CacheSet, self).__init__()
+		if lock != None:
+			self.lock = lock
+			thread_safe_mode = False
+		elif thread_safe_mode:
+			self.lock = threading.Lock()
+		else:
+			self.lock = None
+		self.n_way = n_way
+		self.offset_size = offset_size
+		self.set_num = set_num
+		#tracer is a callable which receives a `TraceEvent` for each 
+		#operation, None disables tracing. 
+		self.tracer = None
+		self.stats = CacheStats()
+		#line_counter is the `LineCounter` of the cache the set belongs to, 
+		#None for a set on its own. 
+		self.line_counter = None
+		self.admission = admission
+		#deadlines maps the (tag, offset) of every item with a time to live 
+		#to its deadline on `clock`, and next_deadline is never later than 
+		#the earliest of them, see `purge_expired`. The cache sets `clock`. 
+		self.deadlines = dict()
+		self.next_deadline = float('inf')
+		self.clock = time.monotonic
+		#weights keeps the weight of the item in each slot of each line when 
+		#the cache has a weight budget, and weight is their sum. The set 
+		#evicts lines to keep weight within max_weight. The cache sets them, 
+		#None means the items are not weighed. 
+		self.weights = None
+		self.weight = 0
+		self.max_weight = None
+		self.max_item_weight = None
+		#in write-back mode, the set marks the items it stores as dirty, and 
+		#the dirty items which leave the set are queued in writes until the 
+		#cache hands them to its writer. The cache sets write_back. 
+		self.write_back = False
+		self.writes = []
+		#removals is the queue of the removal listener of the cache, which 
+		#gets an (entry, cause) for every item which leaves the set. The 
+		#cache sets it, None means nobody listens. 
+		self.removals = None
+		#victims is the `VictimBuffer` of the cache which keeps the lines 
+		#the set evicts, None when the cache has none. The buffer keeps 
+		#them by their line numbers, which take the set bits of the layout 
+		#of the cache. The cache sets both. 
+		self.victims = None
+		self.set_bits = 0
+
+		#initalize cache lines, in lazy mode the empty lines are None until 
+		#they are filled 
+		self.line_locks = thread_safe_mode
+		if lazy:
+			self.lines = [None] * n_way
+		else:
+			self.lines = [CacheLine(offset_size, thread_safe_mode = thread_safe_mode) for i in range(n_way)]
+
+		#tag_index maps the tag of every non-empty line to the index of the 
+		#line, so a lookup doesn't need to scan all of the ways. 
+		self.tag_index = dict()
+		#free_lines keeps the indexes of the empty lines. It is used as a 
+		#stack, the lowest index is on the top so empty lines are filled in 
+		#order. 
+		self.free_lines = list(range(n_way - 1, -1, -1))
+
+		#replacement policy
+		if replacement == 'MRU' or replacement == 'LRU':
+			self.replacement = LRU_MRU(replacement, thread_safe_mode = thread_safe_mode)
+		elif replacement in REPLACEMENT_POLICIES:
+			self.replacement = REPLACEMENT_POLICIES[replacement](n_way, thread_safe_mode = thread_safe_mode)
+		elif isinstance(replacement, ReplacementPolicy):
+			self.replacement = replacement
+		elif callable(replacement):
+			#a class or a factory which builds the policy of this set
+			self.replacement = replacement(n_way, thread_safe_mode = thread_safe_mode)
+			if not isinstance(self.replacement, ReplacementPolicy):
+				raise ValueError("Invalid Input Values")
+		else:
+			raise ValueError("Invalid Input Values")
+
+	def set(self, value, tag, offset, deadline = None, weight = None, dirty = True):
+
+		"""set is a function to put an item(a key and value pair) into the \
+		cache line in a cache set. items in replacement policy will be \
+		updated accordingly. The hashed key is transferred to tag and \
+		offset to be used to find the item in the cache line. set will \
+		first go to find if there is any tag matches the tag of the key of \
+		item we are going to put into, if so, we will directly find the \
+		offset and put the item (cache hit);if there is no matching tag, \
+		then we will either fill the value into an empty cache line or evict \
+		a cache line if there is no empty cache line(cache miss). Note, when\
+		 we evict a cache line, the whole line will be cleared and the tag \
+		 will be replace with the new tag of the item we are goint to put \
+		 into it. 
+
+		Args:
+			value(value_type): `key` is the key of the item.
+
+			tag(int): `tag` is the tag of the hashed item key.
+
+			offset(int): `offset` is the offset of the hashed item.
+
+			deadline(float, optional): `deadline` is the time on the clock of \
+				the set when the item expires. Default setting is None (the \
+				item doesn't expire).
+
+			weight(int, optional): `weight` is the weight of the item when \
+				the set has a weight budget. Default setting is None.
+
+			dirty(bool, optional): in write-back mode, `dirty` == False puts \
+				an item which is already in the backend, so it isn't written \
+				back. Default setting is True.
+
+		Returns:
+			True if successful, False if the admission filter rejected the \
+			item or it weighs more than `max_item_weight`.
+		"""
+
+		if self.tracer != None:
+			return trace_operation(self, 'set', tag, self.store, (value, tag, offset, deadline, weight, dirty))[0] is not None
+		if self.lock != None:
+			self.lock.acquire() 
+		try:
+			return self.store(value, tag, offset, deadline, weight, dirty)[0] is not None
+		finally:
+			if self.lock != None:
+				self.lock.release() 
+
+	def store(self, value, tag, offset, deadline = None, weight = None, dirty = True):
+
+		"""store is the body of `set`, it doesn't take the lock of the set, \
+		so the caller should hold the lock.
+
+		Args:
+			value(value_type): `key` is the key of the item.
+
+			tag(int): `tag` is the tag of the hashed item key.
+
+			offset(int): `offset` is the offset of the hashed item.
+
+			deadline(float, optional): `deadline` is the time when the item \
+				expires. Default setting is None.
+
+			weight(int, optional): `weight` is the weight of the item. \
+				Default setting is None.
+
+			dirty(bool, optional): `dirty` is whether the item should be \
+				written back, see `set`. Default setting is True.
+
+		Returns:
+			a tuple (hit, evicted). `hit` is True if a line with the tag is \
+			already in the set, None if the item is rejected by the admission \
+			filter or for its weight. `evicted` is the tag of the evicted line \
+			if a line is evicted, None otherwise.
+		"""
+
+		i = self.tag_index.get(tag)
+		if i == None and self.victims != None:
+			i = self.recall(tag)
+		if weight != None:
+			if weight > self.max_item_weight:
+				#the item doesn't fit, and the item it replaces is stale 
+				if i != None and self.lines[i].get(offset, MISSING) is not MISSING:
+					if self.removals != None:
+						self.removals.append((self.lines[i].get(offset), 'replaced'))
+					self.clear_slot(tag, i, offset)
+				self.stats.rejections += 1
+				if self.write_back and dirty:
+					#the item isn't cached, so it is written at once
+					self.writes.append(value)
+				return (None, None)
+			if i != None and not self.make_room(weight - self.weights[i][offset], tag):
+				#the other items of the line take too much of the budget
+				self.replacement.delete(tag, tag)
+				self.evict_line(i)
+				self.free_lines.append(i)
+				if self.line_counter != None:
+					self.line_counter.give()
+				i = None
+		#an item which is rejected for its weight isn't an access the 
+		#admission filter counts 
+		if self.admission != None:
+			self.admission.record(tag)
+		if i != None:
+			#found the one matches the tag so be able to set the value
+			if self.removals != None:
+				replaced = self.lines[i].get(offset, MISSING)
+				if replaced is not MISSING:
+					self.removals.append((replaced, 'replaced'))
+			self.lines[i].set(offset, value)
+			if self.write_back:
+				set_dirty(self.lines[i], offset, dirty)
+			#call LRU/MRU or other replacement policy to update 
+			#replacement order 
+			self.replacement.insert(tag, i)
+			self.stats.updates += 1
+			if deadline != None or self.deadlines:
+				set_deadline(self, tag, offset, deadline)
+			if weight != None:
+				set_weight(self, i, offset, weight)
+			return (True, None)
+
+		#there is no same tag 
+		evicted = None
+		if not self.free_lines and self.deadlines:
+			#expired items could free a line before a live one is evicted
+			purge_expired(self)
+		if self.free_lines:
+			#found an empty line which could be a candiate to put the value
+			candiate_linenum = self.free_lines.pop()
+			if self.lines[candiate_linenum] == None:
+				self.lines[candiate_linenum] = CacheLine(self.offset_size, thread_safe_mode = self.line_locks)
+			self.stats.fills += 1
+			if self.line_counter != None:
+				self.line_counter.take()
+		else:
+			#if we found there isn't an empty line, choose a victim cache 
+			#line to evict.
+			victim_value = self.replacement.victim() 
+
+			if victim_value == None: 
+				#we can't find an empty line and also no any line could be the
+				#victim
+				#based on our replacement policy 
+				raise ValueError("Ran out of space")
+
+			_ , candiate_linenum = victim_value
+
+			evicted = self.lines[candiate_linenum].get_tag()
+			if self.admission != None and not self.admission.admit(tag, evicted):
+				#keep the victim, it counts as accessed since the policy 
+				#already took it out 
+				self.replacement.insert(evicted, candiate_linenum)
+				self.stats.rejections += 1
+				if self.write_back and dirty:
+					self.writes.append(value)
+				return (None, None)
+			self.evict_line(candiate_linenum)
+			if self.line_counter != None and self.line_counter.free > 0:
+				self.stats.conflict_evictions += 1
+		if weight != None:
+			self.make_room(weight)
+
+		#put the value into the candidate cache line (an empty or victim line)
+		self.lines[candiate_linenum].set_tag(tag)
+		self.lines[candiate_linenum].set(offset, value)
+		if self.write_back:
+			set_dirty(self.lines[candiate_linenum], offset, dirty)
+		self.tag_index[tag] = candiate_linenum
+		#update replacement policy
+		self.replacement.insert(tag, candiate_linenum)
+		if deadline != None or self.deadlines:
+			set_deadline(self, tag, offset, deadline)
+		if weight != None:
+			set_weight(self, candiate_linenum, offset, weight)
+		return (False, evicted)
+
+	def evict_line(self, i):
+
+		"""evict_line is a function to clear a line which was taken out of \
+		the replacement policy. The caller should hold the lock of the set.
+
+		Args:
+			i(int): `i` is the index of the line.
+
+		Returns:
+			the tag of the evicted line.
+		"""
+
+		evicted = self.lines[i].get_tag()
+		del self.tag_index[evicted]
+		if self.lines[i].dirty:
+			self.queue_writes(i)
+		if self.victims != None:
+			#the line is written back already, the buffer keeps it clean
+			line = self.lines[i]
+			deadlines = self.deadlines
+			self.victims.put((evicted << self.set_bits) | self.set_num, [(offset, line.offset[offset], 
+				deadlines.get((evicted, offset)) if deadlines else None) 
+				for offset in range(self.offset_size) if line.valid[offset]])
+		elif self.removals != None:
+			line = self.lines[i]
+			self.removals.extend([(line.offset[offset], 'evicted') for offset in range(self.offset_size) if line.valid[offset]])
+		self.lines[i].clearline()
+		if self.deadlines:
+			forget_deadlines(self, evicted)
+		if self.weights != None:
+			clear_weights(self, i)
+		self.stats.evictions += 1
+		return evicted
+
+	def make_room(self, weight, keep = None):
+
+		"""make_room is a function to evict lines, chosen by the replacement \
+		policy, until `weight` more fits into the weight budget of the set. \
+		The caller should hold the lock of the set.
+
+		Args:
+			weight(int): `weight` is the weight which is going to be added.
+
+			keep(int, optional): `keep` is the tag of a line which must not \
+				be evicted. Default setting is None.
+
+		Returns:
+			True if the weight fits, False otherwise.
+		"""
+
+		held = None
+		while self.weight + weight > self.max_weight:
+			victim_value = self.replacement.victim()
+			if victim_value == None:
+				break
+			i = victim_value[1]
+			if self.lines[i].get_tag() == keep:
+				held = i
+				continue
+			self.evict_line(i)
+			self.free_lines.append(i)
+			if self.line_counter != None:
+				self.line_counter.give()
+		if held != None:
+			self.replacement.insert(keep, held)
+		return self.weight + weight <= self.max_weight
+
+	def recall(self, tag):
+
+		"""recall is a function to move a line which the set evicted back \
+		from the victim buffer of the cache. When the set is full, the line \
+		evicted for it goes into the buffer in its place (a swap). The \
+		caller should hold the lock of the set.
+
+		Args:
+			tag(int): `tag` is the tag of the line.
+
+		Returns:
+			the index of the line, or None if the line isn't in the buffer.
+		"""
+
+		items = self.victims.take((tag << self.set_bits) | self.set_num)
+		if items == None:
+			return None
+		now = self.clock()
+		live = []
+		for offset, value, deadline in items:
+			if deadline != None and deadline <= now:
+				if self.removals != None:
+					self.removals.append((value, 'expired'))
+				self.stats.expirations += 1
+			else:
+				live.append((offset, value, deadline))
+		if not live:
+			return None
+		#the line comes back as it left, so neither the admission filter 
+		#nor the fill and eviction counters see the move
+		if not self.free_lines and self.deadlines:
+			purge_expired(self)
+		if self.free_lines:
+			i = self.free_lines.pop()
+			if self.lines[i] == None:
+				self.lines[i] = CacheLine(self.offset_size, thread_safe_mode = self.line_locks)
+			if self.line_counter != None:
+				self.line_counter.take()
+		else:
+			victim_value = self.replacement.victim()
+			if victim_value == None:
+				self.victims.put((tag << self.set_bits) | self.set_num, items)
+				return None
+			i = victim_value[1]
+			evictions = self.stats.evictions
+			self.evict_line(i)
+			self.stats.evictions = evictions
+		line = self.lines[i]
+		line.set_tag(tag)
+		for offset, value, deadline in live:
+			line.set(offset, value)
+			if deadline != None:
+				set_deadline(self, tag, offset, deadline)
+		self.tag_index[tag] = i
+		self.replacement.insert(tag, i)
+		return i
+
+	def get_value(self, tag, offset, default = None, check = None):
+
+		"""get_value is a function to get an item(a key and value pair) from \
+		the cache by a key(trasferred to tag and offset).
+
+		Args:
+			tag(int): `tag` is the tag of the hashed item key.
+
+			offset(int): `offset` is the offset of the hashed item (in a cache \
+				 line).
+
+			default(optional): `default` is returned when the item is not in \
+				the set. Default setting is None.
+
+			check(tuple, optional): `check` is the (fingerprint, key) of the \
+				item when the cache verifies keys, see `check_entry`. Default \
+				setting is None.
+
+		Returns:
+			if the value exist, return the value of the key. Otherwise \
+			return `default`.
+		"""
+
+		if self.tracer != None:
+			value = trace_operation(self, 'get', tag, self.lookup, (tag, offset, MISSING, check))
+			if value is MISSING:
+				return default
+			return value
+		if self.lock != None:
+			self.lock.acquire() 
+		try:
+			return self.lookup(tag, offset, default, check)
+		finally:
+			if self.lock != None:
+				self.lock.release() 
+
+	def lookup(self, tag, offset, default = None, check = None):
+
+		"""lookup is the body of `get_value`, it doesn't take the lock of the \
+		set, so the caller should hold the lock.
+
+		Args:
+			tag(int): `tag` is the tag of the hashed item key.
+
+			offset(int): `offset` is the offset of the hashed item (in a cache \
+				 line).
+
+			default(optional): `default` is returned when the item is not in \
+				the set. Default setting is None.
+
+			check(tuple, optional): `check` is the (fingerprint, key) of the \
+				item when the cache verifies keys, see `check_entry`. Default \
+				setting is None.
+
+		Returns:
+			if the value exist, return the value of the key. Otherwise \
+			return `default`.
+		"""
+
+		if self.admission != None:
+			self.admission.record(tag)
+		i = self.tag_index.get(tag)
+		if i == None and self.victims != None:
+			i = self.recall(tag)
+		if i == None or (self.deadlines and is_expired(self, tag, offset)):
+			self.stats.misses += 1
+			return default
+		#if there isn't that offset, it still counts as one access.
+		self.replacement.insert(tag, i) 
+		value = self.lines[i].get(offset, MISSING)
+		if check != None and value is not MISSING:
+			value = check_entry(value, check)
+		if value is MISSING:
+			self.stats.misses += 1
+			return default
+		self.stats.hits += 1
+		return value
+
+	def get_many(self, tags, offsets, default = None, checks = None):
+
+		"""get_many is a function to get a batch of items from the set, \
+		taking the lock of the set only once.
+
+		Args:
+			tags(list): `tags` is the tags of the hashed item keys.
+
+			offsets(list): `offsets` is the offsets of the hashed items.
+
+			default(optional): `default` is returned for the items which are \
+				not in the set. Default setting is None.
+
+			checks(list, optional): `checks` is the (fingerprint, key) of \
+				each item when the cache verifies keys, see `check_entry`. \
+				Default setting is None.
+
+		Returns:
+			a list of the values, in the order of `tags`.
+		"""
+
+		if self.tracer != None:
+			return run_batch(self, 'get', self.lookup, tags, offsets, repeat(default, len(tags)), 
+				checks or repeat(None, len(tags)))
+		if self.lock != None:
+			self.lock.acquire() 
+		try:
+			return self.lookup_many(tags, offsets, default, checks)
+		finally:
+			if self.lock != None:
+				self.lock.release() 
+
+	def lookup_many(self, tags, offsets, default = None, checks = None):
+
+		"""lookup_many is the body of `get_many`, it doesn't take the lock of \
+		the set, so the caller should hold the lock. Consecutive lookups of \
+		the same line update the replacement policy only once, which gives \
+		the same order as updating it for each of them.
+
+		Args:
+			tags(list): `tags` is the tags of the hashed item keys.
+
+			offsets(list): `offsets` is the offsets of the hashed items.
+
+			default(optional): `default` is returned for the items which are \
+				not in the set. Default setting is None.
+
+			checks(list, optional): `checks` is the (fingerprint, key) of \
+				each item when the cache verifies keys, see `check_entry`. \
+				Default setting is None.
+
+		Returns:
+			a list of the values, in the order of `tags`.
+		"""
+
+		tag_index = self.tag_index
+		lines = self.lines
+		insert = self.replacement.insert
+		values = []
+		last_tag = MISSING
+		i = None
+		misses = 0
+		if self.admission != None:
+			for tag in tags:
+				self.admission.record(tag)
+		deadlines = self.deadlines
+		for position, (tag, offset) in enumerate(zip(tags, offsets)):
+			if deadlines and is_expired(self, tag, offset):
+				#the line might be empty now, look it up again
+				last_tag = MISSING
+				misses += 1
+				values.append(default)
+				continue
+			if tag != last_tag:
+				last_tag = tag
+				i = tag_index.get(tag)
+				if i == None and self.victims != None:
+					i = self.recall(tag)
+				if i != None:
+					insert(tag, i)
+			value = MISSING if i == None else lines[i].get(offset, MISSING)
+			if checks != None and value is not MISSING:
+				value = check_entry(value, checks[position])
+			if value is MISSING:
+				misses += 1
+				value = default
+			values.append(value)
+		self.stats.misses += misses
+		self.stats.hits += len(values) - misses
+		return values
+
+	def set_many(self, values, tags, offsets, deadline = None, weights = None, dirty = True):
+
+		"""set_many is a function to put a batch of items into the set, \
+		taking the lock of the set only once.
+
+		Args:
+			values(list): `values` is the values of the items.
+
+			tags(list): `tags` is the tags of the hashed item keys.
+
+			offsets(list): `offsets` is the offsets of the hashed items.
+
+			deadline(float, optional): `deadline` is the time when the items \
+				expire. Default setting is None (they don't expire).
+
+			weights(list, optional): `weights` is the weights of the items. \
+				Default setting is None.
+
+			dirty(bool, optional): `dirty` is whether the items should be \
+				written back, see `set`. Default setting is True.
+
+		Returns:
+			True if successful.
+		"""
+
+		run_batch(self, 'set', self.store, values, tags, offsets, repeat(deadline, len(values)), 
+			weights or repeat(None, len(values)), repeat(dirty, len(values)))
+		return True
+
+	def delete_many(self, tags, offsets, values):
+
+		"""delete_many is a function to delete a batch of items from the set, \
+		taking the lock of the set only once.
+
+		Args:
+			tags(list): `tags` is the tags of the hashed item keys.
+
+			offsets(list): `offsets` is the offsets of the hashed items.
+
+			values(list): `values` is the values of the items.
+
+		Returns:
+			a list of the results of `delete_value`, in the order of `tags`.
+		"""
+
+		return run_batch(self, 'delete', self.remove, tags, offsets, values)
+
+	def get_line(self, tag):
+
+		"""get_line is a function to get a cache line which has the same tag. \
+			By design, each tag is unique in one cache set 
+
+		Args:
+			tag(int): `tag` is the tag of the targeted cache line.
+
+		Returns:
+			if the line exist, return the line. Otherwise return None.
+		"""
+
+		if self.lock != None:
+			self.lock.acquire() 
+		i = self.tag_index.get(tag)
+		if self.lock != None:
+			self.lock.release() 
+		if i != None:
+			return self.lines[i]
+
+
+	def delete_value(self, tag, offset, value):
+
+		"""delete_value is a function to delete the item in a cahce line which \
+		has the inputed key(trasferred to tag and offset) and value.
+
+		Args:
+			tag(int): `tag` is the tag of the hashed item key.
+
+			offset(int): `offset` is the offset of the hashed item \
+				(in a cache line).
+
+			value(value_type): `value` is the value of the item which is going to \
+				be deleted.
+
+		Returns:
+			if the value exist and be successfully deleted, return True; 
+			if not successfully deleted, return False; otherwise return None.
+		"""
+
+		if self.tracer != None:
+			return trace_operation(self, 'delete', tag, self.remove, (tag, offset, value))
+		if self.lock != None:
+			self.lock.acquire() 
+		try:
+			return self.remove(tag, offset, value)
+		finally:
+			if self.lock != None:
+				self.lock.release() 
+
+	def remove(self, tag, offset, value):
+
+		"""remove is the body of `delete_value`, it doesn't take the lock of \
+		the set, so the caller should hold the lock.
+
+		Args:
+			tag(int): `tag` is the tag of the hashed item key.
+
+			offset(int): `offset` is the offset of the hashed item \
+				(in a cache line).
+
+			value(value_type): `value` is the value of the item which is going to \
+				be deleted.
+
+		Returns:
+			if the value exist and be successfully deleted, return True; 
+			if not successfully deleted, return False; otherwise return None.
+		"""
+
+		i = self.tag_index.get(tag)
+		if i == None and self.victims != None:
+			i = self.recall(tag)
+		if i == None:
+			return None
+
+		#found the cache line which contains the item we want to delete
+		line = self.lines[i]
+		entry = line.offset[offset]
+		delete_result = line.delete(offset, value)
+		if delete_result is False:
+			#fails to delete 
+			return False
+		if line.dirty >> offset & 1:
+			#a deleted item is still written back, its write isn't lost
+			line.dirty &= ~(1 << offset)
+			self.writes.append(entry)
+		if self.removals != None:
+			self.removals.append((entry, 'deleted'))
+		if self.deadlines:
+			self.deadlines.pop((tag, offset), None)
+		if self.weights != None:
+			set_weight(self, i, offset, 0)
+		if delete_result is not None:
+			#the line became empty, so it could be reused
+			del self.tag_index[tag]
+			self.free_lines.append(i)
+			if self.line_counter != None:
+				self.line_counter.give()
+		#delete or update the line in replacement policy object 
+		#if needed
+		#delete also counts as an access, so if the line doesn't 
+		#become empty, we update the order; if the line is empty 
+		#then delete the whole line from replacement policy 
+		self.replacement.delete(tag, delete_result) 
+		self.stats.deletes += 1
+		return True
+
+	def drop(self, tag, offset):
+
+		"""drop is a function to delete an expired item. Unlike `remove`, \
+		it doesn't count as an access of the line. The caller should hold \
+		the lock of the set.
+
+		Args:
+			tag(int): `tag` is the tag of the hashed item key.
+
+			offset(int): `offset` is the offset of the hashed item \
+				(in a cache line).
+
+		"""
+
+		self.deadlines.pop((tag, offset), None)
+		i = self.tag_index.get(tag)
+		if i == None:
+			return
+		if self.removals != None:
+			expired = self.lines[i].get(offset, MISSING)
+			if expired is not MISSING:
+				self.removals.append((expired, 'expired'))
+		self.clear_slot(tag, i, offset)
+		self.stats.expirations += 1
+
+	def clear_slot(self, tag, i, offset):
+
+		"""clear_slot is a function to delete the item in a slot whatever its \
+		value is, and free the line if it became empty. The caller should \
+		hold the lock of the set.
+
+		Args:
+			tag(int): `tag` is the tag of the line.
+
+			i(int): `i` is the index of the line.
+
+			offset(int): `offset` is the offset of the item in the line.
+
+		"""
+
+		if self.deadlines:
+			self.deadlines.pop((tag, offset), None)
+		if self.weights != None:
+			set_weight(self, i, offset, 0)
+		if self.lines[i].dirty >> offset & 1:
+			self.queue_writes(i, 1 << offset)
+		delete_result = self.lines[i].discard(offset)
+		if delete_result is not None:
+			#the line became empty, so it could be reused
+			del self.tag_index[tag]
+			self.free_lines.append(i)
+			if self.line_counter != None:
+				self.line_counter.give()
+			self.replacement.delete(tag, delete_result)
+
+	def queue_writes(self, i, mask = -1):
+
+		"""queue_writes is a function to queue the dirty items of a line in \
+		`writes` and mark them clean. The caller should hold the lock of \
+		the set.
+
+		Args:
+			i(int): `i` is the index of the line.
+
+			mask(int, optional): `mask` has the bits of the offsets to \
+				queue. Default setting is -1 (all of them).
+
+		"""
+
+		line = self.lines[i]
+		mask &= line.dirty
+		line.dirty &= ~mask
+		offset = 0
+		while mask:
+			if mask & 1:
+				self.writes.append(line.offset[offset])
+			mask >>= 1
+			offset += 1
+
+	def take_writes(self, flush = False):
+
+		"""take_writes is a function to take the queued writes of the set \
+		under the lock of the set, see `Cache.flush`.
+
+		Args:
+			flush(bool, optional): when `flush` == True, the dirty items \
+				which are still in the set are queued and marked clean \
+				first. Default setting is False.
+
+		Returns:
+			a list of the entries (fingerprint, key, value) to write.
+		"""
+
+		if self.lock != None:
+			self.lock.acquire() 
+		try:
+			if flush:
+				for i in self.tag_index.values():
+					if self.lines[i].dirty:
+						self.queue_writes(i)
+			writes = self.writes
+			self.writes = []
+			return writes
+		finally:
+			if self.lock != None:
+				self.lock.release() 
+
+	def snapshot_stats(self, reset = False):
+
+		"""snapshot_stats is a function to copy the counters of the set under \
+		the lock of the set.
+
+		Args:
+			reset(bool, optional): when `reset` == True, the counters are set \
+				to 0 right after they are copied. Default setting is False.
+
+		Returns:
+			a tuple (counters, lines_used, weight). `counters` is a dict of \
+			the counters, see `CacheStats`. `lines_used` is the number of the \
+			non-empty lines of the set. `weight` is the weight of the items \
+			of the set.
+		"""
+
+		if self.lock != None:
+			self.lock.acquire() 
+		try:
+			counters = self.stats.as_dict()
+			if reset:
+				self.stats.reset()
+			return counters, self.n_way - len(self.free_lines), self.weight
+		finally:
+			if self.lock != None:
+				self.lock.release() 
+
+	def export_lines(self):
+
+		"""export_lines is a function to copy the items of the set for a \
+		snapshot or a resize, see `Cache.save_snapshot` and `Cache.resize`. \
+		Expired items are left out. The caller should hold the lock of the \
+		set.
+
+		Returns:
+			a list of (tag, items) of the non-empty lines, from the line \
+			which the replacement policy would evict first (for `LRU`, the \
+			least recently used one) to the last one, so putting the lines \
+			back in this order restores the order of the policy. `items` is a \
+			list of (offset, value, deadline, weight, dirty) of the line.
+		"""
+
+		ways = []
+		if isinstance(self.replacement, LRU_MRU):
+			node = self.replacement.list.get_head()
+			while node != None:
+				i = node.get_index()
+				#a policy shared by the sets also links the lines of the others
+				if self.tag_index.get(node.get_tag()) == i:
+					ways.append(i)
+				node = node.get_next()
+		if len(ways) != len(self.tag_index):
+			#the other policies don't expose their order, the lines are 
+			#exported in the order they were filled 
+			ways = list(self.tag_index.values())
+		now = self.clock()
+		lines = []
+		for i in ways:
+			line = self.lines[i]
+			tag = line.get_tag()
+			items = []
+			for offset in range(self.offset_size):
+				if not line.valid[offset]:
+					continue
+				deadline = self.deadlines.get((tag, offset)) if self.deadlines else None
+				if deadline != None and deadline <= now:
+					continue
+				weight = self.weights[i][offset] if self.weights != None else None
+				items.append((offset, line.offset[offset], deadline, weight, line.dirty >> offset & 1 == 1))
+			if items:
+				lines.append((tag, items))
+		return lines
+
+
+class CompactStorage(object):
+	'''CompactStorage class keeps the metadata and the items of all of the \
+	cache lines of a cache in flat columns instead of one `CacheLine` object \
+	per line. Line `way` of set `set_num` is the row `set_num * n_way + way` \
+	of every column. The recency of the lines of each set and its empty \
+	lines are kept in the columns too, as linked lists of rows.'''
+
+	__slots__ = ('total_sets', 'n_way', 'offset_size', 'words', 'tags', 
+		'valid', 'valid_count', 'values', 'prev', 'next', 'heads', 'tails', 
+		'free')
+
+	def __init__(self, total_sets, n_way, offset_size):
+		"""The __init__ method of a CompactStorage is used to allocate the \
+		columns of a cache.
+
+		Args:
+			total_sets(int): `total_sets` is how many sets the cache has. 
+
+			n_way(int): `n_way` is how many ways/lines in a cache set.
+
+			offset_size(int): `offset_size` is the offset size of a line.
+
+		"""
+		super(CompactStorage, self).__init__()
+		total_lines = total_sets * n_way
+		self.total_sets = total_sets
+		self.n_way = n_way
+		self.offset_size = offset_size
+		#the valid bits of a line are kept in `words` 64 bits integers,
+		#bit i is set when the offset i of the line holds an item. 
+		self.words = (offset_size + 63) >> 6
+		self.tags = array('q', [0]) * total_lines
+		self.valid = array('Q', [0]) * (total_lines * self.words)
+		self.valid_count = array('L', [0]) * total_lines
+		self.values = [None] * (total_lines * offset_size)
+		#the non-empty lines of a set are linked by `prev` and `next` from 
+		#heads[set_num], the least recently used one, to tails[set_num], 
+		#the most recently used one. The empty lines of a set are linked by 
+		#`next` from free[set_num]. -1 ends a list. 
+		self.prev = array('q', [-1]) * total_lines
+		self.next = array('q', range(1, total_lines + 1))
+		self.next[n_way - 1::n_way] = array('q', [-1]) * total_sets
+		self.heads = array('q', [-1]) * total_sets
+		self.tails = array('q', [-1]) * total_sets
+		self.free = array('q', range(0, total_lines, n_way))
+
+	def clearline(self, line):
+		"""clearline is a function to clear the whole line. 
+
+		Args:
+			line(int): `line` is the row of the line in the columns.
+
+		"""
+		offset_size = self.offset_size
+		start = line * offset_size
+		self.values[start:start + offset_size] = [None] * offset_size
+		start = line * self.words
+		for i in range(start, start + self.words):
+			self.valid[i] = 0
+		self.valid_count[line] = 0
+
+	def append(self, set_num, line):
+		"""append is a function to link a line as the most recently used \
+		line of its set.
+
+		Args:
+			set_num(int): `set_num` is the number of the set.
+
+			line(int): `line` is the row of the line in the columns.
+
+		"""
+		tail = self.tails[set_num]
+		self.prev[line] = tail
+		self.next[line] = -1
+		if tail == -1:
+			self.heads[set_num] = line
+		else:
+			self.next[tail] = line
+		self.tails[set_num] = line
+
+	def unlink(self, set_num, line):
+		"""unlink is a function to take a line out of the recency list of \
+		its set.
+
+		Args:
+			set_num(int): `set_num` is the number of the set.
+
+			line(int): `line` is the row of the line in the columns.
+
+		"""
+		prev_line = self.prev[line]
+		next_line = self.next[line]
+		if prev_line == -1:
+			self.heads[set_num] = next_line
+		else:
+			self.next[prev_line] = next_line
+		if next_line == -1:
+			self.tails[set_num] = prev_line
+		else:
+			self.prev[next_line] = prev_line
+
+	def touch(self, set_num, line):
+		"""touch is a function to mark a line as the most recently used one \
+		of its set.
+
+		Args:
+			set_num(int): `set_num` is the number of the set.
+
+			line(int): `line` is the row of the line in the columns.
+
+		"""
+		if self.tails[set_num] != line:
+			self.unlink(set_num, line)
+			self.append(set_num, line)
+
+	def fill(self, set_num):
+		"""fill is a function to take an empty line of a set and link it as \
+		the most recently used line.
+
+		Args:
+			set_num(int): `set_num` is the number of the set.
+
+		Returns:
+			the row of the line, or -1 if the set has no empty line.
+		"""
+		line = self.free[set_num]
+		if line != -1:
+			self.free[set_num] = self.next[line]
+			self.append(set_num, line)
+		return line
+
+	def release(self, set_num, line):
+		"""release is a function to take a line out of the recency list of \
+		its set and give it back to the empty lines.
+
+		Args:
+			set_num(int): `set_num` is the number of the set.
+
+			line(int): `line` is the row of the line in the columns.
+
+		"""
+		self.unlink(set_num, line)
+		self.next[line] = self.free[set_num]
+		self.free[set_num] = line
+
+
+class CompactCacheSet(object):
+	'''CompactCacheSet class serves as a cache set whose lines are stored \
+	in a `CompactStorage`. It provides the same operations as `CacheSet`. \
+	Only the `LRU` and `MRU` policies are supported, the recency of lines \
+	is kept in the `prev` and `next` columns of the storage.'''
+
+	__slots__ = ('storage', 'set_num', 'base', 'n_way', 'offset_size', 
+		'mru', 'lock', 'tag_index', 'tracer', 'stats', 'line_counter', 'admission', 
+		'deadlines', 'next_deadline', 'clock', 'weights', 'weight', 'max_weight', 
+		'max_item_weight', 'removals')
+
+	def __init__(self, storage, set_num, replacement = 'LRU', thread_safe_mode = True, lock = None, admission = None):
+		"""The __init__ method of a CompactCacheSet is used to initialize a \
+		cache set on top of a storage.
+
+		Args:
+			storage(:obj:`CompactStorage`): `storage` is the storage which \
+				keeps the lines of the set.
+
+			set_num(int): `set_num` is the number of the set in the cache.
+
+			replacement(string, optional): `replacement` is to specify the \
+				`LRU` or `MRU` policy. Default setting is `LRU`.
+
+			thread_safe_mode(bool, optional): when `thread_safe_mode` == True, \
+				means the class is thread safe, One thing must be noted is that \
+				thread safe mode will have worse performance regrading of time \
+				since lock is costly. Default setting is True (enable thread \
+				safe mode).
+
+			lock(:obj:`threading.Lock`, optional): `lock` is a lock shared \
+				with other sets (lock striping). When it is given, it is used \
+				instead of a lock of the set's own. Default setting is None.
+
+			admission(optional): `admission` is the admission filter of the \
+				set, see `CacheSet`. Default setting is None.
+
+		"""
+		super(CompactCacheSet, self).__init__()
+		if replacement != 'LRU' and replacement != 'MRU':
+			raise ValueError("Invalid Input Values")
+		if lock != None:
+			self.lock = lock
+		elif thread_safe_mode:
+			self.lock = threading.Lock()
+		else:
+			self.lock = None
+		self.storage = storage
+		self.set_num = set_num
+		self.n_way = storage.n_way
+		self.offset_size = storage.offset_size
+		self.base = set_num * storage.n_way
+		self.mru = replacement == 'MRU'
+		#tag_index maps the tag of every non-empty line to its way. It is 
+		#only created when the first line is filled. 
+		self.tag_index = None
+		#tracer receives a `TraceEvent` for each operation, see `CacheSet`.
+		self.tracer = None
+		#the counters and the `LineCounter` of the cache, see `CacheSet`.
+		self.stats = CacheStats()
+		self.line_counter = None
+		self.admission = admission
+		#the deadlines of the items with a time to live, see `CacheSet`.
+		self.deadlines = dict()
+		self.next_deadline = float('inf')
+		self.clock = time.monotonic
+		#the weights of the items and the weight budget, see `CacheSet`.
+		self.weights = None
+		self.weight = 0
+		self.max_weight = None
+		self.max_item_weight = None
+		#the queue of the removal listener, see `CacheSet`.
+		self.removals = None
+
+	def touch(self, line):
+		"""touch is a function to mark a line as the most recently used one.
+
+		Args:
+			line(int): `line` is the row of the line in the columns.
+
+		"""
+		self.storage.touch(self.set_num, line)
+
+	def victim(self):
+		"""victim is a function to choose the way to evict based on the \
+		replacement policy. It should only be called when the set is full.
+
+		Returns:
+			the way of the victim line.
+		"""
+		if self.mru:
+			return self.storage.tails[self.set_num] - self.base
+		return self.storage.heads[self.set_num] - self.base
+
+	def set(self, value, tag, offset, deadline = None, weight = None, dirty = True):
+		"""set is a function to put an item(a key and value pair) into the \
+		cache set, see `CacheSet.set`.
+
+		Args:
+			value(value_type): `value` is the value of the item.
+
+			tag(int): `tag` is the tag of the hashed item key.
+
+			offset(int): `offset` is the offset of the hashed item.
+
+			deadline(float, optional): `deadline` is the time when the item \
+				expires. Default setting is None (the item doesn't expire).
+
+			weight(int, optional): `weight` is the weight of the item when \
+				the set has a weight budget. Default setting is None.
+
+			dirty(bool, optional): `dirty` is only used by write-back sets, \
+				which are always `CacheSet`s. Default setting is True.
+
+		Returns:
+			True if successful, False if the admission filter rejected the \
+			item or it weighs more than `max_item_weight`.
+		"""
+		if self.tracer != None:
+			return trace_operation(self, 'set', tag, self.store, (value, tag, offset, deadline, weight, dirty))[0] is not None
+		if self.lock != None:
+			self.lock.acquire()
+		try:
+			return self.store(value, tag, offset, deadline, weight, dirty)[0] is not None
+		finally:
+			if self.lock != None:
+				self.lock.release()
+
+	def store(self, value, tag, offset, deadline = None, weight = None, dirty = True):
+		"""store is the body of `set`, it doesn't take the lock of the set, \
+		so the caller should hold the lock.
+
+		Args:
+			value(value_type): `value` is the value of the item.
+
+			tag(int): `tag` is the tag of the hashed item key.
+
+			offset(int): `offset` is the offset of the hashed item.
+
+			deadline(float, optional): `deadline` is the time when the item \
+				expires. Default setting is None.
+
+			weight(int, optional): `weight` is the weight of the item. \
+				Default setting is None.
+
+			dirty(bool, optional): see `set`. Default setting is True.
+
+		Returns:
+			a tuple (hit, evicted), see `CacheSet.store`.
+		"""
+		if offset < 0 or offset >= self.offset_size:
+			raise IndexError("Out of bound")
+		storage = self.storage
+		index = self.tag_index
+		if index == None:
+			index = self.tag_index = dict()
+		way = index.get(tag)
+		if weight != None:
+			if weight > self.max_item_weight:
+				#the item doesn't fit, and the item it replaces is stale 
+				if way != None and storage.valid[(self.base + way) * storage.words + (offset >> 6)] >> (offset & 63) & 1:
+					if self.removals != None:
+						self.removals.append((storage.values[(self.base + way) * self.offset_size + offset], 'replaced'))
+					self.clear_slot(tag, self.base + way, offset)
+				self.stats.rejections += 1
+				return (None, None)
+			if way != None and not self.make_room(weight - self.weights[way][offset], tag):
+				#the other items of the line take too much of the budget
+				self.evict_way(way)
+				if self.line_counter != None:
+					self.line_counter.give()
+				way = None
+		#same order as `CacheSet.store`, an item which is rejected for its 
+		#weight isn't recorded 
+		if self.admission != None:
+			self.admission.record(tag)
+		hit = way != None
+		evicted = None
+		if hit:
+			self.stats.updates += 1
+		else:
+			if storage.free[self.set_num] == -1 and self.deadlines:
+				#expired items could free a line before a live one is evicted
+				purge_expired(self)
+			if storage.free[self.set_num] != -1:
+				#there is an empty line
+				self.stats.fills += 1
+				if self.line_counter != None:
+					self.line_counter.take()
+			else:
+				way = self.victim()
+				evicted = storage.tags[self.base + way]
+				if self.admission != None and not self.admission.admit(tag, evicted):
+					self.stats.rejections += 1
+					return (None, None)
+				#the evicted line is the empty line which is filled 
+				self.evict_way(way)
+				if self.line_counter != None and self.line_counter.free > 0:
+					self.stats.conflict_evictions += 1
+			if weight != None:
+				self.make_room(weight)
+			way = storage.fill(self.set_num) - self.base
+			storage.tags[self.base + way] = tag
+			index[tag] = way
+		line = self.base + way
+		word = line * storage.words + (offset >> 6)
+		bit = 1 << (offset & 63)
+		if not storage.valid[word] & bit:
+			storage.valid[word] |= bit
+			storage.valid_count[line] += 1
+		elif self.removals != None:
+			self.removals.append((storage.values[line * self.offset_size + offset], 'replaced'))
+		storage.values[line * self.offset_size + offset] = value
+		self.touch(line)
+		if deadline != None or self.deadlines:
+			set_deadline(self, tag, offset, deadline)
+		if weight != None:
+			set_weight(self, way, offset, weight)
+		return (hit, evicted)
+
+	def evict_way(self, way):
+		"""evict_way is a function to clear a line and take it out of the \
+		set, it becomes an empty line. The caller should hold the lock of \
+		the set.
+
+		Args:
+			way(int): `way` is the way of the line.
+
+		Returns:
+			the tag of the evicted line.
+		"""
+		line = self.base + way
+		evicted = self.storage.tags[line]
+		del self.tag_index[evicted]
+		if self.removals != None:
+			storage = self.storage
+			self.removals.extend([(storage.values[line * self.offset_size + offset], 'evicted') 
+				for offset in range(self.offset_size) 
+				if storage.valid[line * storage.words + (offset >> 6)] >> (offset & 63) & 1])
+		self.storage.clearline(line)
+		self.storage.release(self.set_num, line)
+		if self.deadlines:
+			forget_deadlines(self, evicted)
+		if self.weights != None:
+			clear_weights(self, way)
+		self.stats.evictions += 1
+		return evicted
+
+	def make_room(self, weight, keep = None):
+		"""make_room is a function to evict lines until `weight` more fits \
+		into the weight budget of the set, see `CacheSet.make_room`.
+
+		Args:
+			weight(int): `weight` is the weight which is going to be added.
+
+			keep(int, optional): `keep` is the tag of a line which must not \
+				be evicted. Default setting is None.
+
+		Returns:
+			True if the weight fits, False otherwise.
+		"""
+		storage = self.storage
+		while self.weight + weight > self.max_weight:
+			if self.mru:
+				line = storage.tails[self.set_num]
+				if line != -1 and storage.tags[line] == keep:
+					line = storage.prev[line]
+			else:
+				line = storage.heads[self.set_num]
+				if line != -1 and storage.tags[line] == keep:
+					line = storage.next[line]
+			if line == -1:
+				break
+			self.evict_way(line - self.base)
+			if self.line_counter != None:
+				self.line_counter.give()
+		return self.weight + weight <= self.max_weight
+
+	def get_value(self, tag, offset, default = None, check = None):
+		"""get_value is a function to get an item(a key and value pair) from \
+		the cache set, see `CacheSet.get_value`.
+
+		Args:
+			tag(int): `tag` is the tag of the hashed item key.
+
+			offset(int): `offset` is the offset of the hashed item (in a cache \
+				 line).
+
+			default(optional): `default` is returned when the item is not in \
+				the set. Default setting is None.
+
+			check(tuple, optional): `check` is the (fingerprint, key) of the \
+				item when the cache verifies keys, see `check_entry`. Default \
+				setting is None.
+
+		Returns:
+			if the value exist, return the value of the key. Otherwise \
+			return `default`.
+		"""
+		if self.tracer != None:
+			value = trace_operation(self, 'get', tag, self.lookup, (tag, offset, MISSING, check))
+			if value is MISSING:
+				return default
+			return value
+		if self.lock != None:
+			self.lock.acquire()
+		try:
+			return self.lookup(tag, offset, default, check)
+		finally:
+			if self.lock != None:
+				self.lock.release()
+
+	def lookup(self, tag, offset, default = None, check = None):
+		"""lookup is the body of `get_value`, it doesn't take the lock of the \
+		set, so the caller should hold the lock.
+
+		Args:
+			tag(int): `tag` is the tag of the hashed item key.
+
+			offset(int): `offset` is the offset of the hashed item (in a cache \
+				 line).
+
+			default(optional): `default` is returned when the item is not in \
+				the set. Default setting is None.
+
+			check(tuple, optional): `check` is the (fingerprint, key) of the \
+				item when the cache verifies keys, see `check_entry`. Default \
+				setting is None.
+
+		Returns:
+			if the value exist, return the value of the key. Otherwise \
+			return `default`.
+		"""
+		if self.admission != None:
+			self.admission.record(tag)
+		way = None
+		if self.tag_index != None:
+			way = self.tag_index.get(tag)
+		if way == None or (self.deadlines and is_expired(self, tag, offset)):
+			self.stats.misses += 1
+			return default
+		storage = self.storage
+		line = self.base + way
+		#if there isn't that offset, it still counts as one access.
+		self.touch(line)
+		if 0 <= offset < self.offset_size and storage.valid[line * storage.words + (offset >> 6)] >> (offset & 63) & 1:
+			value = storage.values[line * self.offset_size + offset]
+			if check == None:
+				self.stats.hits += 1
+				return value
+			value = check_entry(value, check)
+			if value is not MISSING:
+				self.stats.hits += 1
+				return value
+		self.stats.misses += 1
+		return default
+
+	def delete_value(self, tag, offset, value):
+		"""delete_value is a function to delete the item in a cache line which \
+		has the inputed key(trasferred to tag and offset) and value, see \
+		`CacheSet.delete_value`.
+
+		Args:
+			tag(int): `tag` is the tag of the hashed item key.
+
+			offset(int): `offset` is the offset of the hashed item \
+				(in a cache line).
+
+			value(value_type): `value` is the value of the item which is going to \
+				be deleted.
+
+		Returns:
+			if the value exist and be successfully deleted, return True; 
+			if not successfully deleted, return False; otherwise return None.
+		"""
+		if self.tracer != None:
+			return trace_operation(self, 'delete', tag, self.remove, (tag, offset, value))
+		if self.lock != None:
+			self.lock.acquire()
+		try:
+			return self.remove(tag, offset, value)
+		finally:
+			if self.lock != None:
+				self.lock.release()
+
+	def remove(self, tag, offset, value):
+		"""remove is the body of `delete_value`, it doesn't take the lock of \
+		the set, so the caller should hold the lock.
+
+		Args:
+			tag(int): `tag` is the tag of the hashed item key.
+
+			offset(int): `offset` is the offset of the hashed item \
+				(in a cache line).
+
+			value(value_type): `value` is the value of the item which is going to \
+				be deleted.
+
+		Returns:
+			if the value exist and be successfully deleted, return True; 
+			if not successfully deleted, return False; otherwise return None.
+		"""
+		if self.tag_index == None:
+			return None
+		way = self.tag_index.get(tag)
+		if way == None:
+			return None
+		storage = self.storage
+		line = self.base + way
+		word = line * storage.words + (offset >> 6)
+		bit = 1 << (offset & 63)
+		slot = line * self.offset_size + offset
+		if not (storage.valid[word] & bit and storage.values[slot] == value):
+			return False
+		if self.removals != None:
+			self.removals.append((storage.values[slot], 'deleted'))
+		if not self.clear_slot(tag, line, offset):
+			#delete also counts as an access
+			self.touch(line)
+		self.stats.deletes += 1
+		return True
+
+	def clear_slot(self, tag, line, offset):
+		"""clear_slot is a function to delete the item in a slot which \
+		holds one, and free the line if it became empty. The caller should \
+		hold the lock of the set.
+
+		Args:
+			tag(int): `tag` is the tag of the line.
+
+			line(int): `line` is the row of the line in the columns.
+
+			offset(int): `offset` is the offset of the item in the line.
+
+		Returns:
+			True if the line became empty, False otherwise.
+		"""
+		if self.deadlines:
+			self.deadlines.pop((tag, offset), None)
+		if self.weights != None:
+			set_weight(self, line - self.base, offset, 0)
+		storage = self.storage
+		storage.valid[line * storage.words + (offset >> 6)] &= ~(1 << (offset & 63))
+		storage.values[line * self.offset_size + offset] = None
+		storage.valid_count[line] -= 1
+		if storage.valid_count[line] != 0:
+			return False
+		del self.tag_index[tag]
+		storage.release(self.set_num, line)
+		if self.line_counter != None:
+			self.line_counter.give()
+		return True
+
+	def drop(self, tag, offset):
+		"""drop is a function to delete an expired item, see \
+		`CacheSet.drop`.
+
+		Args:
+			tag(int): `tag` is the tag of the hashed item key.
+
+			offset(int): `offset` is the offset of the hashed item \
+				(in a cache line).
+
+		"""
+		self.deadlines.pop((tag, offset), None)
+		way = self.tag_index.get(tag) if self.tag_index != None else None
+		if way == None:
+			return
+		storage = self.storage
+		line = self.base + way
+		if storage.valid[line * storage.words + (offset >> 6)] >> (offset & 63) & 1:
+			if self.removals != None:
+				self.removals.append((storage.values[line * self.offset_size + offset], 'expired'))
+			self.clear_slot(tag, line, offset)
+			self.stats.expirations += 1
+
+	def snapshot_stats(self, reset = False):
+		"""snapshot_stats is a function to copy the counters of the set under \
+		the lock of the set, see `CacheSet.snapshot_stats`.
+
+		Args:
+			reset(bool, optional): when `reset` == True, the counters are set \
+				to 0 right after they are copied. Default setting is False.
+
+		Returns:
+			a tuple (counters, lines_used, weight).
+		"""
+		if self.lock != None:
+			self.lock.acquire()
+		try:
+			counters = self.stats.as_dict()
+			if reset:
+				self.stats.reset()
+			return counters, len(self.tag_index or ()), self.weight
+		finally:
+			if self.lock != None:
+				self.lock.release()
+
+	def export_lines(self):
+		"""export_lines is a function to copy the items of the set for a \
+		snapshot or a resize, see `CacheSet.export_lines`. The caller should \
+		hold the lock of the set.
+
+		Returns:
+			a list of (tag, items) of the non-empty lines, from the least to \
+			the most recently used one.
+		"""
+		if not self.tag_index:
+			return []
+		storage = self.storage
+		now = self.clock()
+		lines = []
+		line = storage.heads[self.set_num]
+		while line != -1:
+			way = line - self.base
+			tag = storage.tags[line]
+			items = []
+			for offset in range(self.offset_size):
+				if not storage.valid[line * storage.words + (offset >> 6)] >> (offset & 63) & 1:
+					continue
+				deadline = self.deadlines.get((tag, offset)) if self.deadlines else None
+				if deadline != None and deadline <= now:
+					continue
+				weight = self.weights[way][offset] if self.weights != None else None
+				items.append((offset, storage.values[line * self.offset_size + offset], deadline, weight, False))
+			if items:
+				lines.append((tag, items))
+			line = storage.next[line]
+		return lines
+
+	def get_many(self, tags, offsets, default = None, checks = None):
+		"""get_many is a function to get a batch of items from the set, \
+		taking the lock of the set only once, see `CacheSet.get_many`.
+
+		Args:
+			tags(list): `tags` is the tags of the hashed item keys.
+
+			offsets(list): `offsets` is the offsets of the hashed items.
+
+			default(optional): `default` is returned for the items which are \
+				not in the set. Default setting is None.
+
+			checks(list, optional): `checks` is the (fingerprint, key) of \
+				each item when the cache verifies keys, see `check_entry`. \
+				Default setting is None.
+
+		Returns:
+			a list of the values, in the order of `tags`.
+		"""
+		return run_batch(self, 'get', self.lookup, tags, offsets, repeat(default, len(tags)), 
+			checks or repeat(None, len(tags)))
+
+	def set_many(self, values, tags, offsets, deadline = None, weights = None, dirty = True):
+		"""set_many is a function to put a batch of items into the set, \
+		taking the lock of the set only once.
+
+		Args:
+			values(list): `values` is the values of the items.
+
+			tags(list): `tags` is the tags of the hashed item keys.
+
+			offsets(list): `offsets` is the offsets of the hashed items.
+
+			deadline(float, optional): `deadline` is the time when the items \
+				expire. Default setting is None (they don't expire).
+
+			weights(list, optional): `weights` is the weights of the items. \
+				Default setting is None.
+
+			dirty(bool, optional): see `set`. Default setting is True.
+
+		Returns:
+			True if successful.
+		"""
+		run_batch(self, 'set', self.store, values, tags, offsets, repeat(deadline, len(values)), 
+			weights or repeat(None, len(values)), repeat(dirty, len(values)))
+		return True
+
+	def delete_many(self, tags, offsets, values):
+		"""delete_many is a function to delete a batch of items from the set, \
+		taking the lock of the set only once.
+
+		Args:
+			tags(list): `tags` is the tags of the hashed item keys.
+
+			offsets(list): `offsets` is the offsets of the hashed items.
+
+			values(list): `values` is the values of the items.
+
+		Returns:
+			a list of the results of `delete_value`, in the order of `tags`.
+		"""
+		return run_batch(self, 'delete', self.remove, tags, offsets, values)
+
+
+class LazySets(dict):
+	'''LazySets class keeps the sets of a cache in lazy mode. It maps the \
+	number of each set which was used to the set, and a set which is \
+	looked up for the first time is built then, so creating a large cache \
+	doesn't build any set. Iterating over it goes through the sets which \
+	were built, in the order of their numbers.'''
+
+	def __init__(self, build, thread_safe_mode = True):
+		"""The __init__ method of a LazySets is used to initialize the \
+		sets of a cache, none of them is built yet.
+
+		Args:
+			build(:func:): `build` is called as build(set_num) to build a \
+				set.
+
+			thread_safe_mode(bool, optional): when `thread_safe_mode` == True, \
+				the sets are built under a lock, so a set is only built once. \
+				Default setting is True.
+
+		"""
+		super(LazySets, self).__init__()
+		self.build = build
+		if thread_safe_mode:
+			self.lock = threading.Lock()
+		else:
+			self.lock = None
+
+	def __missing__(self, set_num):
+		if self.lock != None:
+			self.lock.acquire()
+		try:
+			cache_set = self.get(set_num)
+			if cache_set is None:
+				cache_set = self.build(set_num)
+				self[set_num] = cache_set
+			return cache_set
+		finally:
+			if self.lock != None:
+				self.lock.release()
+
+	def __iter__(self):
+		return iter([self[set_num] for set_num in sorted(self.keys())])
+
+
+#the header of a snapshot file: magic, version, total_sets, n_way, offset_size 
+#and flags, followed by the (start, length) of the record of each set 
+SNAPSHOT_HEADER = struct.Struct('<8sIIIII')
+SNAPSHOT_MAGIC = b'NWAYSNAP'
+SNAPSHOT_VERSION = 2
+#the flags of a snapshot file 
+SNAPSHOT_VERIFY_KEYS = 1
+SNAPSHOT_WEIGHTS = 2
+
+
+class Snapshot(object):
+	'''Snapshot class restores the sets of a cache from a snapshot file \
+	written by `Cache.save_snapshot`. The file is mapped into memory and \
+	only the index of the sets is read up front, the record of a set is \
+	parsed when the set is first used (see `PendingSet`).'''
+
+	def __init__(self, cache, path):
+		"""The __init__ method of a Snapshot is used to map a snapshot file \
+		and check that it fits the layout of the cache.
+
+		Args:
+			cache(:obj:`Cache`): `cache` is the cache which is restored.
+
+			path(string): `path` is the path of the snapshot file.
+
+		"""
+		super(Snapshot, self).__init__()
+		self.cache = cache
+		with open(path, 'rb') as snapshot_file:
+			self.map = mmap.mmap(snapshot_file.fileno(), 0, access = mmap.ACCESS_READ)
+		flags = 0
+		if cache.verify_keys:
+			flags |= SNAPSHOT_VERIFY_KEYS
+		if cache.max_weight != None:
+			flags |= SNAPSHOT_WEIGHTS
+		layout = (SNAPSHOT_MAGIC, SNAPSHOT_VERSION, cache.total_sets, cache.n_way, cache.offset_size, flags)
+		if len(self.map) < SNAPSHOT_HEADER.size or SNAPSHOT_HEADER.unpack_from(self.map) != layout:
+			self.map.close()
+			raise ValueError("The snapshot has another layout")
+		self.index = array('Q')
+		self.index.frombytes(self.map[SNAPSHOT_HEADER.size:SNAPSHOT_HEADER.size + 16 * cache.total_sets])
+		if sys.byteorder == 'big':
+			self.index.byteswap()
+		self.words = (cache.offset_size + 63) >> 6
+		self.lock = threading.Lock()
+		#set_nums are the sets which have a record, pending counts the ones 
+		#which are not restored yet 
+		self.set_nums = [set_num for set_num in range(cache.total_sets) if self.index[2 * set_num + 1]]
+		self.pending = len(self.set_nums)
+		if self.pending == 0:
+			self.map.close()
+
+	def restore(self, cache_set):
+		"""restore is a function to put the items of a set back from the \
+		snapshot, unless it was already done, and put the set into the cache \
+		in place of its `PendingSet`.
+
+		Args:
+			cache_set(:obj:`CacheSet`): `cache_set` is the set to restore.
+
+		Returns:
+			the set.
+		"""
+		cache = self.cache
+		set_num = cache_set.set_num
+		with self.lock:
+			if cache.sets[set_num] is cache_set:
+				return cache_set
+			start = self.index[2 * set_num]
+			self.fill(cache_set, set_num, start, start + self.index[2 * set_num + 1])
+			#the counters only count what happens after the restart
+			cache_set.stats.reset()
+			cache.sets[set_num] = cache_set
+			self.pending -= 1
+			if self.pending == 0:
+				self.map.close()
+		return cache_set
+
+	def fill(self, cache_set, set_num, start, end):
+		"""fill is a function to parse the record of a set and put its \
+		items into the set. The set isn't in the cache yet, so it doesn't \
+		need its lock.
+
+		Args:
+			cache_set(:obj:`CacheSet`): `cache_set` is the set to fill.
+
+			set_num(int): `set_num` is the number of the set.
+
+			start(int): `start` is where the record starts in the file.
+
+			end(int): `end` is where the record ends in the file.
+
+		"""
+		cache = self.cache
+		lines = struct.unpack_from('<I', self.map, start)[0]
+		start += 4
+		tags = array('q')
+		tags.frombytes(self.map[start:start + 8 * lines])
+		start += 8 * lines
+		valid = array('Q')
+		valid.frombytes(self.map[start:start + 8 * lines * self.words])
+		start += 8 * lines * self.words
+		if sys.byteorder == 'big':
+			tags.byteswap()
+			valid.byteswap()
+		items = iter(pickle.loads(self.map[start:end]))
+		now = cache.clock()
+		for line, tag in enumerate(tags):
+			for offset in range(cache.offset_size):
+				if not valid[line * self.words + (offset >> 6)] >> (offset & 63) & 1:
+					continue
+				value, ttl, weight, dirty = next(items)
+				if cache.verify_keys:
+					#the fingerprint might come from the built-in hash, which 
+					#is salted per process 
+					key = value[1]
+					value = (cache.fingerprint(key, cache.hash(key)), key, value[2])
+				deadline = None if ttl == None else now + ttl
+				if cache_set.store(value, tag, offset, deadline, weight, dirty)[0] is not None and deadline != None:
+					cache.wheel.schedule(deadline, (((tag << cache.set_bits) | set_num, offset),))
+
+
+class PendingSet(object):
+	'''PendingSet class stands in the sets of a cache for a set which \
+	isn't filled yet, from a snapshot (see `Snapshot`) or with the lines \
+	of the sets before a resize (see `Rehash`). The first use of any \
+	attribute of the set fills it.'''
+
+	__slots__ = ('source', 'cache_set')
+
+	def __init__(self, source, cache_set):
+		"""The __init__ method of a PendingSet is used to initialize a \
+		stand-in of a set.
+
+		Args:
+			source(:obj:`Snapshot` or :obj:`Rehash`): `source` fills the \
+				set, it is called as source.restore(cache_set).
+
+			cache_set(:obj:`CacheSet`): `cache_set` is the set.
+
+		"""
+		object.__setattr__(self, 'source', source)
+		object.__setattr__(self, 'cache_set', cache_set)
+
+	def __getattr__(self, name):
+		return getattr(self.source.restore(self.cache_set), name)
+
+	def __setattr__(self, name, value):
+		setattr(self.source.restore(self.cache_set), name, value)
+
+
+class Rehash(object):
+	'''Rehash class moves the lines of the sets of a cache to the sets of \
+	its new layout after `Cache.resize`, a set at a time. A new set which \
+	has old sets to take lines from is a `PendingSet` until it is filled, \
+	either by its first use or by `step`, which the operations of the \
+	cache call to move a few more sets each (progressive rehashing). \
+	Lines keep their offsets, so each line moves as a whole.'''
+
+	def __init__(self, cache, sets, set_bits):
+		"""The __init__ method of a Rehash is used to keep the sets of the \
+		old layout of a cache.
+
+		Args:
+			cache(:obj:`Cache`): `cache` is the cache which is resized.
+
+			sets(list or :obj:`LazySets`): `sets` is the sets of the old \
+				layout.
+
+			set_bits(int): `set_bits` is the set bits of the old layout.
+
+		"""
+		super(Rehash, self).__init__()
+		self.cache = cache
+		self.set_bits = set_bits
+		#sets maps the number of each old set which still has lines to move
+		#to the set, left to the number of its new sets which aren't filled
+		if isinstance(sets, LazySets):
+			self.sets = dict(sets.items())
+		else:
+			self.sets = dict(enumerate(sets[:1 << set_bits]))
+		self.left = dict()
+		self.lock = threading.Lock()
+		self.table = None
+		self.new_bits = None
+		#waiting maps the number of each new set which isn't filled yet to
+		#the set, set_nums keeps them in order for `step`
+		self.waiting = dict()
+		self.set_nums = []
+		self.cursor = 0
+
+	def start(self, table, new_bits):
+		"""start is a function to put a `PendingSet` into the new sets of \
+		the cache for each new set which takes lines from an old set.
+
+		Args:
+			table(list or :obj:`LazySets`): `table` is the sets of the new \
+				layout.
+
+			new_bits(int): `new_bits` is the set bits of the new layout.
+
+		"""
+		self.table = table
+		self.new_bits = new_bits
+		new_mask = ~(-1 << new_bits)
+		#the lines of an old set go to the new sets with the same low bits
+		step = 1 << self.set_bits
+		for set_num in self.sets:
+			targets = range(set_num & new_mask, 1 << new_bits, step)
+			self.left[set_num] = len(targets)
+			for target in targets:
+				self.waiting[target] = None
+		self.set_nums = sorted(self.waiting)
+		for set_num in self.set_nums:
+			cache_set = table[set_num]
+			self.waiting[set_num] = cache_set
+			table[set_num] = PendingSet(self, cache_set)
+
+	def restore(self, cache_set):
+		"""restore is a function to fill a new set, unless it was already \
+		done, see `PendingSet`.
+
+		Args:
+			cache_set(:obj:`CacheSet`): `cache_set` is the new set.
+
+		Returns:
+			the set.
+		"""
+		with self.lock:
+			if self.waiting.get(cache_set.set_num) is cache_set:
+				self.move(cache_set)
+		return cache_set
+
+	def step(self, count = 1):
+		"""step is a function to fill the next `count` new sets which are \
+		not filled yet, in the order of their numbers.
+
+		Args:
+			count(int, optional): `count` is the number of the sets. \
+				Default setting is 1.
+
+		"""
+		with self.lock:
+			while count > 0 and self.cursor < len(self.set_nums):
+				cache_set = self.waiting.get(self.set_nums[self.cursor])
+				self.cursor += 1
+				if cache_set is not None:
+					self.move(cache_set)
+					count -= 1
+
+	def finish(self):
+		"""finish is a function to fill every new set which is not filled \
+		yet.
+		"""
+		self.step(len(self.set_nums))
+
+	def move(self, cache_set):
+		"""move is a function to put the lines of the old sets which belong \
+		to a new set into it, and put the set into the cache in place of \
+		its `PendingSet`. The new set isn't in the cache yet, so it doesn't \
+		need its lock. The caller should hold the lock of the rehash.
+
+		Args:
+			cache_set(:obj:`CacheSet`): `cache_set` is the new set.
+
+		"""
+		cache = self.cache
+		set_num = cache_set.set_num
+		new_mask = ~(-1 << self.new_bits)
+		low_bits = min(self.set_bits, self.new_bits)
+		moved = []
+		for old_num in range(set_num & ~(-1 << low_bits), 1 << self.set_bits, 1 << low_bits):
+			old_set = self.sets.get(old_num)
+			if old_set == None:
+				continue
+			lock = old_set.lock
+			if lock != None:
+				lock.acquire()
+			try:
+				#expired items leave through `drop`, so their writes are 
+				#queued and the listener is told, export_lines skips them 
+				if old_set.deadlines:
+					purge_expired(old_set)
+				lines = old_set.export_lines()
+				writes = None
+				if cache.writer != None and old_set.writes:
+					#the queued writes of the old set go with its first new set
+					writes = old_set.writes
+					old_set.writes = []
+			finally:
+				if lock != None:
+					lock.release()
+			if writes:
+				cache_set.writes.extend(writes)
+			for tag, items in lines:
+				line_num = (tag << self.set_bits) | old_num
+				if line_num & new_mask != set_num:
+					continue
+				tag = line_num >> self.new_bits
+				for offset, value, deadline, weight, dirty in items:
+					#the timer wheel already has the slot, see `Cache.expire`
+					if cache_set.store(value, tag, offset, deadline, weight, dirty)[0] is None:
+						if cache_set.removals != None:
+							cache_set.removals.append((value, 'evicted'))
+			self.left[old_num] -= 1
+			if self.left[old_num] == 0:
+				del self.sets[old_num]
+				moved.append(old_set)
+		#the counters don't count the moves, and the counters of an old set 
+		#are kept by the last of its new sets 
+		cache_set.stats.reset()
+		for old_set in moved:
+			for field in STATS_FIELDS:
+				setattr(cache_set.stats, field, getattr(cache_set.stats, field) + getattr(old_set.stats, field))
+		del self.waiting[set_num]
+		self.table[set_num] = cache_set
+		if not self.waiting and cache.rehash is self:
+			cache.rehash = None
+
+
+class Layout(object):
+	'''Layout class keeps the fields of a cache which `Cache.resize` \
+	changes: the size, the ways and the sets, and the masks which find the \
+	set of an item. A resize builds a new layout and publishes it with a \
+	single assignment, so an operation which reads the layout once never \
+	mixes the sets of one layout with the masks of another.'''
+
+	__slots__ = ('cache_size', 'n_way', 'total_sets', 'set_bits', 'set_mask', 
+		'tag_shift', 'storage', 'line_counter', 'set_max_weight', 
+		'max_item_weight', 'sets')
+
+	def __init__(self, cache_size, n_way, total_sets, offset_bits):
+		"""The __init__ method of a Layout is used to initialize the \
+		layout of a cache, the sets are built by the cache.
+
+		Args:
+			cache_size(int): `cache_size` is the cache size.
+
+			n_way(int): `n_way` is how many ways/lines in a cache set.
+
+			total_sets(int): `total_sets` is how many sets the cache has, a \
+				power of 2.
+
+			offset_bits(int): `offset_bits` is the `b` of the cache.
+
+		"""
+		super(Layout, self).__init__()
+		self.cache_size = cache_size
+		self.n_way = n_way
+		self.total_sets = total_sets
+		self.set_bits = int(math.log(total_sets, 2))
+		#masks and shifts to split a hash result into set, tag and offset
+		self.set_mask = ~(-1 << self.set_bits)
+		self.tag_shift = self.set_bits + offset_bits
+		self.storage = None
+		#line_counter counts the empty lines of the whole cache, the sets 
+		#use it to tell conflict evictions from capacity evictions. 
+		self.line_counter = LineCounter(total_sets * n_way)
+		self.set_max_weight = None
+		self.max_item_weight = None
+		self.sets = None
+
+
+def layout_field(name):
+	"""layout_field is to make a read-only attribute of `Cache` which \
+	reads a field of its current `Layout`.
+
+	Args:
+		name(string): `name` is the name of the field.
+
+	Returns:
+		the property.
+	"""
+	return property(lambda cache: getattr(cache.layout, name), 
+		doc = "`%s` of the current layout of the cache, see `Layout`." % name)
+
+
+class Cache(object):
+	'''Cache class serves as a cache to store cache sets, each cache 
+	set will have cache lines to store items (a key & value pair).'''
+
+	cache_size = layout_field('cache_size')
+	n_way = layout_field('n_way')
+	total_sets = layout_field('total_sets')
+	set_bits = layout_field('set_bits')
+	set_mask = layout_field('set_mask')
+	tag_shift = layout_field('tag_shift')
+	storage = layout_field('storage')
+	line_counter = layout_field('line_counter')
+	set_max_weight = layout_field('set_max_weight')
+	max_item_weight = layout_field('max_item_weight')
+	sets = layout_field('sets')
+
+
+	def __init__(self, cache_size, n_way, b, key_type, value_type, replacement = None, hash = hash, thread_safe_mode = True, storage = 'object', lock_stripes = None, tracer = None, admission = None, verify_keys = False, ttl = None, clock = time.monotonic, max_weight = None, weigher = None, max_item_weight = None, lazy = False, writer = None, write_through = False, listener = None, victim_lines = None):
+		"""The __init__ method of a cache is used to initialize a cache.
+
+		Args:
+			cache_size (int): `cache_size` is the cache size we can use to save \
+				items. if cache size == n, it means we can store at most n items. \
+				cache size should be larger than n_ways * number of sets * \
+				* offset size.
+
+			n_way(int): `n_way` is used to specify how many ways/lines in a \
+				cache set. 
+
+			b(int): `b` is used to calculate offset size. offset size is 2^b.
+
+			key_type(key_type): `key_type` is used to specifiy the key type of \
+				the item.
+
+			value_type(value_type): `value_type` is used to specifiy the key type \
+				of the item. 
+
+			replacement(:obj:`ReplacementPolicy`, optional): `replacement` is to \
+				set the cache replacement policy. User could either to pass a \
+				subclass of `ReplacementPolicy` or a factory, which is called \
+				as replacement(n_way, thread_safe_mode = thread_safe_mode) to \
+				build an independent policy for each set, or pass a string to \
+				specify the `LRU` or `MRU` policy, or a policy of \
+				`REPLACEMENT_POLICIES`, e.g. `TREE_PLRU`, `CLOCK`, `SLRU` or \
+				`ARC`. An instance of `ReplacementPolicy` is still accepted \
+				but it is shared by all of the sets, so they contend on its \
+				lock and mix their recency. Default setting is `LRU`.
+
+			hash(:func:, optional): `hash` is to provide the hash function that \
+				used to hash keys of the items. Default setting is to use \
+				python's built-in hash function. 
+
+			thread_safe_mode(bool, optional): when `thread_safe_mode` == True, \
+				means the class is thread safe, One thing must be noted is that \
+				thread safe mode will have worse performance regrading of time \
+				since lock is costly. Default setting is True (enable thread safe \
+				mode).
+
+			storage(string, optional): `storage` is to choose how cache lines are \
+				stored. `object` keeps one `CacheLine` object per line. `compact` \
+				keeps the lines of the whole cache in flat arrays (see \
+				`CompactStorage`), which takes much less memory but only supports \
+				the `LRU` and `MRU` policies. Default setting is `object`.
+
+			lock_stripes(int, optional): `lock_stripes` is to choose the lock \
+				striping mode of the thread safe mode. When it is set, the cache \
+				creates `lock_stripes` locks (at most one per set) and set i is \
+				guarded by lock i % `lock_stripes` only, the cache, the lines \
+				and the replacement policies don't take any lock of their own. \
+				Operations on sets guarded by different locks don't contend. \
+				Default setting is None (every object keeps its own lock).
+
+			tracer(:func:, optional): `tracer` is a callable which receives a \
+				`TraceEvent` for every operation on a set, e.g. a \
+				`ChromeTraceWriter`. Default setting is None (tracing is \
+				disabled), see `set_tracer`.
+
+			admission(string or :func:, optional): `admission` is to put an \
+				admission filter in front of the eviction of each set. It is \
+				either `TINYLFU` (see `TinyLFU`) or a function which builds \
+				the filter of a set from `n_way`. A new line which would \
+				evict a victim is rejected unless the filter admits it, and \
+				then `set_value` returns False. Default setting is None \
+				(every new line is admitted).
+
+			verify_keys(bool, optional): when `verify_keys` == True, each slot \
+				keeps the key and a fingerprint of the item besides the value, \
+				and an item is only found by an equal key. Keys with equal \
+				hash results then can't return each other's values, so a \
+				fast hash function with collisions is safe to use. Default \
+				setting is False.
+
+			ttl(float, optional): `ttl` is the default time to live of the \
+				items in seconds, which `set_value` and the batch sets use \
+				when they aren't given one. An expired item is a miss, and \
+				its slot is freed by the next lookup of it, by a set into \
+				its full set, or by `expire` (called on sets, or from \
+				a background thread, see `start_sweeper`). Default setting \
+				is None (items don't expire).
+
+			clock(:func:, optional): `clock` is the function which returns \
+				the current time in seconds for the time to live. Default \
+				setting is `time.monotonic`.
+
+			max_weight(int, optional): `max_weight` is the weight budget of \
+				the cache, e.g. in bytes. Each set gets an equal share of it, \
+				and a set evicts lines until a new item fits into its share. \
+				`cache_size` still sets how many slots the cache has. Default \
+				setting is None (items are not weighed).
+
+			weigher(:func:, optional): `weigher` is called as weigher(key, \
+				value) to get the weight of an item. It is required with \
+				`max_weight`. Default setting is None.
+
+			max_item_weight(int, optional): `max_item_weight` is the largest \
+				weight of an item, heavier items are rejected and \
+				`set_value` returns False. It can't be larger than the share \
+				of a set. Default setting is None (the share of a set).
+
+			lazy(bool, optional): when `lazy` == True, a set is only built \
+				when it is first used, and the lines of a set (with \
+				`storage` `object`) when they are first filled, so a large \
+				cache is created at once and only takes memory for the sets \
+				it uses. Iterating over `sets` then only goes through the \
+				sets which were built. Default setting is False (every set \
+				and line is built by `__init__`).
+
+			writer(:func:, optional): `writer` is called as writer(items) \
+				with a list of (key, value) pairs to write items into the \
+				backend. In write-back mode, `set_value` only marks the item \
+				as dirty, and the dirty items are written in one batch per \
+				set when their line is evicted, or they expire or are \
+				deleted, and all of them by `flush`. The slots keep the keys \
+				then, as with `verify_keys`. Only the `object` storage \
+				supports it. Default setting is None (the cache doesn't \
+				write).
+
+			write_through(bool, optional): when `write_through` == True, \
+				`set_value` and `set_many` call `writer` before they put the \
+				items into the cache, and nothing is dirty. Default setting \
+				is False (write-back).
+
+			listener(:func:, optional): `listener` is called as \
+				listener(notifications) with a list of `RemovalNotification` \
+				for the items which left the cache. The sets only queue the \
+				removals, and a background thread sends them in batches \
+				(see `start_dispatcher`), so the listener never runs under \
+				the lock of a set. The slots keep the keys then, as with \
+				`verify_keys`. Default setting is None.
+
+			victim_lines(int, optional): `victim_lines` is the number of \
+				lines of a fully associative buffer shared by the sets (see \
+				`VictimBuffer`), which keeps the lines they evict. A set \
+				which misses a line takes it back from the buffer, so keys \
+				which conflict in a set with few ways stay cached while the \
+				rest of the cache is empty. Only the `object` storage \
+				without a `max_weight` supports it, and the lines in the \
+				buffer are not saved by `save_snapshot`. Default setting is \
+				None (evicted lines leave the cache).
+
+
+		"""
+
+		super(Cache, self).__init__()
+
+
+		if thread_safe_mode and lock_stripes == None:
+			self.lock = threading.Lock()
+		else:
+			self.lock = None
+
+		if replacement == None or replacement == 'LRU':
+			self.replacement = 'LRU'
+		elif replacement == 'MRU':
+			self.replacement = 'MRU'
+		elif replacement in REPLACEMENT_POLICIES:
+			self.replacement = replacement
+		elif isinstance(replacement, ReplacementPolicy):
+			#kept for backward compatibility, the instance is shared by all 
+			#of the sets 
+			self.replacement = replacement
+		elif callable(replacement):
+			self.replacement = replacement
+		else:
+			raise ValueError("Invalid Input Values")
+
+		self.key_type = key_type
+		self.value_type = value_type 
+
+		self.offset_size = 2**b
+		self.offset_bits = b 
+		total_sets = int(math.floor(cache_size / (2**b) / n_way))
+		self.offset_mask = ~(-1 << self.offset_bits)
+
+		#check values
+		if self.is_valid_input(cache_size, n_way, total_sets, self.offset_size, b) == False:
+			raise ValueError("Invalid Input Values")
+		#layout keeps the fields which `resize` changes, see `Layout`
+		layout = self.layout = Layout(cache_size, n_way, total_sets, b)
+
+		#initalize the striped locks
+		if thread_safe_mode and lock_stripes != None:
+			if lock_stripes <= 0:
+				raise ValueError("Invalid Input Values")
+			self.stripes = [threading.Lock() for i in range(min(lock_stripes, total_sets))]
+		else:
+			self.stripes = None
+
+		if ttl != None and ttl <= 0:
+			raise ValueError("Invalid Input Values")
+
+		if max_weight != None:
+			set_max_weight = max_weight // total_sets
+			if weigher == None or set_max_weight <= 0:
+				raise ValueError("Invalid Input Values")
+			if max_item_weight != None and (max_item_weight <= 0 or max_item_weight > set_max_weight):
+				raise ValueError("Invalid Input Values")
+		elif weigher != None or max_item_weight != None:
+			raise ValueError("Invalid Input Values")
+
+		if writer != None:
+			if not callable(writer) or storage != 'object':
+				raise ValueError("Invalid Input Values")
+			#the writer needs the keys of the items
+			verify_keys = True
+		elif write_through:
+			raise ValueError("Invalid Input Values")
+		if listener != None:
+			if not callable(listener):
+				raise ValueError("Invalid Input Values")
+			#the notifications report the keys of the items
+			verify_keys = True
+		if victim_lines != None:
+			if victim_lines <= 0 or storage != 'object' or max_weight != None:
+				raise ValueError("Invalid Input Values")
+
+		if admission in ADMISSION_FILTERS:
+			admission = ADMISSION_FILTERS[admission]
+		elif admission != None and not callable(admission):
+			raise ValueError("Invalid Input Values")
+		self.admission = admission
+
+		#initalize cache sets
+		if storage == 'compact':
+			layout.storage = CompactStorage(total_sets, n_way, self.offset_size)
+		elif storage != 'object':
+			raise ValueError("Invalid Input Values")
+		self.max_weight = max_weight
+		self.weigher = weigher
+		#the `max_item_weight` which was asked for, None when it follows 
+		#the share of a set (which `resize` changes) 
+		self.item_weight_limit = max_item_weight
+		if max_weight != None:
+			layout.set_max_weight = set_max_weight
+			layout.max_item_weight = set_max_weight if max_item_weight == None else max_item_weight
+		self.writer = writer
+		self.write_through = write_through
+		#removals is the queue of the removals which the sets report to the 
+		#listener, appending to a deque doesn't block the sets. 
+		self.listener = listener
+		self.removals = collections.deque() if listener != None else None
+		self.dispatcher = None
+		self.dispatch_lock = threading.Lock()
+		if victim_lines != None:
+			self.victims = VictimBuffer(victim_lines, thread_safe_mode = thread_safe_mode)
+			self.victims.removals = self.removals
+		else:
+			self.victims = None
+		#the settings which `new_set` builds the sets with 
+		self.policy = self.replacement
+		self.thread_safe_mode = thread_safe_mode
+		self.lazy = lazy
+		#rehash moves the lines to the new sets after `resize`, None when
+		#no lines are left to move
+		self.rehash = None
+		self.rehash_step = 1
+		self.tracer = None
+		self.clock = clock
+		layout.sets = self.build_sets(layout)
+		#wheel keeps the slots of the items with a time to live until they 
+		#expire, so `expire` could free them without scanning the sets. A 
+		#slot is kept as (hash result >> b, offset), which doesn't depend on 
+		#the number of sets, so the slots stay valid across `resize`. 
+		self.ttl = ttl
+		self.wheel = TimerWheel(now = clock(), thread_safe_mode = thread_safe_mode)
+		self.sweeper = None
+		#flights maps the keys being loaded by `get_or_load` to their 
+		#`Flight`. It always has a lock, coalescing is for threads. 
+		self.flights = dict()
+		self.flights_lock = threading.Lock()
+		#block_flights maps the lines being loaded by `get_or_load_block`, 
+		#as (first key, end key) or (key,), to their `Flight`. 
+		self.block_flights = dict()
+		self.replacement = replacement
+		self.hash = hash
+		self.verify_keys = verify_keys
+		self.set_tracer(tracer)
+		if listener != None:
+			self.start_dispatcher()
+
+	def new_set(self, set_num, layout):
+		"""new_set is to build a set of the cache with the settings of the \
+		cache. It is called for every set by `build_sets`, or when a set is \
+		first used in lazy mode.
+
+		Args:
+			set_num(int): `set_num` is the number of the set.
+
+			layout(:obj:`Layout`): `layout` is the layout which the set \
+				belongs to.
+
+		Returns:
+			the set.
+		"""
+		if layout.storage == None:
+			cache_set = CacheSet(layout.n_way, self.offset_size, replacement = self.policy, 
+				thread_safe_mode = self.thread_safe_mode, lock = self.get_stripe(set_num), 
+				set_num = set_num, admission = self.new_admission(layout.n_way), lazy = self.lazy)
+		else:
+			cache_set = CompactCacheSet(layout.storage, set_num, replacement = self.policy, 
+				thread_safe_mode = self.thread_safe_mode, lock = self.get_stripe(set_num), 
+				admission = self.new_admission(layout.n_way))
+		cache_set.line_counter = layout.line_counter
+		cache_set.clock = self.clock
+		cache_set.tracer = self.tracer
+		if self.writer != None and not self.write_through:
+			cache_set.write_back = True
+		cache_set.removals = self.removals
+		if self.victims != None:
+			cache_set.victims = self.victims
+			cache_set.set_bits = layout.set_bits
+		if layout.set_max_weight != None:
+			cache_set.weights = [[0] * self.offset_size for i in range(layout.n_way)]
+			cache_set.max_weight = layout.set_max_weight
+			cache_set.max_item_weight = layout.max_item_weight
+		return cache_set
+
+	def build_sets(self, layout):
+		"""build_sets is to build the sets of a layout, see `new_set`. In \
+		lazy mode none of them is built yet.
+
+		Args:
+			layout(:obj:`Layout`): `layout` is the layout.
+
+		Returns:
+			a list of the sets, or a `LazySets` in lazy mode.
+		"""
+		if self.lazy:
+			return LazySets(lambda set_num: self.new_set(set_num, layout), thread_safe_mode = self.thread_safe_mode)
+		return [self.new_set(i, layout) for i in range(layout.total_sets)]
+
+	def set_tracer(self, tracer):
+		"""set_tracer is to enable or disable tracing of the cache. When a \
+		tracer is set, every get, set and delete on a set is timed and sent \
+		to the tracer as a `TraceEvent`. When tracing is disabled, the \
+		operations only pay for checking that the tracer is None.
+
+		Args:
+			tracer(:func:): `tracer` is a callable which receives a \
+				`TraceEvent`, or None to disable tracing.
+
+		"""
+		self.tracer = tracer
+		#in lazy mode only the sets which were built, `new_set` passes the 
+		#tracer on to the others 
+		for cache_set in self.sets:
+			cache_set.tracer = tracer
+
+	def deadline(self, ttl):
+		"""deadline is to get the time when an item put into the cache now \
+		expires.
+
+		Args:
+			ttl(float): `ttl` is the time to live of the item in seconds, or \
+				None for the default time to live of the cache.
+
+		Returns:
+			the deadline on `clock`, or None if the item doesn't expire.
+		"""
+		if ttl == None:
+			ttl = self.ttl
+			if ttl == None:
+				return None
+		return self.clock() + ttl
+
+	def expire(self):
+		"""expire is to free the slots of the items whose time to live \
+		passed. The timer wheel of the cache hands out the slots which are \
+		due, so the cost doesn't depend on the size of the cache. It is \
+		called by the sets of the cache, so the slots are freed in small \
+		steps, and could be called from a background thread too, see \
+		`start_sweeper`.
+
+		Returns:
+			the number of the expired items which were dropped.
+		"""
+		due = self.wheel.advance(self.clock())
+		if not due:
+			return 0
+		layout = self.layout
+		groups = dict()
+		for deadline, slots in due:
+			for line_num, offset in slots:
+				set_num = line_num & layout.set_mask
+				tag = line_num >> layout.set_bits
+				group = groups.get(set_num)
+				if group == None:
+					groups[set_num] = [(tag, offset, deadline)]
+				else:
+					group.append((tag, offset, deadline))
+		expired = 0
+		for set_num, group in groups.items():
+			expired += expire_slots(layout.sets[set_num], group)
+		if self.writer != None:
+			self.write_sets(groups, layout = layout)
+		return expired
+
+	def start_sweeper(self, interval = 1.0):
+		"""start_sweeper is to start a daemon thread which calls `expire` \
+		every `interval` seconds, so expired items are freed even when no \
+		item is set. An exception of the writer of the cache is reported \
+		with `sys.excepthook`, and the writes are queued again (see \
+		`write_sets`).
+
+		Args:
+			interval(float, optional): `interval` is the seconds between two \
+				sweeps. Default setting is 1.0.
+
+		"""
+		if self.sweeper != None:
+			return
+		stopped = threading.Event()
+
+		def sweep():
+			while not stopped.wait(interval):
+				try:
+					self.expire()
+				except Exception:
+					sys.excepthook(*sys.exc_info())
+
+		thread = threading.Thread(target = sweep, name = 'cache-sweeper')
+		thread.daemon = True
+		self.sweeper = (thread, stopped)
+		thread.start()
+
+	def stop_sweeper(self):
+		"""stop_sweeper is to stop the thread started by `start_sweeper` \
+		and wait for it to exit.
+		"""
+		if self.sweeper == None:
+			return
+		thread, stopped = self.sweeper
+		self.sweeper = None
+		stopped.set()
+		thread.join()
+
+	def write_sets(self, set_nums, flush = False, layout = None):
+		"""write_sets is to hand the queued writes of some sets to the \
+		writer of the cache in one batch. When the writer raises an \
+		exception, the writes are queued again, so the next write or \
+		`flush` retries them.
+
+		Args:
+			set_nums(iterable): `set_nums` is the numbers of the sets.
+
+			flush(bool, optional): when `flush` == True, the dirty items \
+				which are still in the sets are written too. Default \
+				setting is False.
+
+			layout(:obj:`Layout`, optional): `layout` is the layout of the \
+				set numbers. Default setting is None (the current layout).
+
+		Returns:
+			the number of the written items.
+		"""
+		if layout == None:
+			layout = self.layout
+		taken = []
+		for set_num in set_nums:
+			cache_set = layout.sets[set_num]
+			if flush or cache_set.writes:
+				writes = cache_set.take_writes(flush)
+				if writes:
+					taken.append((cache_set, writes))
+		if not taken:
+			return 0
+		try:
+			self.writer([(entry[1], entry[2]) for cache_set, writes in taken for entry in writes])
+		except BaseException:
+			for cache_set, writes in taken:
+				if cache_set.lock != None:
+					cache_set.lock.acquire()
+				cache_set.writes[:0] = writes
+				if cache_set.lock != None:
+					cache_set.lock.release()
+			raise
+		return sum(len(writes) for cache_set, writes in taken)
+
+	def flush(self):
+		"""flush is to write every dirty item of a write-back cache with one \
+		call of the writer, and mark the items clean. They stay in the \
+		cache.
+
+		Returns:
+			the number of the written items.
+		"""
+		if self.writer == None:
+			return 0
+		layout = self.layout
+		if self.lazy:
+			return self.write_sets(list(layout.sets.keys()), True, layout)
+		return self.write_sets(range(layout.total_sets), True, layout)
+
+	def dispatch_removals(self):
+		"""dispatch_removals is to send the queued removals to the listener \
+		of the cache in one batch. It is called by the dispatcher thread, and \
+		could be called to send them at once.
+
+		Returns:
+			the number of the sent notifications.
+		"""
+		if self.listener == None:
+			return 0
+		with self.dispatch_lock:
+			removals = self.removals
+			notifications = []
+			while removals:
+				entry, cause = removals.popleft()
+				notifications.append(RemovalNotification(entry[1], entry[2], cause))
+			if notifications:
+				self.listener(notifications)
+			return len(notifications)
+
+	def start_dispatcher(self, interval = 0.05):
+		"""start_dispatcher is to start the daemon thread which calls \
+		`dispatch_removals` every `interval` seconds. It is started by \
+		`__init__` when the cache has a listener. An exception of the \
+		listener is reported with `sys.excepthook` and its batch is dropped.
+
+		Args:
+			interval(float, optional): `interval` is the seconds between two \
+				batches. Default setting is 0.05.
+
+		"""
+		if self.dispatcher != None or self.listener == None:
+			return
+		stopped = threading.Event()
+
+		def dispatch():
+			while not stopped.wait(interval):
+				try:
+					self.dispatch_removals()
+				except Exception:
+					sys.excepthook(*sys.exc_info())
+
+		thread = threading.Thread(target = dispatch, name = 'cache-dispatcher')
+		thread.daemon = True
+		self.dispatcher = (thread, stopped)
+		thread.start()
+
+	def stop_dispatcher(self):
+		"""stop_dispatcher is to stop the thread started by \
+		`start_dispatcher`, wait for it to exit and send the removals which \
+		are still queued.
+		"""
+		if self.dispatcher == None:
+			return
+		thread, stopped = self.dispatcher
+		self.dispatcher = None
+		stopped.set()
+		thread.join()
+		self.dispatch_removals()
+
+	def fingerprint(self, key, hash_result):
+		"""fingerprint is to get the fingerprint of a key, which is compared \
+		before the key itself when the cache verifies keys. It comes from \
+		the built-in hash, which doesn't collide with `hash`, and when \
+		`hash` is the built-in hash the hash result is reused.
+
+		Args:
+			key(key_type): `key` is the key of the item.
+
+			hash_result(int): `hash_result` is the result of hash the key.
+
+		Returns:
+			an int of the fingerprint.
+		"""
+		if self.hash is hash:
+			return hash_result & FINGERPRINT_MASK
+		return hash(key) & FINGERPRINT_MASK
+
+	def new_admission(self, n_way):
+		"""new_admission is to build the admission filter of a set.
+
+		Args:
+			n_way(int): `n_way` is how many ways/lines in the set.
+
+		Returns:
+			the filter, or None when the cache has no admission filter.
+		"""
+		if self.admission == None:
+			return None
+		return self.admission(n_way)
+
+	def stats(self, reset = False):
+		"""stats is to get a snapshot of the counters of the cache. The \
+		counters are kept per set and summed up here, and the counters of \
+		each set are copied under the lock of the set, so the operations \
+		never contend on a shared counter.
+
+		Args:
+			reset(bool, optional): when `reset` == True, the counters of each \
+				set are set to 0 right after they are copied, so the next \
+				snapshot only counts what happens after this one. Default \
+				setting is False.
+
+		Returns:
+			a dict of the counters summed over all of the sets (see \
+			`CacheStats`), plus `lines` (the number of lines of the cache), \
+			`lines_used` (the number of non-empty lines), `occupancy` (a \
+			list of the number of non-empty lines of each set), `weight` \
+			(the weight of the items when the cache has a `max_weight`), \
+			`victim_lines` (the number of lines in the victim buffer) and \
+			`victim_hits` (the misses of the sets which found their line \
+			in the victim buffer, they count as hits too).
+		"""
+		layout = self.layout
+		totals = dict.fromkeys(STATS_FIELDS, 0)
+		occupancy = [0] * layout.total_sets
+		weight = 0
+		for cache_set in layout.sets:
+			counters, lines_used, set_weight = cache_set.snapshot_stats(reset)
+			for field in STATS_FIELDS:
+				totals[field] += counters[field]
+			occupancy[cache_set.set_num] = lines_used
+			weight += set_weight
+		totals['lines'] = layout.total_sets * layout.n_way
+		totals['lines_used'] = sum(occupancy)
+		#the counter of the empty lines might have lost updates to races
+		layout.line_counter.free = totals['lines'] - totals['lines_used']
+		totals['occupancy'] = occupancy
+		totals['weight'] = weight
+		totals['victim_lines'] = 0
+		totals['victim_hits'] = 0
+		if self.victims != None:
+			totals['victim_lines'], totals['victim_hits'] = self.victims.snapshot_stats(reset)
+		return totals
+
+	def reset_stats(self):
+		"""reset_stats is to set all of the counters of the cache to 0, \
+		see `stats`.
+		"""
+		self.stats(reset = True)
+
+	def save_snapshot(self, path):
+		"""save_snapshot is to write the items of the cache into a snapshot \
+		file, which `load_snapshot` restores after a restart. Each set is \
+		copied under its own lock, so the snapshot of every set is \
+		consistent while the other sets keep serving operations. The file \
+		is written next to `path` and renamed over it when complete.
+
+		The file starts with a header and the (start, length) of the record \
+		of each set. A record keeps the number of lines, the tags and the \
+		valid bits of the lines in the order of the replacement policy, and \
+		a pickle of the (value, remaining ttl, weight, dirty) of the items, so \
+		the items of a write-back cache which weren't written yet are still \
+		dirty after `load_snapshot`.
+
+		Args:
+			path(string): `path` is the path of the snapshot file.
+
+		"""
+		flags = 0
+		if self.verify_keys:
+			flags |= SNAPSHOT_VERIFY_KEYS
+		if self.max_weight != None:
+			flags |= SNAPSHOT_WEIGHTS
+		words = (self.offset_size + 63) >> 6
+		layout = self.layout
+		#sets which were never built in lazy mode keep (0, 0), no record
+		index = array('Q', [0]) * (2 * layout.total_sets)
+		temp_path = path + '.tmp'
+		with open(temp_path, 'wb') as snapshot_file:
+			snapshot_file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 
+				layout.total_sets, layout.n_way, self.offset_size, flags))
+			snapshot_file.write(bytes(16 * layout.total_sets))
+			for cache_set in layout.sets:
+				lock = cache_set.lock
+				if lock != None:
+					lock.acquire()
+				try:
+					lines = cache_set.export_lines()
+					now = self.clock()
+				finally:
+					if lock != None:
+						lock.release()
+				if not lines:
+					continue
+				tags = array('q', [tag for tag, items in lines])
+				valid = array('Q', [0]) * (len(lines) * words)
+				values = []
+				for line, (tag, items) in enumerate(lines):
+					for offset, value, deadline, weight, dirty in items:
+						valid[line * words + (offset >> 6)] |= 1 << (offset & 63)
+						values.append((value, None if deadline == None else deadline - now, weight, dirty))
+				if sys.byteorder == 'big':
+					tags.byteswap()
+					valid.byteswap()
+				record = struct.pack('<I', len(lines)) + tags.tobytes() + valid.tobytes() + pickle.dumps(values, pickle.HIGHEST_PROTOCOL)
+				index[2 * cache_set.set_num] = snapshot_file.tell()
+				index[2 * cache_set.set_num + 1] = len(record)
+				snapshot_file.write(record)
+			if sys.byteorder == 'big':
+				index.byteswap()
+			snapshot_file.seek(SNAPSHOT_HEADER.size)
+			snapshot_file.write(index.tobytes())
+			snapshot_file.flush()
+			os.fsync(snapshot_file.fileno())
+		os.replace(temp_path, path)
+
+	def load_snapshot(self, path):
+		"""load_snapshot is to restore the items of a snapshot file written \
+		by `save_snapshot`, on an empty cache with the same layout (the \
+		sets, ways and offset size, `verify_keys` and `max_weight`). The \
+		file is mapped into memory and a set is only parsed when it is \
+		first used, so the cache serves at once. Items keep what was left \
+		of their time to live.
+
+		Keys are found again by their hash results, so `hash` should give \
+		the same results in every process, e.g. `stable_hash` (the \
+		built-in hash of str is salted per process).
+
+		Args:
+			path(string): `path` is the path of the snapshot file.
+
+		Raises:
+			ValueError: if the cache isn't empty or the snapshot has another \
+				layout.
+		"""
+		for cache_set in self.sets:
+			if cache_set.snapshot_stats()[1]:
+				raise ValueError("The cache is not empty")
+		snapshot = Snapshot(self, path)
+		for set_num in snapshot.set_nums:
+			self.sets[set_num] = PendingSet(snapshot, self.sets[set_num])
+
+	def resize(self, cache_size, n_way = None, step = 1, max_weight = None):
+		"""resize is to change the number of sets of the cache, and \
+		optionally the number of ways, keeping its items. The new sets are \
+		built at once (in lazy mode, only the ones which get lines), but no \
+		line is moved by the call: a new set takes its lines from the old \
+		sets when it is first used, and every operation which follows moves \
+		the lines of `step` more sets, until all of them moved (see \
+		`Rehash`). So no single operation pays for the whole cache. When \
+		the new layout has less room, the lines which don't fit are evicted \
+		as they move.
+
+		The new layout is published with a single assignment (see \
+		`Layout`), so other operations of the cache could run during the \
+		call, an operation which changes the items and ran into it is \
+		repeated on the new layout. Two resizes shouldn't overlap. A resize \
+		which is still moving lines is finished first, and so are the sets \
+		which are not restored from a snapshot yet.
+
+		Args:
+			cache_size(int): `cache_size` is the new cache size, see \
+				`__init__`.
+
+			n_way(int, optional): `n_way` is the new number of ways of a \
+				set. Default setting is None (keep it).
+
+			step(int, optional): `step` is the number of the sets which each \
+				operation moves. Default setting is 1.
+
+			max_weight(int, optional): `max_weight` is the new weight budget \
+				of a cache which has one, see `__init__`. The share of a set \
+				and `max_item_weight` (unless it was given, then it is only \
+				capped at the share) follow it. Default setting is None \
+				(keep it).
+
+		Raises:
+			ValueError: if the layout is invalid, or the share of each set \
+				of `max_weight` would be 0.
+		"""
+		if n_way == None:
+			n_way = self.n_way
+		if max_weight == None:
+			max_weight = self.max_weight
+		elif self.max_weight == None:
+			raise ValueError("Invalid Input Values")
+		if cache_size <= 0 or n_way <= 0 or step <= 0:
+			raise ValueError("Invalid Input Values")
+		total_sets = int(math.floor(cache_size / self.offset_size / n_way))
+		if total_sets <= 0 or self.is_valid_input(cache_size, n_way, total_sets, self.offset_size, self.offset_bits) == False:
+			raise ValueError("Invalid Input Values")
+		if max_weight != None and max_weight // total_sets <= 0:
+			raise ValueError("Invalid Input Values")
+
+		if self.rehash != None:
+			self.rehash.finish()
+		old = self.layout
+		for cache_set in old.sets:
+			if isinstance(cache_set, PendingSet):
+				cache_set.source.restore(cache_set.cache_set)
+		layout = Layout(cache_size, n_way, total_sets, self.offset_bits)
+		if old.storage != None:
+			layout.storage = CompactStorage(total_sets, n_way, self.offset_size)
+		if max_weight != None:
+			layout.set_max_weight = max_weight // total_sets
+			if self.item_weight_limit == None:
+				layout.max_item_weight = layout.set_max_weight
+			else:
+				layout.max_item_weight = min(self.item_weight_limit, layout.set_max_weight)
+		layout.sets = self.build_sets(layout)
+		#no old set is built in lazy mode until the new layout is published, 
+		#so `Rehash` doesn't miss one 
+		build_lock = old.sets.lock if self.lazy else None
+		if build_lock != None:
+			build_lock.acquire()
+		try:
+			rehash = Rehash(self, old.sets, old.set_bits)
+			rehash.start(layout.sets, layout.set_bits)
+			self.rehash_step = step
+			self.layout = layout
+			self.max_weight = max_weight
+		finally:
+			if build_lock != None:
+				build_lock.release()
+		if rehash.waiting:
+			self.rehash = rehash
+
+	def move_sets(self):
+		"""move_sets is to move the lines of the next sets of a resize, see \
+		`resize`. It is called by the operations of the cache.
+		"""
+		rehash = self.rehash
+		if rehash != None:
+			rehash.step(self.rehash_step)
+
+	def get_stripe(self, set_num):
+		"""get_stripe is to get the striped lock which guards a set.
+
+		Args:
+			set_num(int): `set_num` is the number of the set.
+
+		Returns:
+			the lock of the set, or None when lock striping is not used.
+		"""
+		if self.stripes == None:
+			return None
+		return self.stripes[set_num % len(self.stripes)]
+
+	def is_valid_input(self, cache_size, n_way, total_sets, offset_size, b):
+		"""is_valid_input is to check if the values are valid.
+
+		Args:
+			cache_size (int): `cache_size` is the cache size we can use to save \
+				items. if cache size == n, it means we can store at most n items. \
+				cache size should be larger than n_ways * number of sets \
+				* offset size.
+
+			n_way(int): `n_way` is used to specify how many ways/lines in a \
+				cache set. 
+
+			total_sets(int): `total_sets` is how many sets we should have. 
+
+			offset_size(int): `offset_size` is how large the offset should be \
+				according to `b`.
+
+			b(int): `b` is used to calculate offset size. offset size is 2^b.
+ 
+		Returns:
+			True if the inputs are valid, False otherwise.
+
+		"""
+		if cache_size <= 0 or n_way <= 0 or b <= 0:
+			return False
+		if cache_size < (n_way * offset_size * total_sets):
+			return False
+		return True
+
+	def get_set_num(self, hash_result, layout = None):
+
+		"""get_set_num is to get the set number (which set) based on the hash \
+		result.
+
+		Args:
+			hash_result(int): `hash_result` is the result of hash the key of \
+				the item.
+
+			layout(:obj:`Layout`, optional): `layout` is the layout to use. \
+				Default setting is None (the current layout).
+
+		Returns:
+			an int to indicate which set the item should be in.
+		"""
+
+		if layout == None:
+			layout = self.layout
+		return (hash_result >> self.offset_bits) & layout.set_mask
+
+	def get_offset_index(self, hash_result):
+
+		"""get_offset_index is to get the index offset (which slot in offset) \
+		based on the hash result.
+
+		Args:
+			hash_result(int): `hash_result` is the result of hash the key of \
+                        the item.
+
+		Returns:
+			an int to indicate which index in the offset the item should be in.
+		"""
+
+		return hash_result & self.offset_mask
+
+	def get_tag_num(self, hash_result, layout = None):
+
+		"""get_tag_num is to get the tag number based on the hash result.
+
+		Args:
+			hash_result(int): `hash_result` is the result of hash the key of \
+                        the item.
+
+			layout(:obj:`Layout`, optional): `layout` is the layout to use. \
+				Default setting is None (the current layout).
+
+		Returns:
+			an int to indicate the tag of the item.
+		"""
+
+		if layout == None:
+			layout = self.layout
+		return hash_result >> layout.tag_shift
+
+
+	def set_value(self, key, value, ttl = None, dirty = True):
+
+		"""set_value is to put an item(a key and value pair) into the cache.
+
+		Args:
+			key(key_type): `key` is the key of the item.
+
+			value(value_type): `value` is the value of the item
+
+			ttl(float, optional): `ttl` is the time to live of the item in \
+				seconds. Default setting is None (the default time to live of \
+				the cache).
+
+			dirty(bool, optional): when the cache has a `writer`, \
+				`dirty` == False puts an item which is already in the backend \
+				(e.g. just loaded from it), so it isn't written. Default \
+				setting is True.
+
+		Returns:
+			True if successful, False if the item was rejected (by the \
+			admission filter or for its weight).
+		"""
+
+		if not isinstance(key, self.key_type) or not isinstance(value, self.value_type):
+			raise ValueError("Invalid key type or value type")
+		if self.write_through and dirty:
+			self.writer([(key, value)])
+
+		if self.rehash != None:
+			self.move_sets()
+		if self.lock != None:
+			self.lock.acquire() 
+		hash_result = self.hash(key)
+		offset_index = self.get_offset_index(hash_result)
+		weight = None
+		if self.weigher != None:
+			weight = self.weigher(key, value)
+		if self.verify_keys:
+			value = (self.fingerprint(key, hash_result), key, value)
+		deadline = self.deadline(ttl)
+		stale = []
+		while True:
+			layout = self.layout
+			set_num = self.get_set_num(hash_result, layout)
+			tag = self.get_tag_num(hash_result, layout)
+			is_success = layout.sets[set_num].set(value, tag, offset_index, deadline, weight, dirty)
+			if self.layout is layout:
+				break
+			#a resize published a new layout meanwhile, the old set might 
+			#have handed its lines and writes over already 
+			stale.append((layout, set_num))
+		if self.lock != None:
+			self.lock.release()
+		if deadline != None and is_success:
+			self.wheel.schedule(deadline, ((hash_result >> self.offset_bits, offset_index),))
+		if self.writer != None:
+			for old_layout, old_num in stale:
+				self.write_sets((old_num,), layout = old_layout)
+			self.write_sets((set_num,), layout = layout)
+		if self.wheel.size:
+			self.expire()
+		return is_success 
+
+
+	def get_value(self, key, default = None):
+
+
+		"""get_value is to get an item(a key and value pair) from the cache by \
+		a key.
+
+		Args:
+			key(key_type): `key` is the key of the item.
+
+			default(optional): `default` is returned when the item is not in \
+				the cache. Default setting is None.
+
+		Returns:
+			if the value exist, return the value of the key. Otherwise \
+			return `default`.
+		"""
+		if not isinstance(key, self.key_type):
+			raise ValueError("Invalid key type or value type")
+
+
+		if self.rehash != None:
+			self.move_sets()
+		if self.lock != None:
+			self.lock.acquire() 
+		hash_result = self.hash(key)
+		layout = self.layout
+		set_num = self.get_set_num(hash_result, layout)
+		offset_index = self.get_offset_index(hash_result)
+		tag = self.get_tag_num(hash_result, layout)
+		if self.lock != None:
+			self.lock.release() 
+		if self.verify_keys:
+			return layout.sets[set_num].get_value(tag, offset_index, default, (self.fingerprint(key, hash_result), key))
+		return layout.sets[set_num].get_value(tag, offset_index, default)
+
+	def get_or_load(self, key, loader, ttl = None):
+
+		"""get_or_load is to get an item from the cache, or load it with \
+		`loader` and put it into the cache when it is not there. Concurrent \
+		misses of a key are coalesced (single flight): only the first caller \
+		runs `loader`, the others wait for its result, so a hot key which \
+		was evicted is loaded once instead of once per thread.
+
+		Args:
+			key(key_type): `key` is the key of the item, it should be \
+				hashable.
+
+			loader(:func:): `loader` is called as loader(key) to get the \
+				value of a missing item.
+
+			ttl(float, optional): `ttl` is the time to live of a loaded item, \
+				see `set_value`. Default setting is None.
+
+		Returns:
+			the value of the key.
+
+		Raises:
+			the exception raised by `loader`, in the caller which ran it and \
+			in every caller which waited for it. Nothing is put into the \
+			cache then.
+		"""
+
+		value = self.get_value(key, MISSING)
+		if value is not MISSING:
+			return value
+		with self.flights_lock:
+			flight = self.flights.get(key)
+			leader = flight == None
+			if leader:
+				flight = self.flights[key] = Flight()
+		if not leader:
+			return flight.wait()
+
+		try:
+			#another flight of the key might have landed after the lookup
+			value = self.get_value(key, MISSING)
+			if value is MISSING:
+				value = loader(key)
+				self.set_value(key, value, ttl, dirty = False)
+			flight.value = value
+			return value
+		except BaseException as error:
+			flight.error = error
+			raise
+		finally:
+			with self.flights_lock:
+				del self.flights[key]
+			flight.done.set()
+
+	def get_or_load_block(self, key, loader, ttl = None, default = None):
+
+		"""get_or_load_block is to get an item from the cache, or on a miss \
+		load every key of its line with one call of `loader` and fill the \
+		line in one operation of its set (read-ahead). With int keys and a \
+		hash which returns the key itself (e.g. the built-in hash of \
+		small ints, or hash = lambda key: key), a line holds the 2**b \
+		consecutive keys which only differ in the offset bits, so reads of \
+		a range of ids miss once per line instead of once per key. With \
+		other keys or hash functions only `key` is loaded. Concurrent \
+		misses of a line wait for a single load, see `get_or_load`.
+
+		Args:
+			key(key_type): `key` is the key of the item.
+
+			loader(:func:): `loader` is called as loader(keys) with a list \
+				of keys and returns a dict of the items it found. Keys which \
+				are missing from the dict are not put into the cache.
+
+			ttl(float, optional): `ttl` is the time to live of the loaded \
+				items, see `set_value`. Default setting is None.
+
+			default(optional): `default` is returned when `loader` didn't \
+				find the key. Default setting is None.
+
+		Returns:
+			the value of the key, or `default`.
+
+		Raises:
+			the exception raised by `loader`, in every caller which waited \
+			for it. Nothing is put into the cache then.
+		"""
+
+		value = self.get_value(key, MISSING)
+		if value is not MISSING:
+			return value
+		hash_result = self.hash(key)
+		if isinstance(key, int) and hash_result == key:
+			start = key - self.get_offset_index(hash_result)
+			block = (start, start + self.offset_size)
+		else:
+			block = (key,)
+		with self.flights_lock:
+			flight = self.block_flights.get(block)
+			leader = flight == None
+			if leader:
+				flight = self.block_flights[block] = Flight()
+		if not leader:
+			#the flight hands out the items it loaded, which might be for 
+			#other keys of the line, or None when it found its key cached 
+			found = flight.wait()
+			if found == None:
+				return self.get_value(key, default)
+			return found.get(key, default)
+
+		try:
+			#another flight of the line might have landed after the lookup
+			value = self.get_value(key, MISSING)
+			if value is not MISSING:
+				return value
+			keys = list(range(*block)) if len(block) == 2 else [key]
+			found = loader(keys)
+			self.set_many(found, ttl, dirty = False)
+			flight.value = found
+			return found.get(key, default)
+		except BaseException as error:
+			flight.error = error
+			raise
+		finally:
+			with self.flights_lock:
+				del self.block_flights[block]
+			flight.done.set()
+
+	def delete(self, key, value):
+
+		"""delete is to delete the item which has the inputed key and value.
+
+		Args:
+			key(key_type): `key` is the key of the item which is going to \
+				be deleted. 
+
+			value(value_type): `value` is the value of the item which \
+				is going to be deleted.
+
+		Returns:
+			if the value exist and be successfully deleted, return True; 
+			if not successfully deleted, return False; otherwise return None.
+		"""
+
+		if not isinstance(key, self.key_type) or not isinstance(value, self.value_type):
+			raise ValueError("Invalid key type or value type")
+
+		if self.rehash != None:
+			self.move_sets()
+		if self.lock != None:
+			self.lock.acquire() 
+		hash_result = self.hash(key)
+		offset_index = self.get_offset_index(hash_result)
+		if self.lock != None:
+			self.lock.release() 
+		if self.verify_keys:
+			#the slot only equals an entry with the same key
+			value = (self.fingerprint(key, hash_result), key, value)
+		result = None
+		while True:
+			layout = self.layout
+			set_num = self.get_set_num(hash_result, layout)
+			tag = self.get_tag_num(hash_result, layout)
+			deleted = layout.sets[set_num].delete_value(tag, offset_index, value)
+			if result != True:
+				result = deleted
+			if self.writer != None:
+				self.write_sets((set_num,), layout = layout)
+			if self.layout is layout:
+				return result
+			#a resize published a new layout meanwhile, the item might have 
+			#moved to the new set before it was deleted 
+
+	def split_hashes(self, hash_results, layout = None):
+
+		"""split_hashes is to get the set numbers, offset indexes and tags of \
+		a batch of hash results, see `get_set_num`, `get_offset_index` and \
+		`get_tag_num`. When numpy is installed and `hash_results` is a numpy \
+		array, they are computed on the whole array at once.
+
+		Args:
+			hash_results(list or numpy.ndarray): `hash_results` is the results \
+				of hash the keys of the items.
+
+			layout(:obj:`Layout`, optional): `layout` is the layout to use. \
+				Default setting is None (the current layout).
+
+		Returns:
+			a tuple (set_nums, offsets, tags), numpy arrays if `hash_results` \
+			is a numpy array, lists otherwise.
+		"""
+
+		if layout == None:
+			layout = self.layout
+		offset_bits = self.offset_bits
+		offset_mask = self.offset_mask
+		set_mask = layout.set_mask
+		tag_shift = layout.tag_shift
+		if numpy != None and isinstance(hash_results, numpy.ndarray):
+			hash_results = hash_results.astype(numpy.int64, copy = False)
+			return ((hash_results >> offset_bits) & set_mask, 
+				hash_results & offset_mask, hash_results >> tag_shift)
+		return ([(hash_result >> offset_bits) & set_mask for hash_result in hash_results], 
+			[hash_result & offset_mask for hash_result in hash_results], 
+			[hash_result >> tag_shift for hash_result in hash_results])
+
+	def group_hashes(self, hash_results, layout = None):
+
+		"""group_hashes is to group a batch of hash results by the set they \
+		belong to.
+
+		Args:
+			hash_results(list or numpy.ndarray): `hash_results` is the results \
+				of hash the keys of the items.
+
+			layout(:obj:`Layout`, optional): `layout` is the layout to use. \
+				Default setting is None (the current layout).
+
+		Returns:
+			a tuple (tags, offsets, groups). `tags` and `offsets` are lists of \
+			the tags and offset indexes of `hash_results`. `groups` is a dict \
+			which maps a set number to the positions in `hash_results` of the \
+			hash results in that set.
+		"""
+
+		set_nums, offsets, tags = self.split_hashes(hash_results, layout)
+		groups = dict()
+		if numpy != None and isinstance(set_nums, numpy.ndarray):
+			if len(set_nums) == 0:
+				return [], [], groups
+			order = numpy.argsort(set_nums, kind = 'stable')
+			sorted_set_nums = set_nums[order]
+			starts = numpy.flatnonzero(sorted_set_nums[1:] != sorted_set_nums[:-1]) + 1
+			for set_num, positions in zip(sorted_set_nums[numpy.r_[0, starts]].tolist(), 
+					numpy.split(order, starts)):
+				groups[set_num] = positions.tolist()
+			return tags.tolist(), offsets.tolist(), groups
+		for position, set_num in enumerate(set_nums):
+			group = groups.get(set_num)
+			if group == None:
+				groups[set_num] = [position]
+			else:
+				group.append(position)
+		return tags, offsets, groups
+
+	def key_checks(self, keys, hash_results):
+
+		"""key_checks is to get the (fingerprint, key) of a batch of keys, \
+		see `check_entry`.
+
+		Args:
+			keys(list): `keys` is a list of keys.
+
+			hash_results(list): `hash_results` is the results of hash `keys`.
+
+		Returns:
+			a list of (fingerprint, key) tuples.
+		"""
+
+		return [(self.fingerprint(key, hash_result), key) for key, hash_result in zip(keys, hash_results)]
+
+	def lookup_groups(self, tags, offsets, groups, count, checks = None, layout = None):
+
+		"""lookup_groups is to look up grouped items set by set, see \
+		`group_hashes`.
+
+		Args:
+			tags(list): `tags` is the tags of the items.
+
+			offsets(list): `offsets` is the offset indexes of the items.
+
+			groups(dict): `groups` maps a set number to the positions of the \
+				items in that set.
+
+			count(int): `count` is the number of the items.
+
+			checks(list, optional): `checks` is the (fingerprint, key) of \
+				the items when the cache verifies keys, see `key_checks`. \
+				Default setting is None.
+
+			layout(:obj:`Layout`, optional): `layout` is the layout which \
+				grouped the items. Default setting is None (the current \
+				layout).
+
+		Returns:
+			a list of the values of the items, `MISSING` for the items not in \
+			the cache.
+		"""
+
+		if layout == None:
+			layout = self.layout
+		sets = layout.sets
+		values = [MISSING] * count
+		for set_num, positions in groups.items():
+			if len(positions) == 1:
+				#a set with a single key doesn't gain from a batch
+				position = positions[0]
+				values[position] = sets[set_num].get_value(tags[position], offsets[position], MISSING, 
+					checks[position] if checks != None else None)
+				continue
+			results = sets[set_num].get_many([tags[position] for position in positions], 
+				[offsets[position] for position in positions], MISSING, 
+				[checks[position] for position in positions] if checks != None else None)
+			for position, value in zip(positions, results):
+				values[position] = value
+		return values
+
+	def store_groups(self, values, tags, offsets, groups, deadline = None, weights = None, dirty = True, layout = None):
+
+		"""store_groups is to put grouped items into the cache set by set, \
+		see `group_hashes`.
+
+		Args:
+			values(list): `values` is the values of the items.
+
+			tags(list): `tags` is the tags of the items.
+
+			offsets(list): `offsets` is the offset indexes of the items.
+
+			groups(dict): `groups` maps a set number to the positions of the \
+				items in that set.
+
+			deadline(float, optional): `deadline` is the time when the items \
+				expire. Default setting is None (they don't expire).
+
+			weights(list, optional): `weights` is the weights of the items. \
+				Default setting is None.
+
+			dirty(bool, optional): `dirty` is whether the items should be \
+				written back, see `set_value`. Default setting is True.
+
+			layout(:obj:`Layout`, optional): `layout` is the layout which \
+				grouped the items. Default setting is None (the current \
+				layout).
+		"""
+
+		if layout == None:
+			layout = self.layout
+		sets = layout.sets
+		for set_num, positions in groups.items():
+			if len(positions) == 1:
+				position = positions[0]
+				sets[set_num].set(values[position], tags[position], offsets[position], deadline, 
+					weights[position] if weights != None else None, dirty)
+			else:
+				sets[set_num].set_many([values[position] for position in positions], 
+					[tags[position] for position in positions], 
+					[offsets[position] for position in positions], deadline, 
+					[weights[position] for position in positions] if weights != None else None, dirty)
+		if deadline != None:
+			self.wheel.schedule(deadline, [((tags[position] << layout.set_bits) | set_num, offsets[position]) 
+				for set_num, positions in groups.items() for position in positions])
+
+	def get_many(self, keys, ordered = False):
+
+		"""get_many is to get a batch of items from the cache. The keys are \
+		hashed once and grouped by set, and the lock of each set is taken \
+		once for all of the keys in it.
+
+		Args:
+			keys(iterable): `keys` is the keys of the items.
+
+			ordered(bool, optional): when `ordered` == True, return a list of \
+				values in the order of `keys`, None for the keys not in the \
+				cache. Otherwise return a dict. Default setting is False.
+
+		Returns:
+			a dict which maps the keys in the cache to their values, or a list \
+			of values if `ordered` == True.
+		"""
+
+		keys = list(keys)
+		key_type = self.key_type
+		for key in keys:
+			if not isinstance(key, key_type):
+				raise ValueError("Invalid key type or value type")
+
+		if self.rehash != None:
+			self.move_sets()
+		if self.lock != None:
+			self.lock.acquire() 
+		try:
+			hash_results = list(map(self.hash, keys))
+			layout = self.layout
+			tags, offsets, groups = self.group_hashes(hash_results, layout)
+		finally:
+			if self.lock != None:
+				self.lock.release() 
 
-				return True #success to set the value 
-			if candiate_linenum == None and self.lines[i].get_tag() == None:
-				#found an empty line which could be a candiate to put the 
-				#value, if we don't find anyone matches the tag
-				candiate_linenum = i
+		checks = None
+		if self.verify_keys:
+			checks = self.key_checks(keys, hash_results)
+		values = self.lookup_groups(tags, offsets, groups, len(keys), checks, layout)
+		if ordered:
+			return [None if value is MISSING else value for value in values]
+		return {key: value for key, value in zip(keys, values) if value is not MISSING}
 
-		#there is no same tag 
-		if candiate_linenum == None:
-			#if we found there isn't an empty line, choose a victim cache 
-			#line to evict.
-			victim_value = self.replacement.victim() 
+	def set_many(self, items, ttl = None, dirty = True):
 
-			if victim_value == None: 
-				#we can't find an empty line and also no any line could be the
-				#victim
-				#based on our replacement policy 
-				raise ValueError("Ran out of space")
+		"""set_many is to put a batch of items into the cache. The keys are \
+		hashed once and grouped by set, and the lock of each set is taken \
+		once for all of the items in it.
 
-			_ , candiate_linenum = victim_value
+		Args:
+			items(dict or iterable): `items` is a dict or an iterable of \
+				(key, value) pairs. When a key shows up more than once, the \
+				last value is kept.
 
-			self.lines[candiate_linenum].clearline()
+			ttl(float, optional): `ttl` is the time to live of the items in \
+				seconds. Default setting is None (the default time to live of \
+				the cache).
 
-		#put the value into the candidate cache line (an empty or victim line)
-		self.lines[candiate_linenum].set_tag(tag)
-		self.lines[candiate_linenum].set(offset, value)
-		#update replacement policy
-		self.replacement.insert(tag, candiate_linenum)
+			dirty(bool, optional): see `set_value`. Default setting is True.
 
-		logging.debug("CacheSet set release a lock") 
+		Returns:
+			True if successful.
+		"""
 
+		if isinstance(items, dict):
+			items = items.items()
+		items = list(items)
+		for key, value in items:
+			if not isinstance(key, self.key_type) or not isinstance(value, self.value_type):
+				raise ValueError("Invalid key type or value type")
+		if self.write_through and dirty:
+			self.writer(items)
+
+		if self.rehash != None:
+			self.move_sets()
 		if self.lock != None:
-			self.lock.release() 
+			self.lock.acquire() 
+		stale = []
+		try:
+			keys = [key for key, _ in items]
+			hash_results = list(map(self.hash, keys))
+			values = [value for _, value in items]
+			weights = None
+			if self.weigher != None:
+				weights = [self.weigher(key, value) for key, value in items]
+			if self.verify_keys:
+				values = [check + (value,) for check, value in zip(self.key_checks(keys, hash_results), values)]
+			deadline = self.deadline(ttl)
+			while True:
+				layout = self.layout
+				tags, offsets, groups = self.group_hashes(hash_results, layout)
+				self.store_groups(values, tags, offsets, groups, deadline, weights, dirty, layout)
+				if self.layout is layout:
+					break
+				#a resize published a new layout meanwhile, see `set_value`
+				stale.append((layout, groups))
+		finally:
+			if self.lock != None:
+				self.lock.release() 
+		if self.writer != None:
+			for old_layout, old_groups in stale:
+				self.write_sets(old_groups, layout = old_layout)
+			self.write_sets(groups, layout = layout)
+		if self.wheel.size:
+			self.expire()
 		return True
 
-	def get_value(self, tag, offset):
+	def get_many_hashed(self, hash_results, default = None):
 
-		"""get_value is a function to get an item(a key and value pair) from \
-		the cache by a key(trasferred to tag and offset).
+		"""get_many_hashed is to get a batch of items from the cache by the \
+		hash results of their keys, see `get_many`. With a numpy array of \
+		hash results the set numbers, offset indexes and tags are computed \
+		at array speed. For int keys under the built-in hash, the hash of a \
+		key 0 <= key < 2**61 - 1 is the key itself, so an array of such keys \
+		could be passed as is.
 
 		Args:
-			tag(int): `tag` is the tag of the hashed item key.
+			hash_results(list or numpy.ndarray): `hash_results` is the results \
+				of hash the keys of the items.
 
-			offset(int): `offset` is the offset of the hashed item (in a cache \
-				 line).
+			default(optional): `default` is used for the items not in the \
+				cache. Default setting is None.
 
 		Returns:
-			if the value exist, return the value of the key. Otherwise \
-			return None.
+			a list of values in the order of `hash_results`.
 		"""
 
-		logging.debug("CacheSet get_value acquire a lock") 
+		if self.verify_keys:
+			raise ValueError("The keys can't be verified without the keys")
+		if self.rehash != None:
+			self.move_sets()
 		if self.lock != None:
 			self.lock.acquire() 
-		for i in range(self.n_way):
-			if self.lines[i].match_tag(tag):
-				self.replacement.insert(tag, i) 
-				#if there isn't that offset, it still counts as one access.
-				logging.debug("CacheSet get_value release a lock") 
-				if self.lock != None:
-					self.lock.release() 
-				return self.lines[i].get(offset)
-		logging.debug("CacheSet get_value release a lock") 
-		if self.lock != None:
-			self.lock.release() 
+		try:
+			layout = self.layout
+			tags, offsets, groups = self.group_hashes(hash_results, layout)
+		finally:
+			if self.lock != None:
+				self.lock.release() 
 
+		values = self.lookup_groups(tags, offsets, groups, len(tags), None, layout)
+		return [default if value is MISSING else value for value in values]
 
-	def get_line(self, tag):
+	def set_many_hashed(self, hash_results, values, ttl = None):
 
-		"""get_line is a function to get a cache line which has the same tag. \
-			By design, each tag is unique in one cache set 
+		"""set_many_hashed is to put a batch of items into the cache by the \
+		hash results of their keys, see `set_many` and `get_many_hashed`.
 
 		Args:
-			tag(int): `tag` is the tag of the targeted cache line.
+			hash_results(list or numpy.ndarray): `hash_results` is the results \
+				of hash the keys of the items.
+
+			values(list or numpy.ndarray): `values` is the values of the items, \
+				in the order of `hash_results`.
+
+			ttl(float, optional): `ttl` is the time to live of the items in \
+				seconds. Default setting is None (the default time to live of \
+				the cache).
 
 		Returns:
-			if the line exist, return the line. Otherwise return None.
+			True if successful.
 		"""
 
-		logging.debug("CacheSet get_line acquire a lock") 
+		if self.verify_keys:
+			raise ValueError("The keys can't be verified without the keys")
+		if self.weigher != None:
+			raise ValueError("The items can't be weighed without the keys")
+		if numpy != None and isinstance(values, numpy.ndarray):
+			values = values.tolist()
+		values = list(values)
+		if len(values) != len(hash_results):
+			raise ValueError("hash_results and values should have the same length")
+		for value in values:
+			if not isinstance(value, self.value_type):
+				raise ValueError("Invalid key type or value type")
+
+		if self.rehash != None:
+			self.move_sets()
 		if self.lock != None:
 			self.lock.acquire() 
-		for i in range(self.n_way):
-			if self.lines[i].match_tag(tag):
-				logging.debug("CacheSet get_line release a lock") 
-				if self.lock != None:
-					self.lock.release() 
-				return self.lines[i]
-
-		logging.debug("CacheSet get_line release a lock")
-		if self.lock != None:
-			self.lock.release() 
-
+		try:
+			deadline = self.deadline(ttl)
+			while True:
+				layout = self.layout
+				tags, offsets, groups = self.group_hashes(hash_results, layout)
+				self.store_groups(values, tags, offsets, groups, deadline, layout = layout)
+				if self.layout is layout:
+					break
+		finally:
+			if self.lock != None:
+				self.lock.release() 
+		if self.wheel.size:
+			self.expire()
+		return True
 
-	def delete_value(self, tag, offset, value):
+	def delete_many(self, items):
 
-		"""delete_value is a function to delete the item in a cahce line which \
-		has the inputed key(trasferred to tag and offset) and value.
+		"""delete_many is to delete a batch of items from the cache. The keys \
+		are hashed once and grouped by set, and the lock of each set is \
+		taken once for all of the items in it.
 
 		Args:
-			tag(int): `tag` is the tag of the hashed item key.
-
-			offset(int): `offset` is the offset of the hashed item \
-				(in a cache line).
-
-			value(value_type): `value` is the value of the item which is going to \
-				be deleted.
+			items(dict or iterable): `items` is a dict or an iterable of \
+				(key, value) pairs of the items which are going to be deleted.
 
 		Returns:
-			if the value exist and be successfully deleted, return True; 
-			if not successfully deleted, return False; otherwise return None.
+			a list of the results of `delete` for each item, in the order of \
+			`items`.
 		"""
 
+		if isinstance(items, dict):
+			items = items.items()
+		items = list(items)
+		for key, value in items:
+			if not isinstance(key, self.key_type) or not isinstance(value, self.value_type):
+				raise ValueError("Invalid key type or value type")
 
-		logging.debug("CacheSet delete_value acquire a lock")
+		if self.rehash != None:
+			self.move_sets()
 		if self.lock != None:
 			self.lock.acquire() 
-		found_delete = None 
+		try:
+			keys = [key for key, _ in items]
+			hash_results = list(map(self.hash, keys))
+		finally:
+			if self.lock != None:
+				self.lock.release() 
 
-		for i in range(self.n_way):
-			if self.lines[i].match_tag(tag):
-				#get the targeted line
-				found_delete = self.lines[i]
-				break
+		values = [value for _, value in items]
+		if self.verify_keys:
+			values = [check + (value,) for check, value in zip(self.key_checks(keys, hash_results), values)]
+		results = [None] * len(items)
+		while True:
+			layout = self.layout
+			tags, offsets, groups = self.group_hashes(hash_results, layout)
+			for set_num, positions in groups.items():
+				if len(positions) == 1:
+					position = positions[0]
+					set_results = (layout.sets[set_num].delete_value(tags[position], offsets[position], values[position]),)
+				else:
+					set_results = layout.sets[set_num].delete_many([tags[position] for position in positions], 
+						[offsets[position] for position in positions], 
+						[values[position] for position in positions])
+				for position, result in zip(positions, set_results):
+					if results[position] != True:
+						results[position] = result
+			if self.writer != None:
+				self.write_sets(groups, layout = layout)
+			if self.layout is layout:
+				return results
+			#a resize published a new layout meanwhile, see `delete`
+
+
+class AsyncCache(object):
+	'''AsyncCache class is an asyncio front-end of a `Cache`. Its \
+	operations are coroutines, and concurrent misses of a key in \
+	`get_or_load` are coalesced on an asyncio future, so an async loader \
+	runs once per key at a time.
+
+	By default the cache is built with thread_safe_mode = False. All of its \
+	operations then run on the thread of the event loop, one at a time, so \
+	they need no lock at all and never block the loop. A thread safe cache \
+	(e.g. one shared with other threads) is driven through an executor \
+	instead, so waiting for a lock of a set blocks a worker thread and \
+	not the loop.'''
+
+	def __init__(self, cache_size, n_way, b, key_type, value_type, executor = None, **kwargs):
+		"""The __init__ method of an AsyncCache is used to initialize the \
+		cache and its front-end.
 
-		if found_delete != None: 
-		#found the cache line which contains the item we want to delete
-			delete_result = found_delete.delete(offset, value)
-			if delete_result != False:
-				self.replacement.delete(tag, delete_result) 
-				#delete or update the line in replacement policy object 
-				#if needed
-				#delete also counts as an access, so if the line doesn't 
-				#become empty, we update the order; if the line is empty 
-				#then delete the whole line from replacement policy 
-				logging.debug("CacheSet delete_value release a lock")
-				if self.lock != None:
-					self.lock.release() 
+		Args:
+			cache_size, n_way, b, key_type, value_type: see `Cache`.
 
-				return True
-			else:
-				logging.debug("CacheSet delete_value release a lock")
-				#fails to delete 
-				if self.lock != None:
-					self.lock.release()
+			executor(:obj:`concurrent.futures.Executor`, optional): \
+				`executor` runs the operations of a thread safe cache. \
+				Default setting is None (the default executor of the loop).
 
+			kwargs: the optional arguments of `Cache`. `thread_safe_mode` \
+				is False unless it is given.
 
-				return False
+		"""
+		super(AsyncCache, self).__init__()
+		kwargs.setdefault('thread_safe_mode', False)
+		self.cache = Cache(cache_size, n_way, b, key_type, value_type, **kwargs)
+		self.threaded = kwargs['thread_safe_mode']
+		self.executor = executor
+		#flights maps the keys being loaded by `get_or_load` to the future 
+		#of their value. Only the loop touches it, so it needs no lock. 
+		self.flights = dict()
+
+	async def call(self, method, *args):
+		"""call is to run an operation of the cache, on the loop when the \
+		cache has no locks and on the executor otherwise.
 
-		logging.debug("CacheSet delete_value release a lock")
-		if self.lock != None:
-			self.lock.release() 
-		return None
+		Args:
+			method(:func:): `method` is the method of `Cache` to run.
 
+			args: the arguments of `method`.
 
-class Cache(object):
-	'''Cache class serves as a cache to store cache sets, each cache 
-	set will have cache lines to store items (a key & value pair).'''
+		Returns:
+			the result of `method`.
+		"""
+		if not self.threaded:
+			return method(*args)
+		loop = asyncio.get_running_loop()
+		return await loop.run_in_executor(self.executor, functools.partial(method, *args))
 
+	async def get(self, key, default = None):
+		"""get is to get an item from the cache, see `Cache.get_value`.
+		"""
+		return await self.call(self.cache.get_value, key, default)
 
-	def __init__(self, cache_size, n_way, b, key_type, value_type, replacement = None, hash = hash, thread_safe_mode = True):
-		"""The __init__ method of a cache is used to initialize a cache.
+	async def set(self, key, value, ttl = None, dirty = True):
+		"""set is to put an item into the cache, see `Cache.set_value`.
+		"""
+		return await self.call(self.cache.set_value, key, value, ttl, dirty)
 
-		Args:
-			cache_size (int): `cache_size` is the cache size we can use to save \
-				items. if cache size == n, it means we can store at most n items. \
-				cache size should be larger than n_ways * number of sets * \
-				* offset size.
+	async def delete(self, key, value):
+		"""delete is to delete an item from the cache, see `Cache.delete`.
+		"""
+		return await self.call(self.cache.delete, key, value)
 
-			n_way(int): `n_way` is used to specify how many ways/lines in a \
-				cache set. 
+	async def get_many(self, keys, ordered = False):
+		"""get_many is to get a batch of items, see `Cache.get_many`.
+		"""
+		return await self.call(self.cache.get_many, list(keys), ordered)
 
-			b(int): `b` is used to calculate offset size. offset size is 2^b.
+	async def set_many(self, items, ttl = None):
+		"""set_many is to put a batch of items, see `Cache.set_many`.
+		"""
+		return await self.call(self.cache.set_many, items, ttl)
 
-			key_type(key_type): `key_type` is used to specifiy the key type of \
-				the item.
+	async def delete_many(self, items):
+		"""delete_many is to delete a batch of items, see \
+		`Cache.delete_many`.
+		"""
+		return await self.call(self.cache.delete_many, items)
 
-			value_type(value_type): `value_type` is used to specifiy the key type \
-				of the item. 
+	async def get_or_load(self, key, loader, ttl = None):
+		"""get_or_load is to get an item from the cache, or load it with the \
+		coroutine function `loader` and put it into the cache on a miss, \
+		see `Cache.get_or_load`. Only the first coroutine which misses a key \
+		awaits `loader`, the others await the future of its result. When \
+		the loading coroutine is cancelled, one of the waiting ones loads \
+		the item instead.
 
-			replacement(:obj:`ReplacementPolicy`, optional): `replacement` is to \
-				set the cache replacement policy. User could either to pass a \
-				subclass of `ReplacementPolicy` or pass a string to specify \
-				the `LRU` or `MRU` policy. Default setting is `LRU`.
+		Args:
+			key(key_type): `key` is the key of the item, it should be \
+				hashable.
 
-			hash(:func:, optional): `hash` is to provide the hash function that \
-				used to hash keys of the items. Default setting is to use \
-				python's built-in hash function. 
+			loader(:func:): `loader` is a coroutine function, awaited as \
+				await loader(key) to get the value of a missing item.
 
-			thread_safe_mode(bool, optional): when `thread_safe_mode` == True, \
-				means the class is thread safe, One thing must be noted is that \
-				thread safe mode will have worse performance regrading of time \
-				since lock is costly. Default setting is True (enable thread safe \
-				mode).
+			ttl(float, optional): `ttl` is the time to live of a loaded item. \
+				Default setting is None.
 
+		Returns:
+			the value of the key.
 
+		Raises:
+			the exception raised by `loader`, in every coroutine which \
+			awaited it. Nothing is put into the cache then.
 		"""
-
-		super(Cache, self).__init__()
+		value = await self.get(key, MISSING)
+		if value is not MISSING:
+			return value
+		while key in self.flights:
+			future = self.flights[key]
+			try:
+				#shield the load from the cancellation of a waiter
+				return await asyncio.shield(future)
+			except asyncio.CancelledError:
+				if not future.cancelled():
+					raise
+				#the loading coroutine was cancelled, take over
+
+		future = asyncio.get_running_loop().create_future()
+		self.flights[key] = future
+		try:
+			#another flight of the key might have landed meanwhile
+			value = await self.get(key, MISSING)
+			if value is MISSING:
+				value = await loader(key)
+				await self.set(key, value, ttl, False)
+			future.set_result(value)
+			return value
+		except asyncio.CancelledError:
+			future.cancel()
+			raise
+		except BaseException as error:
+			future.set_exception(error)
+			#the waiters get the exception, it is not an unretrieved one
+			future.exception()
+			raise
+		finally:
+			del self.flights[key]
+
+	def stats(self, reset = False):
+		"""stats is to get a snapshot of the counters of the cache, see \
+		`Cache.stats`.
+		"""
+		return self.cache.stats(reset)
 
 
-		if thread_safe_mode:
-			self.lock = threading.Lock()
-		else:
-			self.lock = None
+def stable_hash(key):
+	"""stable_hash is a hash function which gives the same result for equal \
+	keys in every process. The built-in hash of str and bytes is salted per \
+	process, so processes which share a cache can't use it.
 
-		if replacement == None or replacement == 'LRU':
-			self.replacement = 'LRU'
-		elif replacement == 'MRU':
-			self.replacement = 'MRU'
-		elif isinstance(replacement, ReplacementPolicy):
-			self.replacement = replacement
-		else:
-			raise ValueError("Invalid Input Values")
+	Args:
+		key: `key` is the key to hash, it should be picklable.
 
-		self.cache_size = cache_size
-		self.n_way = n_way
+	Returns:
+		a non-negative int of 63 bits.
+	"""
+	digest = hashlib.blake2b(pickle.dumps(key, protocol = 4), digest_size = 8).digest()
+	return int.from_bytes(digest, 'little') >> 1
 
-		self.key_type = key_type
-		self.value_type = value_type 
 
-		self.offset_size = 2**b
-		self.offset_bits = b 
-		self.total_sets = int(math.floor(cache_size / (2**b) / n_way))
-		self.set_bits =  int(math.log(self.total_sets, 2))
+class SharedMemoryCache(object):
+	'''SharedMemoryCache class is an N-way Set-associative cache which keeps \
+	all of its state in a `multiprocessing.shared_memory` segment, so \
+	several processes on a host (e.g. the workers of a server) could attach \
+	to one cache by its name and share its items.
 
-		#check values
-		if self.is_valid_input(cache_size, n_way, self.total_sets, self.offset_size, b) == False:
-			raise ValueError("Invalid Input Values")
+	The segment holds a header, the columns of the line metadata (tags, \
+	item counts and valid bits like `CompactStorage`, plus `LRU`/`MRU` \
+	stamps) and a slot of `value_size` bytes for each item, which keeps the pickled \
+	(key, value). The keys are compared on a lookup, so items whose hash \
+	results collide are never mixed up. Each set is guarded by a lock of \
+	the process (between threads) and a POSIX record lock on a byte of a \
+	lock file (between processes), which the system releases if a process \
+	dies. Only one SharedMemoryCache of a name should be open per process.
 
-		#initalize cache sets
-		self.sets = [CacheSet(n_way, self.offset_size, replacement = self.replacement, thread_safe_mode = thread_safe_mode) for i in range(self.total_sets)]
-		self.replacement = replacement
-		self.hash = hash
+	The segment outlives the processes, `unlink` removes it.'''
 
+	#magic number and version of the layout of the segment ("NWCACHE1")
+	MAGIC = 0x4E57434143484531
+	HEADER_FIELDS = 8
 
-	def is_valid_input(self, cache_size, n_way, total_sets, offset_size, b):
-		"""is_valid_input is to check if the values are valid.
+	def __init__(self, name, cache_size, n_way, b, key_type, value_type, value_size = 1024, replacement = 'LRU', hash = stable_hash, lock_path = None):
+		"""The __init__ method of a SharedMemoryCache is used to create the \
+		segment of a cache, or to attach to it if another process created \
+		it already.
 
 		Args:
-			cache_size (int): `cache_size` is the cache size we can use to save \
-				items. if cache size == n, it means we can store at most n items. \
-				cache size should be larger than n_ways * number of sets \
-				* offset size.
+			name(string): `name` is the name of the shared memory segment.
 
-			n_way(int): `n_way` is used to specify how many ways/lines in a \
-				cache set. 
+			cache_size, n_way, b, key_type, value_type: see `Cache`. A \
+				process attaching to an existing cache should pass the same \
+				values.
 
-			total_sets(int): `total_sets` is how many sets we should have. 
+			value_size(int, optional): `value_size` is the number of bytes of \
+				the slot of an item. Items whose pickled (key, value) is \
+				larger are not cached. Default setting is 1024.
 
-			offset_size(int): `offset_size` is how large the offset should be \
-				according to `b`.
+			replacement(string, optional): `replacement` is `LRU` or `MRU`. \
+				Default setting is `LRU`.
 
-			b(int): `b` is used to calculate offset size. offset size is 2^b.
- 
-		Returns:
-			True if the inputs are valid, False otherwise.
+			hash(:func:, optional): `hash` is the hash function of the keys, \
+				which must give equal results in all of the processes. \
+				Default setting is `stable_hash`.
 
-		"""
-		if cache_size <= 0 or n_way <= 0 or b <= 0:
-			return False
-		if cache_size < (n_way * offset_size * total_sets):
-			return False
-		return True
+			lock_path(string, optional): `lock_path` is the path of the lock \
+				file. Default setting is None (`name`.lock in the temporary \
+				directory).
 
-	def get_set_num(self, hash_result):
+		"""
+		super(SharedMemoryCache, self).__init__()
+		if shared_memory == None:
+			raise RuntimeError("Shared memory segments or record locks are not supported")
+		if replacement != 'LRU' and replacement != 'MRU':
+			raise ValueError("Invalid Input Values")
+		offset_size = 2**b
+		total_sets = int(math.floor(cache_size / offset_size / n_way))
+		if cache_size <= 0 or n_way <= 0 or b <= 0 or value_size <= 0 or total_sets <= 0:
+			raise ValueError("Invalid Input Values")
+		set_bits = int(math.log(total_sets, 2))
+		total_sets = 2**set_bits
 
-		"""get_set_num is to get the set number (which set) based on the hash \
-		result.
+		self.name = name
+		self.n_way = n_way
+		self.offset_size = offset_size
+		self.total_sets = total_sets
+		self.key_type = key_type
+		self.value_type = value_type
+		self.value_size = value_size
+		self.mru = replacement == 'MRU'
+		self.hash = hash
+		self.offset_bits = b
+		self.offset_mask = offset_size - 1
+		self.set_mask = total_sets - 1
+		self.tag_shift = set_bits + b
+		self.words = (offset_size + 63) >> 6
+		#each slot keeps the length of the pickled item and the item
+		self.stride = 4 + value_size
+
+		self.lock_path = lock_path or os.path.join(tempfile.gettempdir(), name + '.lock')
+		self.lock_file = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+		#in process locks, the record locks don't exclude threads
+		self.locks = [threading.Lock() for i in range(min(total_sets, 64))]
+
+		total_lines = total_sets * n_way
+		sizes = [self.HEADER_FIELDS * 8, total_lines * 8, total_lines * 8, 
+			total_lines * self.words * 8, total_lines * 8, total_sets * 8, 
+			total_lines * offset_size * self.stride]
+		#byte 0 of the lock file guards the creation of the segment
+		fcntl.lockf(self.lock_file, fcntl.LOCK_EX, 1, 0)
+		try:
+			try:
+				self.shm = shared_memory.SharedMemory(name = name, create = True, size = sum(sizes))
+				created = True
+			except FileExistsError:
+				self.shm = shared_memory.SharedMemory(name = name)
+				created = False
+			#the segment is removed by `unlink`, not when a process exits
+			resource_tracker.unregister(self.shm._name, 'shared_memory')
+			views = []
+			start = 0
+			for size, code in zip(sizes, ['q', 'q', 'Q', 'Q', 'Q', 'Q', 'B']):
+				views.append(self.shm.buf[start:start + size].cast(code))
+				start += size
+			self.header, self.tags, self.counts, self.valid, self.stamps, self.clocks, self.slots = views
+			layout = [self.MAGIC, total_sets, n_way, offset_size, value_size, 
+				self.stride, self.words, sum(sizes)]
+			if created:
+				self.header[:] = array('q', layout)
+			matched = self.header.tolist() == layout
+		finally:
+			fcntl.lockf(self.lock_file, fcntl.LOCK_UN, 1, 0)
+		if not matched:
+			self.close()
+			raise ValueError("The shared memory cache has another layout")
+
+	def acquire(self, set_num):
+		"""acquire is to take the locks of a set.
 
 		Args:
-			hash_result(int): `hash_result` is the result of hash the key of \
-				the item.
+			set_num(int): `set_num` is the number of the set.
 
-		Returns:
-			an int to indicate which set the item should be in.
 		"""
+		self.locks[set_num % len(self.locks)].acquire()
+		fcntl.lockf(self.lock_file, fcntl.LOCK_EX, 1, set_num + 1)
 
-		mask_out = -1 << self.offset_bits   
-		mask_in = -1 << (self.set_bits + self.offset_bits) 
-		return ((mask_out ^ mask_in) & hash_result) >> self.offset_bits
+	def release(self, set_num):
+		"""release is to release the locks of a set.
 
-	def get_offset_index(self, hash_result):
+		Args:
+			set_num(int): `set_num` is the number of the set.
 
-		"""get_offset_index is to get the index offset (which slot in offset) \
-		based on the hash result.
+		"""
+		fcntl.lockf(self.lock_file, fcntl.LOCK_UN, 1, set_num + 1)
+		self.locks[set_num % len(self.locks)].release()
 
-		Args:
-			hash_result(int): `hash_result` is the result of hash the key of \
-                        the item.
+	def split(self, key):
+		"""split is to hash a key into its set number, offset index and tag.
 
 		Returns:
-			an int to indicate which index in the offset the item should be in.
+			a tuple (set_num, offset, tag).
 		"""
+		hash_result = self.hash(key)
+		return ((hash_result >> self.offset_bits) & self.set_mask, 
+			hash_result & self.offset_mask, hash_result >> self.tag_shift)
 
-		mask = ~(-1 << self.offset_bits)
-		return hash_result & mask
-
-	def get_tag_num(self, hash_result):
+	def find_line(self, set_num, tag):
+		"""find_line is to find the non-empty line of a set with a tag. The \
+		caller should hold the locks of the set.
 
-		"""get_tag_num is to get the tag number based on the hash result.
+		Returns:
+			the row of the line in the columns, or None.
+		"""
+		base = set_num * self.n_way
+		counts = self.counts
+		tags = self.tags
+		for line in range(base, base + self.n_way):
+			if counts[line] and tags[line] == tag:
+				return line
+		return None
 
-		Args:
-			hash_result(int): `hash_result` is the result of hash the key of \
-                        the item.
+	def touch(self, set_num, line):
+		"""touch is to mark a line as the most recently used one of its set.
+		"""
+		now = self.clocks[set_num] + 1
+		self.clocks[set_num] = now
+		self.stamps[line] = now
 
-		Returns:
-			an int to indicate the tag of the item.
+	def slot_range(self, line, offset):
+		"""slot_range is to get the first and the last byte of the slot of \
+		an item in `slots`.
 		"""
+		start = (line * self.offset_size + offset) * self.stride
+		return start, start + self.stride
 
-		mask = -1 << (self.set_bits + self.offset_bits)
-		return (hash_result & mask) >> (self.set_bits + self.offset_bits)
+	def read_slot(self, line, offset):
+		"""read_slot is to copy the pickled item out of a slot. The caller \
+		should hold the locks of the set.
 
+		Returns:
+			the bytes of the item, or None if the slot is empty.
+		"""
+		if not self.valid[line * self.words + (offset >> 6)] >> (offset & 63) & 1:
+			return None
+		start, end = self.slot_range(line, offset)
+		length = int.from_bytes(self.slots[start:start + 4], 'little')
+		return bytes(self.slots[start + 4:start + 4 + length])
+
+	def clear_slot(self, set_num, line, offset):
+		"""clear_slot is to empty a slot which holds an item. The caller \
+		should hold the locks of the set.
+		"""
+		self.valid[line * self.words + (offset >> 6)] &= ~(1 << (offset & 63))
+		self.counts[line] -= 1
+		if self.counts[line] == 0:
+			self.stamps[line] = 0
 
 	def set_value(self, key, value):
-
 		"""set_value is to put an item(a key and value pair) into the cache.
 
 		Args:
 			key(key_type): `key` is the key of the item.
 
-			value(value_type): `value` is the value of the item
+			value(value_type): `value` is the value of the item.
 
 		Returns:
-			True if successful, None otherwise.
+			True if successful, False if the pickled item is larger than \
+			`value_size`, then the item it would replace is deleted, so the \
+			cache doesn't keep a stale value of the key.
 		"""
-
 		if not isinstance(key, self.key_type) or not isinstance(value, self.value_type):
 			raise ValueError("Invalid key type or value type")
+		data = pickle.dumps((key, value), protocol = pickle.HIGHEST_PROTOCOL)
+		set_num, offset, tag = self.split(key)
+		self.acquire(set_num)
+		try:
+			line = self.find_line(set_num, tag)
+			if len(data) > self.value_size:
+				if line != None and self.valid[line * self.words + (offset >> 6)] >> (offset & 63) & 1:
+					self.clear_slot(set_num, line, offset)
+				return False
+			if line == None:
+				base = set_num * self.n_way
+				counts = self.counts[base:base + self.n_way].tolist()
+				if 0 in counts:
+					line = base + counts.index(0)
+				else:
+					stamps = self.stamps[base:base + self.n_way].tolist()
+					line = base + stamps.index(max(stamps) if self.mru else min(stamps))
+					#evict the victim line
+					for word in range(line * self.words, (line + 1) * self.words):
+						self.valid[word] = 0
+					self.counts[line] = 0
+				self.tags[line] = tag
+			word = line * self.words + (offset >> 6)
+			bit = 1 << (offset & 63)
+			if not self.valid[word] & bit:
+				self.valid[word] |= bit
+				self.counts[line] += 1
+			start, end = self.slot_range(line, offset)
+			self.slots[start:start + 4] = len(data).to_bytes(4, 'little')
+			self.slots[start + 4:start + 4 + len(data)] = data
+			self.touch(set_num, line)
+		finally:
+			self.release(set_num)
+		return True
 
-		if self.lock != None:
-			self.lock.acquire() 
-		hash_result = self.hash(key)
-		set_num = self.get_set_num(hash_result)
-		offset_index = self.get_offset_index(hash_result)
-		tag = self.get_tag_num(hash_result)
-		is_success = self.sets[set_num].set(value, tag, offset_index)
-		if self.lock != None:
-			self.lock.release()
-		return is_success 
-
-
-	def get_value(self, key):
-
-
-		"""get_value is to get an item(a key and value pair) from the cache by \
-		a key.
+	def get_value(self, key, default = None):
+		"""get_value is to get an item(a key and value pair) from the cache \
+		by a key.
 
 		Args:
 			key(key_type): `key` is the key of the item.
 
+			default(optional): `default` is returned when the item is not in \
+				the cache. Default setting is None.
+
 		Returns:
 			if the value exist, return the value of the key. Otherwise \
-			return None.
+			return `default`.
 		"""
 		if not isinstance(key, self.key_type):
 			raise ValueError("Invalid key type or value type")
-
-
-		if self.lock != None:
-			self.lock.acquire() 
-		hash_result = self.hash(key)
-		set_num = self.get_set_num(hash_result)
-		offset_index = self.get_offset_index(hash_result)
-		tag = self.get_tag_num(hash_result)
-		if self.lock != None:
-			self.lock.release() 
-		return self.sets[set_num].get_value(tag, offset_index)
+		set_num, offset, tag = self.split(key)
+		data = None
+		self.acquire(set_num)
+		try:
+			line = self.find_line(set_num, tag)
+			if line != None:
+				#if there isn't that offset, it still counts as one access.
+				self.touch(set_num, line)
+				data = self.read_slot(line, offset)
+		finally:
+			self.release(set_num)
+		if data == None:
+			return default
+		item_key, value = pickle.loads(data)
+		if item_key != key:
+			return default
+		return value
 
 	def delete(self, key, value):
-
 		"""delete is to delete the item which has the inputed key and value.
 
 		Args:
 			key(key_type): `key` is the key of the item which is going to \
-				be deleted. 
+				be deleted.
 
 			value(value_type): `value` is the value of the item which \
 				is going to be deleted.
@@ -1175,19 +6591,51 @@ class Cache(object):
 			if the value exist and be successfully deleted, return True; 
 			if not successfully deleted, return False; otherwise return None.
 		"""
-
 		if not isinstance(key, self.key_type) or not isinstance(value, self.value_type):
 			raise ValueError("Invalid key type or value type")
-
-		if self.lock != None:
-			self.lock.acquire() 
-		hash_result = self.hash(key)
-		set_num = self.get_set_num(hash_result)
-		offset_index = self.get_offset_index(hash_result)
-		tag = self.get_tag_num(hash_result)
-		if self.lock != None:
-			self.lock.release() 
-		return self.sets[set_num].delete_value(tag, offset_index, value)
-
-
-
+		set_num, offset, tag = self.split(key)
+		self.acquire(set_num)
+		try:
+			line = self.find_line(set_num, tag)
+			if line == None:
+				return None
+			data = self.read_slot(line, offset)
+			if data == None or pickle.loads(data) != (key, value):
+				return False
+			self.clear_slot(set_num, line, offset)
+			if self.counts[line] != 0:
+				#delete also counts as an access
+				self.touch(set_num, line)
+			return True
+		finally:
+			self.release(set_num)
+
+	def close(self):
+		"""close is to detach the process from the cache. The cache and its \
+		items stay in the segment for the other processes.
+		"""
+		if self.shm == None:
+			return
+		for view in (self.header, self.tags, self.counts, self.valid, self.stamps, self.clocks, self.slots):
+			view.release()
+		self.shm.close()
+		self.shm = None
+		os.close(self.lock_file)
+
+	def unlink(self):
+		"""unlink is to close the cache and remove its segment and lock file. \
+		Processes which are still attached keep their mapping until they \
+		close it.
+		"""
+		self.close()
+		segment = shared_memory.SharedMemory(name = self.name)
+		segment.close()
+		segment.unlink()
+		if os.path.exists(self.lock_path):
+			os.remove(self.lock_path)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
@@ -2,7 +2,16 @@
 #test N-associative cache
 #author: Yu-Ju Chang
 
+import asyncio
 import cache
+import json
+import itertools
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
 import unittest
 
 
@@ -127,6 +136,371 @@ class TestLRU_MRU(unittest.TestCase):
 		self.assertEqual(lru.victim(), (90390, 1))
 
 
+class TestPseudoLRU(unittest.TestCase):
+	def test_tree_plru(self):
+		plru = cache.TreePLRU(4)
+		for i, tag in enumerate([10, 11, 12, 13]):
+			plru.insert(tag, i)
+		self.assertEqual(plru.get_size(), 4)
+		self.assertEqual(plru.victim(), (10, 0))
+		#not the true LRU way 1, the tree only knows way 0 was in the older half
+		self.assertEqual(plru.victim(), (12, 2))
+		self.assertEqual(plru.victim(), (11, 1))
+		self.assertEqual(plru.victim(), (13, 3))
+		self.assertEqual(plru.victim(), None)
+		self.assertRaises(ValueError, cache.TreePLRU, 3)
+
+		plru = cache.TreePLRU(2, thread_safe_mode = False)
+		plru.insert(10, 0)
+		plru.insert(11, 1)
+		plru.delete(10, None)
+		self.assertEqual(plru.victim(), (11, 1))
+		plru.delete(10, 10)
+		self.assertEqual(plru.get_size(), 0)
+
+	def test_bit_plru(self):
+		plru = cache.BitPLRU(4)
+		for i, tag in enumerate([10, 11, 12, 13]):
+			plru.insert(tag, i)
+		self.assertEqual(plru.victim(), (10, 0))
+		plru.insert(14, 0)
+		#all of the bits were set, so only the bit of way 0 is kept
+		self.assertEqual(plru.victim(), (11, 1))
+		plru.delete(12, 12)
+		self.assertEqual(plru.get_size(), 2)
+		self.assertEqual(plru.ways, {14: 0, 13: 3})
+		self.assertEqual(plru.victim(), (13, 3))
+
+	def test_cache(self):
+		for replacement in ['TREE_PLRU', 'BIT_PLRU']:
+			test_cache = cache.Cache(64, 4, 2, int, int, replacement = replacement)
+			self.assertTrue(test_cache.sets[0].replacement is not test_cache.sets[1].replacement)
+			for i in range(0, 256, 4):
+				test_cache.set_value(i, i)
+			stats = test_cache.stats()
+			self.assertEqual((stats['fills'], stats['evictions']), (16, 48))
+			self.assertEqual(test_cache.get_value(252), 252)
+			self.assertTrue(test_cache.delete(252, 252))
+			self.assertEqual(test_cache.get_value(252), None)
+			self.assertRaises(ValueError, cache.Cache, 64, 4, 2, int, int, replacement = replacement, storage = 'compact')
+
+
+class TestPolicies(unittest.TestCase):
+
+	def hit_ratio(self, replacement, trace, **kwargs):
+		test_cache = cache.Cache(256, 8, 1, int, int, replacement = replacement, **kwargs)
+		for key in trace:
+			if test_cache.get_value(key) == None:
+				test_cache.set_value(key, key)
+		stats = test_cache.stats()
+		return stats['hits'] / (stats['hits'] + stats['misses'])
+
+	def scan_trace(self):
+		#a hot set of half of the cache, read twice between scans of 128 
+		#lines which are used once
+		rng = random.Random(0)
+		hot = list(range(128))
+		trace = []
+		for start in range(10**6, 10**6 + 20 * 256, 256):
+			for i in range(2):
+				rng.shuffle(hot)
+				trace += hot
+			trace += range(start, start + 256, 2)
+		return trace
+
+	def zipf_trace(self, one_hit_ratio = 0.0):
+		#one_hit_ratio of the keys are used only once
+		rng = random.Random(1)
+		cum_weights = list(itertools.accumulate(1.0 / (k + 1) for k in range(2048)))
+		keys = list(range(2048))
+		rng.shuffle(keys)
+		trace = []
+		for i, k in enumerate(rng.choices(range(2048), cum_weights = cum_weights, k = 20000)):
+			if rng.random() < one_hit_ratio:
+				trace.append(10**6 + 2 * i)
+			else:
+				trace.append(keys[k])
+		return trace
+
+	def test_scan(self):
+		trace = self.scan_trace()
+		lru = self.hit_ratio('LRU', trace)
+		for replacement in ['CLOCK', 'LFU', 'SLRU', '2Q', 'ARC']:
+			self.assertGreater(self.hit_ratio(replacement, trace), lru + 0.1, replacement)
+
+	def test_zipf(self):
+		trace = self.zipf_trace()
+		lru = self.hit_ratio('LRU', trace)
+		for replacement in ['LFU', 'SLRU', '2Q', 'ARC']:
+			self.assertGreater(self.hit_ratio(replacement, trace), lru + 0.02, replacement)
+		for replacement in ['FIFO', 'CLOCK', 'RANDOM']:
+			self.assertGreater(self.hit_ratio(replacement, trace), lru - 0.1, replacement)
+
+	def test_admission(self):
+		for one_hit_ratio in [0.0, 0.3]:
+			trace = self.zipf_trace(one_hit_ratio)
+			for replacement in ['LRU', 'SLRU']:
+				self.assertGreater(self.hit_ratio(replacement, trace, admission = 'TINYLFU'), 
+					self.hit_ratio(replacement, trace) + 0.01, replacement)
+
+	def test_consistency(self):
+		rng = random.Random(2)
+		for replacement in sorted(cache.REPLACEMENT_POLICIES):
+			test_cache = cache.Cache(64, 4, 1, int, int, replacement = replacement)
+			expected = dict()
+			for i in range(3000):
+				key = rng.randrange(256)
+				if rng.random() < 0.2:
+					if test_cache.delete(key, key):
+						del expected[key]
+				else:
+					test_cache.set_value(key, key)
+					expected[key] = key
+				for cache_set in test_cache.sets:
+					self.assertEqual(cache_set.replacement.get_size(), len(cache_set.tag_index), replacement)
+			for key in range(256):
+				value = test_cache.get_value(key)
+				if value != None:
+					self.assertEqual(expected.get(key), value)
+
+	def test_fifo_lfu(self):
+		fifo = cache.FIFO(4)
+		for i, tag in enumerate([10, 11, 12]):
+			fifo.insert(tag, i)
+		fifo.insert(10, 0)
+		self.assertEqual(fifo.victim(), (10, 0))
+
+		lfu = cache.LFU(4, age_period = 1000)
+		for i, tag in enumerate([10, 11, 12]):
+			lfu.insert(tag, i)
+		lfu.insert(10, 0)
+		lfu.insert(12, 2)
+		lfu.insert(12, 2)
+		self.assertEqual(lfu.victim(), (11, 1))
+		self.assertEqual(lfu.victim(), (10, 0))
+		self.assertEqual(lfu.victim(), (12, 2))
+		self.assertEqual(lfu.victim(), None)
+
+		#after aging, old counts are halved
+		lfu = cache.LFU(2, age_period = 6)
+		lfu.insert(10, 0)
+		for i in range(3):
+			lfu.insert(10, 0)
+		lfu.insert(11, 1)
+		lfu.insert(11, 1)
+		self.assertEqual(lfu.counts, {10: 2, 11: 1})
+
+
+class TestTinyLFU(unittest.TestCase):
+	def test_estimate(self):
+		tiny_lfu = cache.TinyLFU(4)
+		self.assertEqual(tiny_lfu.sample_size, 40)
+		tiny_lfu.record(7)
+		#the first access only goes to the doorkeeper
+		self.assertEqual(tiny_lfu.estimate(7), 1)
+		self.assertEqual(sum(tiny_lfu.counters), 0)
+		for i in range(5):
+			tiny_lfu.record(7)
+		self.assertEqual(tiny_lfu.estimate(7), 6)
+		self.assertTrue(tiny_lfu.admit(7, 8))
+		self.assertFalse(tiny_lfu.admit(8, 7))
+		tiny_lfu.reset()
+		self.assertEqual(tiny_lfu.estimate(7), 2)
+		for i in range(100):
+			tiny_lfu.record(7)
+		#counters saturate at 15
+		self.assertLessEqual(tiny_lfu.estimate(7), 16)
+
+	def test_cache(self):
+		for kwargs in [dict(), dict(storage = 'compact')]:
+			test_cache = cache.Cache(16, 2, 1, int, int, admission = 'TINYLFU', **kwargs)
+			#keys 0 and 8 fill the two lines of set 0
+			for i in range(5):
+				test_cache.set_value(0, 0)
+				test_cache.set_value(8, 8)
+			self.assertFalse(test_cache.set_value(16, 16))
+			self.assertEqual(test_cache.get_value(16), None)
+			self.assertEqual(test_cache.get_value(0), 0)
+			self.assertEqual(test_cache.get_value(8), 8)
+			self.assertEqual(test_cache.stats()['rejections'], 1)
+			for i in range(10):
+				test_cache.get_value(16)
+			self.assertTrue(test_cache.set_value(16, 16))
+			self.assertEqual(test_cache.get_value(16), 16)
+
+			#an item which is too heavy isn't recorded
+			test_cache = cache.Cache(16, 2, 1, int, str, admission = 'TINYLFU', max_weight = 32,
+				weigher = lambda key, value: len(value), **kwargs)
+			admission = test_cache.sets[0].admission
+			self.assertFalse(test_cache.set_value(0, 'a' * 9))
+			self.assertEqual(admission.estimate(0), 0)
+			self.assertTrue(test_cache.set_value(0, 'a' * 8))
+			self.assertEqual(admission.estimate(0), 1)
+		test_cache = cache.Cache(16, 2, 1, int, int, admission = lambda n_way: cache.TinyLFU(n_way, sample_factor = 4))
+		self.assertEqual(test_cache.sets[0].admission.sample_size, 8)
+		self.assertRaises(ValueError, cache.Cache, 16, 2, 1, int, int, admission = 'LFU')
+
+
+class TestTimerWheel(unittest.TestCase):
+	def test_advance(self):
+		wheel = cache.TimerWheel(resolution = 1.0, slots = 4, levels = 2, thread_safe_mode = False)
+		for deadline in [0.5, 3, 3.5, 9, 20, 100]:
+			wheel.schedule(deadline, deadline)
+		self.assertEqual(wheel.size, 6)
+		self.assertEqual(wheel.advance(0.9), [])
+		self.assertEqual(wheel.advance(1), [(0.5, 0.5)])
+		self.assertEqual(wheel.advance(3.9), [(3, 3)])
+		self.assertEqual(wheel.advance(4), [(3.5, 3.5)])
+		self.assertEqual(wheel.advance(8.9), [])
+		#9 waited in level 1 until it was moved down
+		self.assertEqual(wheel.advance(25), [(9, 9), (20, 20)])
+		#100 is further than the span of the wheel (16 ticks)
+		self.assertEqual(wheel.advance(99), [])
+		self.assertEqual(wheel.advance(100), [(100, 100)])
+		self.assertEqual(wheel.size, 0)
+		#a deadline in the past is due on the next tick
+		wheel.schedule(50, 'late')
+		self.assertEqual(wheel.advance(101), [(50, 'late')])
+		self.assertRaises(ValueError, cache.TimerWheel, slots = 6)
+
+	def test_random(self):
+		rng = random.Random(0)
+		wheel = cache.TimerWheel(resolution = 0.5, slots = 8, levels = 3)
+		deadlines = [rng.uniform(0, 600) for i in range(2000)]
+		for deadline in deadlines:
+			wheel.schedule(deadline, deadline)
+		now = 0
+		while wheel.size:
+			now += rng.uniform(0, 20)
+			for deadline, item in wheel.advance(now):
+				#due at most one tick late
+				self.assertTrue(deadline <= now)
+				self.assertTrue(deadline > now - 20 - 0.5)
+				deadlines.remove(item)
+		self.assertEqual(deadlines, [])
+
+
+class TestAsyncCache(unittest.TestCase):
+	def test_operations(self):
+		async def run(async_cache):
+			self.assertTrue(await async_cache.set(1, 10))
+			self.assertEqual(await async_cache.get(1), 10)
+			self.assertEqual(await async_cache.get(2, -1), -1)
+			self.assertTrue(await async_cache.set_many([(2, 20), (3, 30)]))
+			self.assertEqual(await async_cache.get_many([1, 2, 4]), {1: 10, 2: 20})
+			self.assertEqual(await async_cache.delete_many([(2, 20), (4, 40)]), [True, None])
+			self.assertTrue(await async_cache.delete(1, 10))
+			self.assertEqual(await async_cache.get_many([1, 2, 3], ordered = True), [None, None, 30])
+			self.assertEqual(async_cache.stats()['hits'], 4)
+
+		async_cache = cache.AsyncCache(64, 2, 2, int, int)
+		self.assertEqual(async_cache.cache.sets[0].lock, None)
+		asyncio.run(run(async_cache))
+		async_cache = cache.AsyncCache(64, 2, 2, int, int, thread_safe_mode = True)
+		self.assertNotEqual(async_cache.cache.sets[0].lock, None)
+		asyncio.run(run(async_cache))
+
+	def test_get_or_load(self):
+		calls = []
+
+		async def run(async_cache):
+			release = asyncio.Event()
+
+			async def loader(key):
+				calls.append(key)
+				await release.wait()
+				return key * 10
+
+			tasks = [asyncio.ensure_future(async_cache.get_or_load(3, loader)) for i in range(100)]
+			await asyncio.sleep(0.01)
+			release.set()
+			self.assertEqual(await asyncio.gather(*tasks), [30] * 100)
+			self.assertEqual(await async_cache.get_or_load(3, loader), 30)
+			self.assertEqual(async_cache.flights, {})
+
+			async def failing_loader(key):
+				await asyncio.sleep(0.01)
+				raise KeyError(key)
+
+			results = await asyncio.gather(*[async_cache.get_or_load(5, failing_loader) for i in range(10)], 
+				return_exceptions = True)
+			self.assertTrue(all(isinstance(result, KeyError) for result in results))
+			self.assertEqual(await async_cache.get(5), None)
+
+			#a waiter takes over when the loading coroutine is cancelled
+			release.clear()
+			slow = asyncio.ensure_future(async_cache.get_or_load(6, loader))
+			await asyncio.sleep(0)
+			waiter = asyncio.ensure_future(async_cache.get_or_load(6, lambda key: asyncio.sleep(0, key + 1)))
+			await asyncio.sleep(0.01)
+			slow.cancel()
+			self.assertEqual(await waiter, 7)
+			self.assertTrue(slow.cancelled())
+
+		for kwargs in [dict(), dict(thread_safe_mode = True)]:
+			del calls[:]
+			asyncio.run(run(cache.AsyncCache(64, 2, 2, int, int, **kwargs)))
+			self.assertEqual(calls, [3, 6])
+
+
+def fill_shared_cache(name, n):
+	shared_cache = cache.SharedMemoryCache(name, 4096, 4, 2, int, str)
+	for i in range(n * 16, n * 16 + 16):
+		shared_cache.set_value(i, str(i))
+	shared_cache.set_value(1001 + n, shared_cache.get_value(1000) + str(n))
+	shared_cache.close()
+
+
+@unittest.skipIf(cache.shared_memory == None, "shared memory is not supported")
+class TestSharedMemoryCache(unittest.TestCase):
+	def setUp(self):
+		self.name = 'n_way_cache_test_%d' % os.getpid()
+
+	def test_set_get_delete(self):
+		with cache.SharedMemoryCache(self.name, 64, 2, 1, str, object, hash = len) as shared_cache:
+			try:
+				self.assertTrue(shared_cache.set_value('ab', [1, 2]))
+				self.assertEqual(shared_cache.get_value('ab'), [1, 2])
+				#same hash result, but another key
+				self.assertEqual(shared_cache.get_value('cd', 0), 0)
+				self.assertEqual(shared_cache.delete('cd', [1, 2]), False)
+				self.assertEqual(shared_cache.delete('ab', [1, 2]), True)
+				self.assertEqual(shared_cache.get_value('ab'), None)
+				self.assertFalse(shared_cache.set_value('ab', 'x' * 2000))
+				#a rejected overwrite doesn't leave the old value behind
+				self.assertTrue(shared_cache.set_value('ab', [3]))
+				self.assertFalse(shared_cache.set_value('ab', 'x' * 2000))
+				self.assertEqual(shared_cache.get_value('ab'), None)
+				#keys of 64, 128 and 192 characters share set 0 and evict by LRU
+				for length in [64, 128, 64, 192]:
+					shared_cache.set_value('k' * length, length)
+				self.assertEqual(shared_cache.get_value('k' * 64), 64)
+				self.assertEqual(shared_cache.get_value('k' * 128), None)
+				self.assertEqual(shared_cache.get_value('k' * 192), 192)
+				self.assertRaises(ValueError, cache.SharedMemoryCache, self.name, 128, 2, 1, str, object)
+			finally:
+				shared_cache.unlink()
+
+	@unittest.skipIf('fork' not in multiprocessing.get_all_start_methods(), "fork is not supported")
+	def test_processes(self):
+		with cache.SharedMemoryCache(self.name, 4096, 4, 2, int, str) as shared_cache:
+			try:
+				shared_cache.set_value(1000, 'parent')
+				context = multiprocessing.get_context('fork')
+				processes = [context.Process(target = fill_shared_cache, args = (self.name, n)) for n in range(2)]
+				for process in processes:
+					process.start()
+				for process in processes:
+					process.join()
+					self.assertEqual(process.exitcode, 0)
+				self.assertEqual([shared_cache.get_value(i) for i in range(32)], [str(i) for i in range(32)])
+				self.assertEqual(shared_cache.get_value(1000), 'parent')
+				self.assertEqual([shared_cache.get_value(1001 + n) for n in range(2)], ['parent0', 'parent1'])
+			finally:
+				shared_cache.unlink()
+		self.assertEqual(cache.stable_hash('abc'), cache.stable_hash('abc'))
+
+
 class TestCacheSet(unittest.TestCase):
 	def test_cacheset_set_get_value(self):
 		sets = cache.CacheSet(2, 2) #2way 2offset
@@ -168,6 +542,103 @@ class TestCacheSet(unittest.TestCase):
 		self.assertEqual(sets.get_line(44788), None)
 		self.assertEqual(sets.get_line(34788), sets.lines[1])
 
+	def test_cacheset_tag_index(self):
+		sets = cache.CacheSet(2, 2)
+		sets.set(101, 11, 0) #index: 0
+		sets.set(102, 22, 0) #index: 1
+		self.assertEqual(sets.tag_index, {11: 0, 22: 1})
+		sets.set(103, 33, 0) #evict tag 11
+		self.assertEqual(sets.tag_index, {33: 0, 22: 1})
+		self.assertEqual(sets.get_value(11, 0), None)
+		sets.delete_value(22, 0, 102) #line 1 becomes empty
+		self.assertEqual(sets.tag_index, {33: 0})
+		self.assertEqual(sets.free_lines, [1])
+		sets.set(104, 0, 1) #tag 0 goes into the empty line
+		self.assertEqual(sets.tag_index, {33: 0, 0: 1})
+		self.assertEqual(sets.get_value(0, 1), 104)
+		self.assertTrue(sets.delete_value(0, 1, 104))
+		self.assertEqual(sets.tag_index, {33: 0})
+		self.assertEqual(sets.replacement.get_size(), 1)
+
+class TestCompactCacheSet(unittest.TestCase):
+	def test_set_get_delete(self):
+		storage = cache.CompactStorage(2, 2, 2) #2 sets 2way 2offset
+		sets = cache.CompactCacheSet(storage, 1)
+		sets.set(101, 24384, 0)
+		sets.set(102, 24384, 1)
+		sets.set(103, 24384, 0)
+		self.assertEqual(sets.get_value(24384, 0), 103)
+		self.assertEqual(storage.valid[2], 3) #both offsets of row 2 are valid
+		self.assertEqual(storage.valid_count[2], 2)
+		sets.set(104, 37884, 0)
+		sets.get_value(24384, 1)
+		sets.set(105, 38984, 0) #evict tag 37884
+		self.assertEqual(sets.get_value(37884, 0), None)
+		self.assertEqual(sets.get_value(38984, 0), 105)
+		self.assertFalse(sets.delete_value(38984, 0, 999))
+		self.assertTrue(sets.delete_value(38984, 0, 105))
+		self.assertEqual(sets.tag_index, {24384: 0})
+		#row 2 is the only line of set 1, row 3 is empty again
+		self.assertEqual((storage.heads[1], storage.tails[1], storage.free[1]), (2, 2, 3))
+		self.assertEqual((storage.heads[0], storage.free[0], storage.next[0]), (-1, 0, 1))
+		self.assertEqual(sets.delete_value(38984, 0, 105), None)
+		self.assertRaises(IndexError, sets.set, 1, 1, 2)
+
+	def test_mru(self):
+		storage = cache.CompactStorage(1, 2, 2)
+		sets = cache.CompactCacheSet(storage, 0, 'MRU')
+		sets.set(1, 10, 0)
+		sets.set(2, 20, 0)
+		sets.get_value(10, 0)
+		sets.set(3, 30, 0) #evict tag 10, the most recently used one
+		self.assertEqual(sets.get_value(10, 0), None)
+		self.assertEqual(sets.get_value(20, 0), 2)
+		self.assertRaises(ValueError, cache.CompactCacheSet, storage, 0, cache.LRU_MRU())
+
+class TestTracing(unittest.TestCase):
+	def test_trace_events(self):
+		events = []
+		test_cache = cache.Cache(16, 1, 2, int, int, tracer = events.append)
+		test_cache.set_value(1, 1) #set 0 tag 0
+		test_cache.get_value(1)
+		test_cache.get_value(2) #same line, empty offset
+		test_cache.set_value(17, 17) #set 0 tag 1, evict tag 0
+		test_cache.delete(17, 17)
+		self.assertEqual([(e.op, e.set_num, e.tag, e.hit, e.evicted) for e in events], [
+			('set', 0, 0, False, None),
+			('get', 0, 0, True, None),
+			('get', 0, 0, False, None),
+			('set', 0, 1, False, 0),
+			('delete', 0, 1, True, None)])
+		for event in events:
+			self.assertTrue(event.lock_wait >= 0)
+			self.assertTrue(event.duration >= event.lock_wait)
+
+		test_cache.set_tracer(None)
+		test_cache.get_value(1)
+		self.assertEqual(len(events), 5)
+
+	def test_compact_trace_events(self):
+		events = []
+		test_cache = cache.Cache(16, 1, 2, int, int, storage = 'compact', tracer = events.append)
+		test_cache.set_value(1, 1)
+		test_cache.set_value(17, 17)
+		self.assertEqual(test_cache.get_value(17), 17)
+		self.assertEqual([(e.op, e.hit, e.evicted) for e in events], [
+			('set', False, None), ('set', False, 0), ('get', True, None)])
+
+	def test_chrome_trace_writer(self):
+		path = os.path.join(tempfile.mkdtemp(), 'trace.json')
+		with cache.ChromeTraceWriter(path) as writer:
+			test_cache = cache.Cache(16, 2, 2, int, int, tracer = writer)
+			test_cache.set_value(1, 1)
+			test_cache.get_value(1)
+		with open(path) as trace_file:
+			trace = json.load(trace_file)
+		self.assertEqual([e['name'] for e in trace['traceEvents']], ['set', 'get'])
+		self.assertEqual(trace['traceEvents'][1]['ph'], 'X')
+		self.assertTrue(trace['traceEvents'][1]['args']['hit'])
+
 class TestCache(unittest.TestCase):
 
 	def test_get_set_num(self): #how to test same object in different fcuntiosn?
@@ -324,6 +795,761 @@ class TestCache(unittest.TestCase):
 		test_cache.delete(0 , 0)
 		self.assertEqual(test_cache.get_value(0), None)
 
+	def test_many(self):
+		for kwargs in [dict(), dict(lock_stripes = 2), dict(storage = 'compact')]:
+			test_cache = cache.Cache(1024, 2, 3, int, int, **kwargs)
+			self.assertTrue(test_cache.set_many({i: i * 10 for i in range(0, 40, 3)}))
+			test_cache.set_many([(1, 5), (1, 6)]) #the last value is kept
+			self.assertEqual(test_cache.get_many([0, 1, 2, 3]), {0: 0, 1: 6, 3: 30})
+			self.assertEqual(test_cache.get_many([3, 2, 1, 0, 3], ordered = True), [30, None, 6, 0, 30])
+			for i in range(0, 40, 3):
+				self.assertEqual(test_cache.get_value(i), i * 10)
+			self.assertEqual(test_cache.delete_many([(3, 30), (4, 40), (1000, 0), (6, 61), (39, 390)]), [True, False, None, False, True])
+			self.assertEqual(test_cache.get_many([3, 6, 39]), {6: 60})
+			self.assertRaises(ValueError, test_cache.get_many, [1, 'a'])
+			self.assertRaises(ValueError, test_cache.set_many, {1: 'a'})
+
+	def test_many_hashed(self):
+		test_cache = cache.Cache(1024, 2, 3, int, int)
+		hash_results = [0, 5, 8, 9, -17, 2 ** 40 + 3]
+		set_nums, offsets, tags = test_cache.split_hashes(hash_results)
+		self.assertEqual(set_nums, [test_cache.get_set_num(h) for h in hash_results])
+		self.assertEqual(offsets, [test_cache.get_offset_index(h) for h in hash_results])
+		self.assertEqual(tags, [test_cache.get_tag_num(h) for h in hash_results])
+		self.assertTrue(test_cache.set_many_hashed(hash_results, [1, 2, 3, 4, 5, 6]))
+		#int keys are their own hash results
+		self.assertEqual(test_cache.get_value(9), 4)
+		self.assertEqual(test_cache.get_many_hashed([9, 1, -17], -1), [4, -1, 5])
+		self.assertRaises(ValueError, test_cache.set_many_hashed, [1, 2], [1])
+		self.assertRaises(ValueError, test_cache.set_many_hashed, [1], ['a'])
+
+	@unittest.skipIf(cache.numpy == None, "numpy is not installed")
+	def test_many_hashed_numpy(self):
+		numpy = cache.numpy
+		test_cache = cache.Cache(1024, 2, 3, int, int)
+		hash_results = numpy.array([0, 5, 8, 9, -17, 2 ** 40 + 3, 4000, 4001])
+		set_nums, offsets, tags = test_cache.split_hashes(hash_results)
+		self.assertEqual(set_nums.tolist(), [test_cache.get_set_num(h) for h in hash_results.tolist()])
+		self.assertEqual(offsets.tolist(), [test_cache.get_offset_index(h) for h in hash_results.tolist()])
+		self.assertEqual(tags.tolist(), [test_cache.get_tag_num(h) for h in hash_results.tolist()])
+		self.assertEqual(test_cache.group_hashes(hash_results), test_cache.group_hashes(hash_results.tolist()))
+		self.assertTrue(test_cache.set_many_hashed(hash_results, hash_results * 10))
+		for h in hash_results.tolist():
+			self.assertEqual(test_cache.get_value(h), h * 10)
+		self.assertEqual(test_cache.get_many_hashed(numpy.array([4001, 1, 0])), [40010, None, 0])
+		#an empty array works like an empty list
+		empty = numpy.array([], dtype = numpy.int64)
+		self.assertEqual(test_cache.group_hashes(empty), ([], [], {}))
+		self.assertEqual(test_cache.get_many_hashed(empty), [])
+		self.assertTrue(test_cache.set_many_hashed(empty, empty))
+
+	def test_stats(self):
+		for kwargs in [dict(), dict(lock_stripes = 2), dict(storage = 'compact')]:
+			test_cache = cache.Cache(64, 2, 2, int, int, **kwargs)
+			for i in range(4):
+				test_cache.set_value(i, i)
+			self.assertEqual(test_cache.get_value(0), 0)
+			self.assertEqual(test_cache.get_many([100, 4]), {})
+			test_cache.set_value(32, 32)
+			#set 0 is full while the other sets are empty
+			test_cache.set_value(64, 64)
+			self.assertTrue(test_cache.delete(32, 32))
+			stats = test_cache.stats(reset = True)
+			self.assertEqual(dict((field, stats[field]) for field in cache.STATS_FIELDS), 
+				dict(hits = 1, misses = 2, updates = 3, fills = 2, evictions = 1, 
+				conflict_evictions = 1, deletes = 1, rejections = 0, expirations = 0))
+			self.assertEqual((stats['lines'], stats['lines_used']), (16, 1))
+			self.assertEqual(stats['occupancy'], [1, 0, 0, 0, 0, 0, 0, 0])
+			stats = test_cache.stats()
+			self.assertEqual(stats['hits'] + stats['fills'] + stats['evictions'], 0)
+			self.assertEqual(stats['lines_used'], 1)
+
+			#evictions in a full cache are not conflict evictions
+			test_cache = cache.Cache(64, 2, 2, int, int, **kwargs)
+			for i in range(32):
+				test_cache.set_value(i * 4, i)
+			stats = test_cache.stats()
+			self.assertEqual((stats['fills'], stats['evictions'], stats['conflict_evictions']), (16, 16, 0))
+			test_cache.reset_stats()
+			self.assertEqual(test_cache.stats()['fills'], 0)
+
+	def test_ttl(self):
+		now = [0.0]
+		clock = lambda: now[0]
+		for kwargs in [dict(), dict(lock_stripes = 2), dict(storage = 'compact')]:
+			now[0] = 0.0
+			test_cache = cache.Cache(64, 2, 2, int, int, ttl = 10, clock = clock, **kwargs)
+			test_cache.set_value(0, 0)
+			test_cache.set_value(1, 1, ttl = 30)
+			test_cache.set_many([(4, 4), (5, 5)], ttl = 5)
+			now[0] = 6
+			self.assertEqual(test_cache.get_many([0, 1, 4, 5]), {0: 0, 1: 1})
+			now[0] = 11
+			self.assertEqual(test_cache.get_value(0), None)
+			self.assertEqual(test_cache.get_value(1), 1)
+			#set again without a ttl of its own, the item gets the default one
+			test_cache.set_value(1, 10)
+			now[0] = 20
+			self.assertEqual(test_cache.get_value(1), 10)
+			stats = test_cache.stats()
+			self.assertEqual((stats['expirations'], stats['lines_used']), (3, 1))
+
+			#the timer wheel frees the lines without lookups
+			test_cache.set_value(8, 8, ttl = 1)
+			now[0] = 42
+			self.assertEqual(test_cache.expire(), 2)
+			self.assertEqual(test_cache.stats()['lines_used'], 0)
+			self.assertEqual(test_cache.expire(), 0)
+
+			#expired lines of a full set are freed before a live one is evicted
+			test_cache.set_value(0, 0)
+			test_cache.set_value(32, 32, ttl = 1)
+			now[0] = 43
+			test_cache.set_value(64, 64)
+			self.assertEqual(test_cache.get_many([0, 32, 64]), {0: 0, 64: 64})
+			self.assertEqual(test_cache.stats()['evictions'], 0)
+			#a deleted item forgets its deadline
+			self.assertTrue(test_cache.delete(0, 0))
+			self.assertEqual(test_cache.sets[0].deadlines, {(2, 0): 53})
+		self.assertRaises(ValueError, cache.Cache, 64, 2, 2, int, int, ttl = 0)
+
+		test_cache = cache.Cache(64, 2, 2, int, int, clock = clock)
+		test_cache.set_value(0, 0)
+		test_cache.set_value(1, 1, ttl = 1)
+		test_cache.start_sweeper(0.001)
+		now[0] = 100
+		for i in range(1000):
+			if test_cache.stats()['expirations']:
+				break
+			time.sleep(0.001)
+		test_cache.stop_sweeper()
+		self.assertEqual(test_cache.stats()['expirations'], 1)
+		self.assertEqual(test_cache.get_value(0), 0)
+
+	def test_weight(self):
+		weigher = lambda key, value: len(value)
+		for kwargs in [dict(), dict(lock_stripes = 2), dict(storage = 'compact'), dict(replacement = 'CLOCK')]:
+			#8 sets, each of them gets a budget of 10
+			test_cache = cache.Cache(64, 2, 2, int, str, max_weight = 80, weigher = weigher, **kwargs)
+			test_cache.set_value(0, 'a' * 4)
+			test_cache.set_value(1, 'b' * 4)
+			#the line of keys 0 and 1 is evicted although the set has an empty line
+			self.assertTrue(test_cache.set_value(32, 'c' * 4))
+			self.assertEqual(test_cache.get_many([0, 1, 32]), {32: 'cccc'})
+			#too heavy, and the old value of key 32 is dropped
+			self.assertFalse(test_cache.set_value(33, 'x' * 11))
+			self.assertFalse(test_cache.set_value(32, 'x' * 11))
+			self.assertEqual(test_cache.get_value(32), None)
+			self.assertEqual(test_cache.stats()['rejections'], 2)
+
+			test_cache.set_value(64, 'd' * 3)
+			test_cache.set_value(32, 'c' * 4)
+			#an update of a line evicts other lines
+			test_cache.set_value(33, 'e' * 6)
+			self.assertEqual(test_cache.get_many([64, 32, 33]), {32: 'cccc', 33: 'eeeeee'})
+			#or the line itself when its other items take the budget
+			test_cache.set_value(34, 'f' * 6)
+			self.assertEqual(test_cache.get_many([32, 33, 34]), {34: 'ffffff'})
+			self.assertEqual(test_cache.stats()['weight'], 6)
+			test_cache.set_value(34, 'g')
+			test_cache.set_many([(4, 'h' * 2), (8, 'i' * 3)])
+			self.assertEqual(test_cache.stats()['weight'], 6)
+			self.assertTrue(test_cache.delete(34, 'g'))
+			stats = test_cache.stats()
+			self.assertEqual((stats['weight'], stats['evictions']), (5, 3))
+			self.assertRaises(ValueError, test_cache.set_many_hashed, [1], ['a'])
+
+		self.assertRaises(ValueError, cache.Cache, 64, 2, 2, int, str, max_weight = 80)
+		self.assertRaises(ValueError, cache.Cache, 64, 2, 2, int, str, weigher = weigher)
+		self.assertRaises(ValueError, cache.Cache, 64, 2, 2, int, str, max_weight = 80, 
+			weigher = weigher, max_item_weight = 11)
+
+	def test_get_or_load(self):
+		for kwargs in [dict(), dict(lock_stripes = 2), dict(thread_safe_mode = False)]:
+			test_cache = cache.Cache(64, 2, 2, int, int, **kwargs)
+			calls = []
+			release = threading.Event()
+
+			def loader(key):
+				calls.append(key)
+				release.wait()
+				return key * 10
+
+			results = []
+			threads = [threading.Thread(target = lambda: results.append(test_cache.get_or_load(3, loader))) 
+				for i in range(8)]
+			for thread in threads:
+				thread.start()
+			while not calls or len(test_cache.flights) == 0:
+				time.sleep(0.001)
+			release.set()
+			for thread in threads:
+				thread.join()
+			self.assertEqual(calls, [3])
+			self.assertEqual(results, [30] * 8)
+			self.assertEqual(test_cache.get_or_load(3, loader), 30)
+			self.assertEqual(calls, [3])
+			self.assertEqual(test_cache.flights, {})
+
+		test_cache = cache.Cache(64, 2, 2, int, int)
+		started = threading.Event()
+		release = threading.Event()
+
+		def failing_loader(key):
+			started.set()
+			release.wait()
+			raise KeyError(key)
+
+		errors = []
+
+		def load():
+			try:
+				test_cache.get_or_load(5, failing_loader)
+			except KeyError as error:
+				errors.append(error)
+
+		leader = threading.Thread(target = load)
+		leader.start()
+		started.wait()
+		waiters = [threading.Thread(target = load) for i in range(4)]
+		for thread in waiters:
+			thread.start()
+		while len(test_cache.flights) != 1:
+			time.sleep(0.001)
+		release.set()
+		for thread in [leader] + waiters:
+			thread.join()
+		self.assertEqual(len(errors), 5)
+		self.assertEqual(test_cache.get_value(5), None)
+		self.assertEqual(test_cache.get_or_load(5, lambda key: key + 1), 6)
+
+	def test_lazy(self):
+		for kwargs in [dict(), dict(lock_stripes = 4), dict(storage = 'compact'), dict(replacement = 'CLOCK')]:
+			#32768 sets, none of them is built yet
+			test_cache = cache.Cache(2**20, 8, 2, int, int, lazy = True, **kwargs)
+			self.assertEqual(len(test_cache.sets), 0)
+			test_cache.set_many([(key, key) for key in range(8)])
+			self.assertEqual(test_cache.get_many(range(8), ordered = True), list(range(8)))
+			self.assertEqual(test_cache.get_value(2**30), None)
+			self.assertEqual(sorted(test_cache.sets.keys()), [0, 1])
+			stats = test_cache.stats()
+			self.assertEqual((stats['lines'], stats['lines_used'], len(stats['occupancy'])), (2**18, 2, 2**15))
+			self.assertEqual(stats['occupancy'][:2], [1, 1])
+			if test_cache.storage == None:
+				self.assertEqual(test_cache.sets[0].lines[1:], [None] * 7)
+
+		events = []
+		test_cache = cache.Cache(64, 2, 2, int, str, lazy = True, tracer = events.append, 
+			max_weight = 80, weigher = lambda key, value: len(value))
+		test_cache.set_value(0, 'a' * 4)
+		test_cache.set_value(32, 'b' * 8)
+		self.assertEqual(test_cache.get_many([0, 32]), {32: 'b' * 8})
+		self.assertEqual([event.op for event in events], ['set', 'set', 'get', 'get'])
+
+	def test_snapshot(self):
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, 'cache.snapshot')
+			for kwargs in [dict(), dict(lock_stripes = 2), dict(storage = 'compact'), dict(lazy = True)]:
+				now = [0.0]
+				test_cache = cache.Cache(64, 2, 2, int, int, clock = lambda: now[0], **kwargs)
+				#keys 0, 1 and 32 share set 0, key 0 is the most recently used
+				test_cache.set_many([(0, 10), (1, 11), (32, 12)])
+				test_cache.get_value(0)
+				test_cache.set_value(8, 18, ttl = 10)
+				test_cache.set_value(40, 20, ttl = 1)
+				now[0] = 5.0
+				test_cache.save_snapshot(path)
+				self.assertRaises(ValueError, test_cache.load_snapshot, path)
+
+				now[0] = 100.0
+				restored = cache.Cache(64, 2, 2, int, int, clock = lambda: now[0], **kwargs)
+				restored.load_snapshot(path)
+				self.assertIsInstance(restored.sets[0], cache.PendingSet)
+				#the replacement order is restored, key 32 is evicted first
+				restored.set_value(64, 14)
+				self.assertNotIsInstance(restored.sets[0], cache.PendingSet)
+				#key 8 is in set 2, set 7 was empty
+				self.assertIsInstance(restored.sets[2], cache.PendingSet)
+				self.assertNotIsInstance(restored.sets[7], cache.PendingSet)
+				self.assertEqual(restored.get_many([0, 1, 32, 64, 8, 40], ordered = True), [10, 11, None, 14, 18, None])
+				#key 8 has 5 seconds left
+				now[0] = 104.0
+				self.assertEqual(restored.get_value(8), 18)
+				now[0] = 106.0
+				self.assertEqual(restored.get_value(8), None)
+				stats = restored.stats()
+				self.assertEqual((stats['lines_used'], stats['fills'], stats['evictions'], stats['expirations']), (2, 0, 1, 1))
+
+			test_cache = cache.Cache(64, 2, 2, str, int, hash = cache.stable_hash, verify_keys = True)
+			test_cache.set_many([('ab', 1), ('cd', 2)])
+			test_cache.save_snapshot(path)
+			restored = cache.Cache(64, 2, 2, str, int, hash = cache.stable_hash, verify_keys = True)
+			restored.load_snapshot(path)
+			self.assertEqual(restored.get_many(['ab', 'cd', 'ef']), {'ab': 1, 'cd': 2})
+			self.assertRaises(ValueError, cache.Cache(64, 2, 2, str, int).load_snapshot, path)
+			self.assertRaises(ValueError, cache.Cache(64, 4, 2, str, int, verify_keys = True).load_snapshot, path)
+
+			#items which weren't written back are still dirty after a restart
+			batches = []
+			test_cache = cache.Cache(64, 2, 2, int, int, writer = batches.extend)
+			test_cache.set_value(1, 11)
+			test_cache.get_or_load(2, lambda key: 12)
+			test_cache.save_snapshot(path)
+			restored = cache.Cache(64, 2, 2, int, int, writer = batches.extend)
+			restored.load_snapshot(path)
+			self.assertEqual(restored.flush(), 1)
+			self.assertEqual(batches, [(1, 11)])
+
+	def test_get_or_load_block(self):
+		for kwargs in [dict(), dict(storage = 'compact'), dict(hash = lambda key: key, ttl = 60)]:
+			test_cache = cache.Cache(64, 2, 2, int, int, **kwargs)
+			calls = []
+
+			def loader(keys):
+				calls.append(keys)
+				return {key: key * 10 for key in keys if key != 6}
+
+			self.assertEqual([test_cache.get_or_load_block(key, loader) for key in range(8)], 
+				[0, 10, 20, 30, 40, 50, None, 70])
+			#key 6 isn't in the backend, so its misses load its line again
+			self.assertEqual(calls, [[0, 1, 2, 3], [4, 5, 6, 7], [4, 5, 6, 7]])
+			self.assertEqual(test_cache.get_or_load_block(6, loader, default = -1), -1)
+			self.assertEqual(test_cache.get_or_load_block(-3, loader), -30)
+			self.assertEqual(calls[-1], [-4, -3, -2, -1])
+
+		#str keys are loaded one by one
+		test_cache = cache.Cache(64, 2, 2, str, int)
+		self.assertEqual(test_cache.get_or_load_block('a', lambda keys: dict.fromkeys(keys, 1)), 1)
+
+		#concurrent misses of keys of one line wait for one load
+		test_cache = cache.Cache(64, 2, 2, int, int)
+		release = threading.Event()
+		calls = []
+
+		def slow_loader(keys):
+			calls.append(keys)
+			release.wait()
+			return {key: key for key in keys}
+
+		results = []
+		threads = [threading.Thread(target = lambda key = key: results.append(test_cache.get_or_load_block(key, slow_loader))) for key in range(4)]
+		for thread in threads:
+			thread.start()
+		time.sleep(0.05)
+		release.set()
+		for thread in threads:
+			thread.join()
+		self.assertEqual(sorted(results), [0, 1, 2, 3])
+		self.assertEqual(calls, [[0, 1, 2, 3]])
+
+		def failing_loader(keys):
+			raise KeyError(keys[0])
+		self.assertRaises(KeyError, test_cache.get_or_load_block, 8, failing_loader)
+		self.assertEqual(test_cache.block_flights, {})
+
+	def test_write_back(self):
+		batches = []
+		writer = lambda items: batches.append(sorted(items))
+		for kwargs in [dict(), dict(lock_stripes = 2), dict(lazy = True)]:
+			del batches[:]
+			now = [0.0]
+			test_cache = cache.Cache(64, 2, 2, int, int, writer = writer, clock = lambda: now[0], **kwargs)
+			#keys 0, 1 and 2 share a line of set 0, keys 32, 64 and 96 are other lines of it
+			test_cache.set_many([(0, 10), (1, 11)])
+			test_cache.set_value(2, 12)
+			test_cache.set_value(1, 21)
+			test_cache.set_value(32, 13)
+			self.assertEqual(batches, [])
+			test_cache.set_value(64, 14)
+			self.assertEqual(batches, [[(0, 10), (1, 21), (2, 12)]])
+			#loaded items are clean
+			self.assertEqual(test_cache.get_or_load(96, lambda key: 16), 16)
+			self.assertEqual(test_cache.get_or_load_block(4, lambda keys: {4: 4}), 4)
+			self.assertEqual(batches[1:], [[(32, 13)]])
+			self.assertEqual(test_cache.flush(), 1)
+			self.assertEqual(batches[2:], [[(64, 14)]])
+			self.assertEqual(test_cache.flush(), 0)
+			self.assertEqual(test_cache.get_many([64, 96]), {64: 14, 96: 16})
+			#deleted and expired items are written too
+			test_cache.set_many([(64, 24), (65, 25)])
+			self.assertTrue(test_cache.delete(64, 24))
+			self.assertEqual(batches[3:], [[(64, 24)]])
+			test_cache.set_value(8, 18, ttl = 1)
+			now[0] = 2.0
+			test_cache.expire()
+			self.assertEqual(batches[4:], [[(8, 18)]])
+			self.assertEqual(test_cache.flush(), 1)
+			self.assertEqual(batches[5:], [[(65, 25)]])
+
+		#a failed write is retried
+		failures = [1]
+
+		def failing_writer(items):
+			if failures:
+				failures.pop()
+				raise IOError("backend down")
+			batches.append(sorted(items))
+
+		del batches[:]
+		test_cache = cache.Cache(64, 2, 2, int, int, writer = failing_writer)
+		test_cache.set_value(0, 10)
+		test_cache.set_value(32, 11)
+		self.assertRaises(IOError, test_cache.set_value, 64, 12)
+		self.assertEqual(test_cache.flush(), 3)
+		self.assertEqual(batches, [[(0, 10), (32, 11), (64, 12)]])
+
+		del batches[:]
+		test_cache = cache.Cache(64, 2, 2, int, int, writer = writer, write_through = True)
+		test_cache.set_value(0, 10)
+		test_cache.set_many([(1, 11), (2, 12)])
+		test_cache.get_or_load(3, lambda key: 13)
+		self.assertEqual(batches, [[(0, 10)], [(1, 11), (2, 12)]])
+		self.assertEqual(test_cache.flush(), 0)
+		self.assertEqual(test_cache.get_many([0, 1, 2, 3]), {0: 10, 1: 11, 2: 12, 3: 13})
+		self.assertRaises(ValueError, cache.Cache, 64, 2, 2, int, int, writer = writer, storage = 'compact')
+		self.assertRaises(ValueError, cache.Cache, 64, 2, 2, int, int, write_through = True)
+
+		#the sweeper reports a failed write and keeps expiring items
+		def failing_writer(items):
+			if not batches:
+				batches.append(None)
+				raise IOError("backend is down")
+			batches.append(sorted(items))
+		del batches[:]
+		errors = []
+		now = [0.0]
+		test_cache = cache.Cache(64, 2, 2, int, int, writer = failing_writer, clock = lambda: now[0])
+		test_cache.set_value(0, 10, ttl = 1)
+		excepthook = cache.sys.excepthook
+		cache.sys.excepthook = lambda *exc_info: errors.append(exc_info[0])
+		try:
+			test_cache.start_sweeper(0.001)
+			now[0] = 2.0
+			for i in range(1000):
+				if errors:
+					break
+				time.sleep(0.001)
+			test_cache.set_value(1, 11, ttl = 1)
+			now[0] = 4.0
+			for i in range(1000):
+				if test_cache.stats()['expirations'] == 2:
+					break
+				time.sleep(0.001)
+			test_cache.stop_sweeper()
+		finally:
+			cache.sys.excepthook = excepthook
+		self.assertEqual(errors, [IOError])
+		self.assertEqual(test_cache.stats()['expirations'], 2)
+		#the failed write is retried by the next write of its set
+		self.assertEqual(batches[1:], [[(0, 10)], [(1, 11)]])
+
+	def test_removal_listener(self):
+		for kwargs in [dict(), dict(lock_stripes = 2), dict(storage = 'compact'), dict(lazy = True)]:
+			notifications = []
+			now = [0.0]
+			test_cache = cache.Cache(64, 2, 2, int, int, listener = notifications.extend, clock = lambda: now[0], **kwargs)
+			test_cache.stop_dispatcher()
+			#keys 0 and 1 share a line of set 0, keys 32 and 64 are other lines of it
+			test_cache.set_many([(0, 10), (1, 11)])
+			test_cache.set_value(0, 20)
+			test_cache.set_value(32, 12)
+			test_cache.set_value(64, 14)
+			self.assertTrue(test_cache.delete(32, 12))
+			self.assertFalse(test_cache.delete(64, 15))
+			test_cache.set_value(8, 18, ttl = 1)
+			now[0] = 2.0
+			test_cache.expire()
+			self.assertEqual(notifications, [])
+			self.assertEqual(test_cache.dispatch_removals(), 5)
+			self.assertEqual([tuple(notification) for notification in notifications], [(0, 10, 'replaced'), 
+				(0, 20, 'evicted'), (1, 11, 'evicted'), (32, 12, 'deleted'), (8, 18, 'expired')])
+			self.assertEqual(test_cache.dispatch_removals(), 0)
+
+		#the listener runs on the dispatcher thread, not under the lock of a set
+		dispatched = threading.Event()
+		seen = []
+
+		def listener(notifications):
+			seen.append((threading.current_thread().name, test_cache.get_value(64), notifications[0].key))
+			dispatched.set()
+
+		test_cache = cache.Cache(64, 2, 2, int, int, listener = listener)
+		test_cache.set_many([(0, 10), (32, 12), (64, 14)])
+		self.assertTrue(dispatched.wait(5))
+		test_cache.stop_dispatcher()
+		self.assertEqual(seen, [('cache-dispatcher', 14, 0)])
+		self.assertRaises(ValueError, cache.Cache, 64, 2, 2, int, int, listener = 1)
+
+	def test_resize(self):
+		test_cache = cache.Cache(64, 2, 1, int, int)
+		test_cache.set_many([(key, key) for key in range(64)])
+		#16 sets to 64, each line moves when its new set is used or stepped
+		test_cache.resize(256)
+		self.assertEqual(len(test_cache.rehash.waiting), 64)
+		self.assertEqual(test_cache.get_value(2), 2)
+		self.assertEqual(len(test_cache.rehash.waiting), 62)
+		self.assertEqual(test_cache.get_many(range(64)), {key: key for key in range(64)})
+		stats = test_cache.stats()
+		self.assertEqual((stats['lines'], stats['lines_used']), (128, 32))
+		self.assertEqual(test_cache.rehash, None)
+		#64 sets to 8, the lines of the last old sets of a new set are kept
+		test_cache.resize(32)
+		self.assertEqual(test_cache.get_many(range(64)), {key: key for key in range(32, 64)})
+		self.assertRaises(ValueError, test_cache.resize, 0)
+		self.assertRaises(ValueError, test_cache.resize, 3)
+		self.assertRaises(ValueError, test_cache.resize, 64, max_weight = 80)
+
+		#the largest item follows the share of a set, unless it was given
+		weigher = lambda key, value: len(value)
+		test_cache = cache.Cache(64, 2, 2, int, str, max_weight = 80, weigher = weigher)
+		self.assertFalse(test_cache.set_value(0, 'a' * 11))
+		test_cache.resize(128, max_weight = 320)
+		self.assertEqual((test_cache.set_max_weight, test_cache.max_item_weight), (20, 20))
+		self.assertTrue(test_cache.set_value(0, 'a' * 11))
+		#fewer sets get a larger share of the same budget
+		test_cache.resize(128, n_way = 4)
+		self.assertEqual(test_cache.max_item_weight, 40)
+		self.assertTrue(test_cache.set_value(1, 'b' * 30))
+		test_cache = cache.Cache(64, 2, 2, int, str, max_weight = 80, weigher = weigher, max_item_weight = 5)
+		test_cache.resize(128, max_weight = 320)
+		self.assertEqual(test_cache.max_item_weight, 5)
+		self.assertFalse(test_cache.set_value(0, 'a' * 6))
+
+		for kwargs in [dict(storage = 'compact'), dict(lazy = True), dict(lock_stripes = 2)]:
+			test_cache = cache.Cache(64, 2, 1, int, int, **kwargs)
+			test_cache.set_many([(key, key) for key in range(0, 64, 3)])
+			test_cache.resize(256, n_way = 4)
+			self.assertEqual(test_cache.total_sets, 32)
+			self.assertEqual(test_cache.get_many(range(64)), {key: key for key in range(0, 64, 3)})
+
+		#deadlines, dirty items and removals move with the lines
+		now = [0.0]
+		batches = []
+		notifications = []
+		test_cache = cache.Cache(64, 2, 1, int, int, clock = lambda: now[0],
+			writer = batches.extend, listener = notifications.extend)
+		test_cache.set_many([(key, key) for key in range(64)])
+		test_cache.set_value(63, 63, ttl = 1)
+		test_cache.resize(32)
+		test_cache.rehash.finish()
+		now[0] = 2.0
+		self.assertEqual(test_cache.expire(), 1)
+		written = len(batches)
+		self.assertEqual(test_cache.flush(), 64 - written)
+		self.assertEqual(sorted(batches), [(key, key) for key in range(64)])
+		test_cache.stop_dispatcher()
+		self.assertEqual(sorted((notification.key, notification.cause) for notification in notifications),
+			sorted([(key, 'evicted') for key in list(range(16)) + list(range(32, 48))] + [(63, 'replaced'), (63, 'expired')]))
+
+		#items which expired before they move are written and reported
+		del batches[:]
+		del notifications[:]
+		now[0] = 0.0
+		test_cache = cache.Cache(64, 2, 1, int, int, clock = lambda: now[0], ttl = 1,
+			writer = batches.extend, listener = notifications.extend)
+		for key in range(24):
+			test_cache.set_value(key, key)
+		now[0] = 2.0
+		test_cache.resize(128)
+		self.assertEqual(test_cache.flush(), 24)
+		self.assertEqual(sorted(batches), [(key, key) for key in range(24)])
+		test_cache.stop_dispatcher()
+		self.assertEqual(sorted((notification.key, notification.cause) for notification in notifications),
+			[(key, 'expired') for key in range(24)])
+
+	def test_resize_concurrent(self):
+		#the operations which run during a resize see one layout 
+		for kwargs in [dict(lock_stripes = 16), dict(storage = 'compact'), 
+				dict(lazy = True, lock_stripes = 4), dict(victim_lines = 8)]:
+			test_cache = cache.Cache(4096, 4, 1, int, int, **kwargs)
+			test_cache.set_many([(key, key * 7) for key in range(2048)])
+			stopped = threading.Event()
+			errors = []
+
+			def read(seed):
+				rng = random.Random(seed)
+				try:
+					while not stopped.is_set():
+						key = rng.randrange(2048)
+						value = test_cache.get_value(key)
+						if value != None and value != key * 7:
+							errors.append((key, value))
+				except Exception as error:
+					errors.append(error)
+
+			def write(seed):
+				rng = random.Random(seed)
+				try:
+					while not stopped.is_set():
+						key = rng.randrange(2048)
+						test_cache.set_value(key, key * 7)
+						test_cache.set_many([(key, key * 7), (key ^ 1, (key ^ 1) * 7)])
+				except Exception as error:
+					errors.append(error)
+
+			threads = [threading.Thread(target = read, args = (seed,)) for seed in range(4)]
+			threads.append(threading.Thread(target = write, args = (4,)))
+			for thread in threads:
+				thread.start()
+			try:
+				for cache_size in [8192, 2048, 16384, 1024, 4096] * 2:
+					test_cache.resize(cache_size)
+			finally:
+				stopped.set()
+				for thread in threads:
+					thread.join()
+			self.assertEqual(errors, [])
+			values = test_cache.get_many(range(2048))
+			self.assertEqual(values, {key: key * 7 for key in values})
+
+	def test_victim_buffer(self):
+		now = [0.0]
+		notifications = []
+		test_cache = cache.Cache(64, 1, 1, int, int, victim_lines = 2, clock = lambda: now[0],
+			listener = notifications.extend)
+		#keys 0, 64, 128 and 192 are lines of set 0, which has one way
+		test_cache.set_value(0, 10)
+		test_cache.set_value(64, 11)
+		self.assertEqual(test_cache.get_value(0), 10)
+		self.assertEqual(test_cache.get_many([64, 0]), {0: 10, 64: 11})
+		stats = test_cache.stats()
+		self.assertEqual((stats['victim_hits'], stats['victim_lines'], stats['hits'], stats['misses']), (3, 1, 3, 0))
+		#the oldest line leaves the cache
+		test_cache.set_value(128, 12)
+		test_cache.set_value(192, 13)
+		self.assertEqual(test_cache.get_value(64), None)
+		self.assertTrue(test_cache.delete(128, 12))
+		self.assertEqual(test_cache.get_value(128), None)
+		test_cache.set_value(1, 14, ttl = 1)
+		test_cache.set_value(65, 15)
+		now[0] = 2.0
+		self.assertEqual(test_cache.get_value(1), None)
+		test_cache.stop_dispatcher()
+		self.assertEqual([(notification.key, notification.cause) for notification in notifications],
+			[(64, 'evicted'), (128, 'deleted'), (1, 'expired')])
+		self.assertEqual(test_cache.get_many([0, 65, 192]), {0: 10, 65: 15, 192: 13})
+
+		#moving a line back is neither a fill nor an eviction, and the
+		#admission filter only sees the lookup
+		test_cache = cache.Cache(64, 1, 1, int, int, victim_lines = 2, admission = 'TINYLFU')
+		test_cache.set_value(0, 10)
+		test_cache.set_value(64, 11)
+		test_cache.set_value(64, 11)
+		admission = test_cache.sets[0].admission
+		before = test_cache.stats()
+		#the first 64 is rejected, the second one moves 0 into the buffer
+		estimate = admission.estimate(0)
+		self.assertEqual(test_cache.get_value(0), 10)
+		after = test_cache.stats()
+		self.assertEqual(admission.estimate(0), estimate + 1)
+		for counter in ['fills', 'evictions', 'conflict_evictions', 'updates', 'rejections']:
+			self.assertEqual(after[counter], before[counter])
+		self.assertEqual((after['hits'], after['victim_hits']), (before['hits'] + 1, before['victim_hits'] + 1))
+
+		self.assertRaises(ValueError, cache.Cache, 64, 1, 1, int, int, victim_lines = 0)
+		self.assertRaises(ValueError, cache.Cache, 64, 1, 1, int, int, victim_lines = 2, storage = 'compact')
+		self.assertRaises(ValueError, cache.Cache, 64, 1, 1, int, int, victim_lines = 2,
+			max_weight = 64, weigher = lambda key, value: 1)
+
+	def test_replacement_factory(self):
+		class Policy(cache.LRU_MRU):
+			def __init__(self, n_way, thread_safe_mode = True):
+				super(Policy, self).__init__('LRU', thread_safe_mode = thread_safe_mode)
+				self.n_way = n_way
+
+		for replacement in [Policy, lambda n_way, thread_safe_mode: Policy(n_way, thread_safe_mode)]:
+			test_cache = cache.Cache(64, 2, 2, int, int, replacement = replacement, lock_stripes = 2)
+			policies = [cache_set.replacement for cache_set in test_cache.sets]
+			self.assertEqual(len(set(map(id, policies))), 8)
+			self.assertEqual(policies[0].n_way, 2)
+			#the sets are guarded by the stripes, the policies don't lock
+			self.assertEqual(policies[0].lock, None)
+			#the same tag in every set doesn't mix the sets
+			for set_num in range(8):
+				test_cache.set_value(set_num * 4, set_num)
+			for set_num in range(8):
+				self.assertEqual(policies[set_num].get_size(), 1)
+				self.assertEqual(test_cache.get_value(set_num * 4), set_num)
+		self.assertRaises(ValueError, cache.Cache, 64, 2, 2, int, int, replacement = lambda n_way, thread_safe_mode: None)
+
+		shared = cache.LRU_MRU()
+		test_cache = cache.Cache(64, 2, 2, int, int, replacement = shared)
+		self.assertTrue(test_cache.sets[0].replacement is shared)
+		self.assertTrue(test_cache.sets[1].replacement is shared)
+
+	def test_verify_keys(self):
+		#len is a fast hash with a lot of collisions
+		test_cache = cache.Cache(64, 2, 2, str, int, hash = len)
+		test_cache.set_value('ab', 1)
+		self.assertEqual(test_cache.get_value('cd'), 1)
+		for kwargs in [dict(), dict(lock_stripes = 2), dict(storage = 'compact')]:
+			test_cache = cache.Cache(64, 2, 2, str, int, hash = len, verify_keys = True, **kwargs)
+			test_cache.set_value('ab', 1)
+			self.assertEqual(test_cache.get_value('ab'), 1)
+			self.assertEqual(test_cache.get_value('cd'), None)
+			self.assertEqual(test_cache.delete('cd', 1), False)
+			test_cache.set_value('cd', 2)
+			self.assertEqual(test_cache.get_value('ab'), None)
+			self.assertEqual(test_cache.get_many(['ab', 'cd', 'abc']), {'cd': 2})
+			test_cache.set_many([('abc', 3), ('xyz', 4), ('ef', 5)])
+			self.assertEqual(test_cache.get_many(['abc', 'xyz', 'ef', 'cd'], ordered = True), [None, 4, 5, None])
+			self.assertEqual(test_cache.delete_many([('xyz', 4), ('abc', 3), ('ef', 5)]), [True, False, True])
+			self.assertEqual(test_cache.get_many(['xyz', 'ef']), {})
+			stats = test_cache.stats()
+			self.assertEqual(stats['hits'], 4)
+			self.assertRaises(ValueError, test_cache.get_many_hashed, [1])
+			self.assertRaises(ValueError, test_cache.set_many_hashed, [1], [1])
+
+		test_cache = cache.Cache(64, 2, 2, tuple, int, verify_keys = True)
+		test_cache.set_value((1, 'a'), 1)
+		self.assertEqual(test_cache.get_value((1, 'a')), 1)
+		self.assertEqual(test_cache.get_value((2, 'a')), None)
+
+	def test_lock_stripes(self):
+		test_cache = cache.Cache(64, 2, 2, int, int, lock_stripes = 4)
+		self.assertEqual(test_cache.lock, None)
+		self.assertEqual(len(test_cache.stripes), 4)
+		self.assertTrue(test_cache.sets[1].lock is test_cache.sets[5].lock)
+		self.assertFalse(test_cache.sets[1].lock is test_cache.sets[2].lock)
+		self.assertEqual(test_cache.sets[1].lines[0].lock, None)
+		self.assertEqual(test_cache.sets[1].replacement.lock, None)
+		#there are only 8 sets, so 100 stripes give one lock per set
+		test_cache = cache.Cache(64, 2, 2, int, int, lock_stripes = 100)
+		self.assertEqual(len(test_cache.stripes), 8)
+		self.assertRaises(ValueError, cache.Cache, 64, 2, 2, int, int, lock_stripes = 0)
+
+		test_cache = cache.Cache(4096, 2, 2, int, int, lock_stripes = 16)
+
+		def worker(start):
+			for i in range(start, start + 200):
+				test_cache.set_value(i, i)
+				self.assertEqual(test_cache.get_value(i), i)
+		threads = [threading.Thread(target = worker, args = (i * 1000,)) for i in range(4)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		for start in range(0, 4000, 1000):
+			for i in range(start, start + 200):
+				self.assertEqual(test_cache.get_value(i), i)
+
+	def test_not_thread_safe(self):
+		test_cache = cache.Cache(16, 2, 2, int, int, thread_safe_mode = False)
+		test_cache.set_value(1, 10)
+		self.assertEqual(test_cache.get_value(1), 10)
+
+	def test_compact_storage(self):
+		test_cache = cache.Cache(16, 2, 2, int, int, storage = 'compact')
+		for i in [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 16, 17, 18, 19]:
+			test_cache.set_value(i, i)
+		for i in [0, 1, 2, 3]:
+			self.assertEqual(test_cache.get_value(i), None)
+		for i in [4, 5, 6, 7, 8, 9, 10, 11, 16, 17, 18, 19]:
+			self.assertEqual(test_cache.get_value(i), i)
+		self.assertTrue(test_cache.delete(4, 4))
+		self.assertEqual(test_cache.get_value(4), None)
+		self.assertRaises(ValueError, cache.Cache, 16, 2, 2, int, int, storage = 'disk')
+
 
 		#tag: 0 - 3 => set 0 tag 0, 4 - 7 => set 1, 8 - 11 => set 0 tag 1, 16 - 19 => set 0 tag 10
 